@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
 from app.api.api_v1.endpoints import (
+    api_keys,
     auth,
     batches,
     dashboard,
+    events,
     health,
     ingredients,
     inventory,
@@ -15,8 +17,10 @@ api_router = APIRouter()
 
 api_router.include_router(health.router, tags=["health"])
 api_router.include_router(dashboard.router, tags=["dashboard"])
+api_router.include_router(events.router, tags=["events"])
 api_router.include_router(auth.router, tags=["auth"])
 api_router.include_router(users.router, tags=["users"])
+api_router.include_router(api_keys.router, tags=["api-keys"])
 api_router.include_router(ingredients.router, tags=["ingredients"])
 api_router.include_router(inventory.router, tags=["inventory"])
 api_router.include_router(recipes.router, tags=["recipes"])
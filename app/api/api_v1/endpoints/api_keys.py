@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.core.principal import Principal
+from app.core.security import admin_only
+from app.database import get_db
+from app.schemas.api_key import ApiKeyCreate, ApiKeyCreated, ApiKeyResponse
+from app.services.api_key_service import api_key_service
+
+router = APIRouter()
+
+
+@router.post("/api-keys", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+def create_api_key(
+    payload: ApiKeyCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(admin_only),
+):
+    try:
+        api_key, key = api_key_service.create_api_key(db, payload, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**ApiKeyResponse.model_validate(api_key).model_dump(), "key": key}
+
+
+@router.get("/api-keys", response_model=List[ApiKeyResponse])
+def read_api_keys(
+    db: Session = Depends(get_db),
+    _: Principal = Depends(admin_only),
+):
+    return api_key_service.list_api_keys(db)
+
+
+@router.delete("/api-keys/{api_key_id}", response_model=ApiKeyResponse)
+def revoke_api_key(
+    api_key_id: int,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(admin_only),
+):
+    try:
+        return api_key_service.revoke_api_key(db, api_key_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
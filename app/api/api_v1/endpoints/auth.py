@@ -1,29 +1,100 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.core.security import create_access_token, verify_password
+from app.core.passwords import PasswordHasherBusy
+from app.core.security import (
+    REFRESH_TOKEN,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    oauth2_scheme,
+    password_hasher,
+    principal_from_payload,
+    revoke_token,
+    user_token_claims,
+)
 from app.database import get_db
 from app.models.user import User
-from app.schemas.token import Token
+from app.schemas.token import LogoutRequest, RefreshRequest, Token
 
 router = APIRouter()
 
 
 @router.post("/auth/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if user is None or not verify_password(form_data.password, user.hashed_password):
+    # async so that waiting on bcrypt (in the process pool) holds no threadpool thread;
+    # the blocking database calls go to the threadpool explicitly
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == form_data.username).first()
+    )
+    valid, new_hash = False, None
+    if user is not None:
+        try:
+            valid, new_hash = await password_hasher.verify_and_update(
+                form_data.password, user.hashed_password
+            )
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Before any commit, which would expire the loaded attributes
+    claims = user_token_claims(user)
+
+    if new_hash is not None:
+        # Work factor changed since this hash was made: store the rehash
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+
+    return {
+        "access_token": create_access_token(data=claims),
+        "refresh_token": create_refresh_token(data=claims),
+        "token_type": "bearer",
+    }
+
+
+@router.post("/auth/refresh", response_model=Token)
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new access/refresh pair; each refresh token works once."""
+    claims = decode_token(payload.refresh_token, db, token_type=REFRESH_TOKEN)
+    principal = principal_from_payload(claims, db)
+    # Inserting the jti is the single-use check: a second insert conflicts
+    if not revoke_token(db, claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token already used",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    new_claims = user_token_claims(principal)
+    return {
+        "access_token": create_access_token(data=new_claims),
+        "refresh_token": create_refresh_token(data=new_claims),
+        "token_type": "bearer",
+    }
+
+
+@router.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    payload: LogoutRequest | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
+    revoke_token(db, decode_token(token, db))
+    if payload is not None and payload.refresh_token:
+        revoke_token(db, decode_token(payload.refresh_token, db, token_type=REFRESH_TOKEN))
@@ -3,12 +3,14 @@ from __future__ import annotations
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import admin_or_operator, get_current_user
-from app.database import get_db
+from app.core.principal import Principal
+from app.core.security import async_admin_or_operator, get_async_current_user
+from app.database import get_async_db, run_sync
 from app.models.batch import Batch
-from app.models.user import User
 from app.schemas.batch import BatchCreate, BatchProduce, BatchResponse
 from app.services.batch_service import batch_service
 
@@ -16,61 +18,57 @@ router = APIRouter()
 
 
 @router.post("/batches", response_model=BatchResponse, status_code=status.HTTP_201_CREATED)
-def create_batch(
+async def create_batch(
     payload: BatchCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_or_operator),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(async_admin_or_operator),
 ):
+    def create(session: Session) -> BatchResponse:
+        # Serialized inside run_sync, where the consumptions relationship can still load
+        return BatchResponse.model_validate(batch_service.create_batch(session, payload, current_user.id))
+
     try:
-        batch = batch_service.create_batch(db, payload, current_user.id)
-        return batch
+        return await run_sync(db, create)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/batches", response_model=List[BatchResponse])
-def read_batches(
+async def read_batches(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    batches = (
-        db.query(Batch)
-        .options(joinedload(Batch.consumptions))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return batches
+    stmt = select(Batch).options(selectinload(Batch.consumptions)).offset(skip).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
 
 
 @router.get("/batches/{batch_id}", response_model=BatchResponse)
-def read_batch(
+async def read_batch(
     batch_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    batch = (
-        db.query(Batch)
-        .options(joinedload(Batch.consumptions))
-        .filter(Batch.id == batch_id)
-        .first()
-    )
+    stmt = select(Batch).options(selectinload(Batch.consumptions)).where(Batch.id == batch_id)
+    batch = (await db.execute(stmt)).scalar_one_or_none()
     if not batch:
         raise HTTPException(status_code=404, detail="Batch not found")
     return batch
 
 
 @router.post("/batches/{batch_id}/produce", response_model=BatchResponse)
-def produce_batch(
+async def produce_batch(
     batch_id: int,
     payload: BatchProduce,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_or_operator),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(async_admin_or_operator),
 ):
+    def produce(session: Session) -> BatchResponse:
+        batch = batch_service.produce_batch(session, batch_id, payload, current_user.id)
+        return BatchResponse.model_validate(batch)
+
     try:
-        batch = batch_service.produce_batch(db, batch_id, payload, current_user.id)
-        return batch
+        return await run_sync(db, produce)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
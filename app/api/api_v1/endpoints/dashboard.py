@@ -1,31 +1,85 @@
-from typing import List
+from datetime import date, datetime
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_current_user
-from app.database import get_db
-from app.models.user import User
-from app.schemas.dashboard import DashboardStatsResponse, LowStockAlert
+from app.core.http_cache import CACHE_CONTROL, etag_matches, make_etag, not_modified
+from app.core.principal import Principal
+from app.core.security import get_async_current_user, get_current_user
+from app.database import get_async_db, get_db, run_sync
+from app.models.data_version import INVENTORY_VERSION, get_data_version
+from app.schemas.dashboard import DashboardStatsResponse, LowStockAlert, ProductionAnalyticsResponse
+from app.services.analytics_service import analytics_service
 from app.services.dashboard_service import dashboard_service
 
 router = APIRouter()
 
-
 @router.get("/dashboard/stats", response_model=DashboardStatsResponse)
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    stats = dashboard_service.get_stats(db)
-    return stats
+    # One primary-key read decides between 304, a cached body and a recomputation
+    version = await run_sync(db, get_data_version, INVENTORY_VERSION)
+    month = datetime.utcnow().strftime("%Y-%m")  # monthly figures roll over with the month
+    etag = make_etag("dashboard-stats", version, month)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return await run_sync(
+        db,
+        lambda session: dashboard_service.cache.get_or_set(
+            ("stats", month), version, lambda: dashboard_service.get_stats(session)
+        ),
+    )
 
 
 @router.get("/dashboard/alerts", response_model=List[LowStockAlert])
-def get_low_stock_alerts(
+async def get_low_stock_alerts(
+    request: Request,
+    response: Response,
     threshold: float = 10.0,
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
+):
+    version = await run_sync(db, get_data_version, INVENTORY_VERSION)
+    etag = make_etag("dashboard-alerts", version, threshold)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return await run_sync(
+        db,
+        lambda session: dashboard_service.cache.get_or_set(
+            ("alerts", threshold), version, lambda: dashboard_service.get_low_stock_alerts(session, threshold)
+        ),
+    )
+
+
+@router.get("/dashboard/production", response_model=ProductionAnalyticsResponse)
+def get_production_series(
+    granularity: Literal["day", "week", "month"] = "day",
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    group_by: Literal["none", "recipe", "ingredient"] = "none",
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
-    alerts = dashboard_service.get_low_stock_alerts(db, threshold)
-    return alerts
+    # Sync on purpose: building hundreds of points is CPU work, kept off the event loop
+    try:
+        return analytics_service.production_series(
+            db,
+            granularity=granularity,
+            date_from=date_from,
+            date_to=date_to,
+            group_by=group_by,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
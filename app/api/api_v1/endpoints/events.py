@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.core.events import broadcaster
+from app.core.principal import Principal
+from app.core.security import get_stream_user
+
+router = APIRouter()
+
+
+@router.get("/events/stream")
+async def stream_events(_: Principal = Depends(get_stream_user)):
+    """
+    Server-Sent Events feed of `balance`, `low_stock` and `batch` events.
+    Authenticate with the Authorization header or `?access_token=` (EventSource).
+    """
+    subscription = broadcaster.subscribe()
+    return StreamingResponse(
+        broadcaster.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.core.db_metrics import pool_stats
+from app.core.principal import Principal
+from app.core.responses import FastJSONResponse
+from app.core.security import admin_only
 
 router = APIRouter()
 
@@ -6,3 +11,9 @@ router = APIRouter()
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@router.get("/metrics", response_class=FastJSONResponse)
+def metrics(_: Principal = Depends(admin_only)):
+    # Connection pools: checkout wait and timeouts, in use/overflow per engine
+    return {"db_pools": pool_stats()}
@@ -2,31 +2,52 @@ from __future__ import annotations
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.principal import Principal
+from app.core.responses import RowSerializer
 from app.core.security import admin_only, admin_or_operator, get_current_user
 from app.database import get_db
+from app.models.data_version import get_table_stamp
 from app.models.ingredient import Ingredient
-from app.models.user import User
 from app.schemas.ingredient import (
     IngredientCreate,
     IngredientResponse,
     IngredientUpdate,
 )
+from app.schemas.recipe import IngredientUsageResponse
+from app.schemas.search import AutocompleteItem
+from app.services.ingredient_service import ingredient_service
+from app.services.recipe_service import recipe_service
+from app.services.search_service import search_service
 
 router = APIRouter()
 
+# List endpoints serialize selected columns directly (no ORM objects, no per-row validation)
+ingredient_rows = RowSerializer(IngredientResponse)
+
 
 # Endpoint PÚBLICO para a vitrine (sem autenticação)
 @router.get("/ingredients/public", response_model=List[IngredientResponse])
 def read_public_ingredients(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
 ):
     """Lista ingredientes ativos para exibição pública na vitrine."""
-    return db.query(Ingredient).filter(Ingredient.active == True).offset(skip).limit(limit).all()
+    count, last_modified = get_table_stamp(db, Ingredient)
+    etag = make_etag("ingredients-public", count, last_modified, skip, limit)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    stmt = select(*ingredient_rows.columns(Ingredient)).where(Ingredient.active == True)
+    return ingredient_rows.response(
+        db.execute(stmt.offset(skip).limit(limit)), headers=cache_headers(etag, last_modified)
+    )
 
 
 @router.post(
@@ -35,39 +56,89 @@ def read_public_ingredients(
 def create_ingredient(
     payload: IngredientCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    current_user: Principal = Depends(admin_or_operator),
 ):
-    ingredient = Ingredient(**payload.model_dump())
-    db.add(ingredient)
-    db.commit()
-    db.refresh(ingredient)
-    return ingredient
+    return ingredient_service.create_ingredient(db, payload, current_user.id)
 
 
 @router.get("/ingredients", response_model=List[IngredientResponse])
 def read_ingredients(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
-    query = db.query(Ingredient)
+    # Validators cover the whole table (a deactivated row still bumps updated_at),
+    # so one aggregate decides 304 before any row is loaded
+    count, last_modified = get_table_stamp(db, Ingredient)
+    etag = make_etag("ingredients", count, last_modified, skip, limit, active_only)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    stmt = select(*ingredient_rows.columns(Ingredient))
     if active_only:
-        query = query.filter(Ingredient.active == True)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(Ingredient.active == True)
+    return ingredient_rows.response(
+        db.execute(stmt.offset(skip).limit(limit)), headers=cache_headers(etag, last_modified)
+    )
+
+
+@router.get("/ingredients/search", response_model=List[IngredientResponse])
+def search_ingredients(
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
+    limit: int = 20,
+    active_only: bool = True,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """Accent-insensitive name search ("oleo" finds "Óleo Essencial")."""
+    return search_service.search_ingredients(db, q, skip=skip, limit=limit, active_only=active_only)
+
+
+@router.get("/ingredients/autocomplete", response_model=List[AutocompleteItem])
+def autocomplete_ingredients(
+    q: str = Query(..., min_length=1),
+    limit: int = 10,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """Word-prefix suggestions for active ingredients, served from the in-memory index."""
+    return search_service.ingredient_index.search(db, q, limit=limit)
 
 
 @router.get("/ingredients/{ingredient_id}", response_model=IngredientResponse)
 def read_ingredient(
     ingredient_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
+    last_modified = db.execute(select(Ingredient.updated_at).where(Ingredient.id == ingredient_id)).scalar()
+    if last_modified is None:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    etag = make_etag("ingredient", ingredient_id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response.headers.update(cache_headers(etag, last_modified))
+    return db.get(Ingredient, ingredient_id)
+
+
+@router.get("/ingredients/{ingredient_id}/usage", response_model=List[IngredientUsageResponse])
+def read_ingredient_usage(
+    ingredient_id: int,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """Where used: recipes affected by this ingredient, directly or through sub-recipes."""
     ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
-    return ingredient
+    return recipe_service.get_ingredient_usage(db, ingredient_id)
 
 
 @router.patch("/ingredients/{ingredient_id}", response_model=IngredientResponse)
@@ -75,26 +146,21 @@ def update_ingredient(
     ingredient_id: int,
     payload: IngredientUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    current_user: Principal = Depends(admin_or_operator),
 ):
     ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
-    update_data = payload.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(ingredient, key, value)
-
-    db.commit()
-    db.refresh(ingredient)
-    return ingredient
+    # Cost changes are also appended to the ingredient_prices history
+    return ingredient_service.update_ingredient(db, ingredient, payload, current_user.id)
 
 
 @router.delete("/ingredients/{ingredient_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_ingredient(
     ingredient_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_only),
+    _: Principal = Depends(admin_only),
 ):
     ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if not ingredient:
@@ -103,4 +169,5 @@ def delete_ingredient(
     # Soft delete
     ingredient.active = False
     db.commit()
+    search_service.invalidate_ingredients()
     return None
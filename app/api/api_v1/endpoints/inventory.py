@@ -1,15 +1,18 @@
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import List, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import desc
+from fastapi.responses import StreamingResponse
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import admin_or_operator, get_current_user
-from app.database import get_db
+from app.core.principal import Principal
+from app.core.responses import RowSerializer
+from app.core.security import admin_or_operator, async_admin_or_operator, get_async_current_user, get_current_user
+from app.database import get_async_db, get_db, run_sync
 from app.models.ingredient import Ingredient
 from app.models.inventory import InventoryMovement
-from app.models.user import User
 from app.schemas.inventory import (
     InventoryBalanceResponse,
     InventoryMovementCreate,
@@ -19,25 +22,29 @@ from app.services.inventory_service import inventory_service
 
 router = APIRouter()
 
+# List endpoints serialize selected columns directly (no ORM objects, no per-row validation)
+movement_rows = RowSerializer(InventoryMovementResponse)
+balance_rows = RowSerializer(InventoryBalanceResponse)
+
 
 @router.post(
     "/inventory/movements",
     response_model=InventoryMovementResponse,
     status_code=status.HTTP_201_CREATED,
 )
-def create_movement(
+async def create_movement(
     payload: InventoryMovementCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_or_operator),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(async_admin_or_operator),
 ):
     # Verify ingredient exists
-    ingredient = db.query(Ingredient).filter(Ingredient.id == payload.ingredient_id).first()
+    ingredient = await db.get(Ingredient, payload.ingredient_id)
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
 
     try:
-        movement = inventory_service.create_movement(
-            db=db, movement_in=payload, user_id=current_user.id
+        movement = await run_sync(
+            db, inventory_service.create_movement, movement_in=payload, user_id=current_user.id
         )
         return movement
     except ValueError as e:
@@ -45,64 +52,70 @@ def create_movement(
 
 
 @router.get("/inventory/movements", response_model=List[InventoryMovementResponse])
-def read_movements(
+async def read_movements(
     ingredient_id: int | None = None,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    query = db.query(InventoryMovement)
+    stmt = select(*movement_rows.columns(InventoryMovement))
     if ingredient_id:
-        query = query.filter(InventoryMovement.ingredient_id == ingredient_id)
+        stmt = stmt.where(InventoryMovement.ingredient_id == ingredient_id)
     
     if start_date:
-        query = query.filter(InventoryMovement.created_at >= start_date)
+        stmt = stmt.where(InventoryMovement.created_at >= start_date)
     
     if end_date:
-        query = query.filter(InventoryMovement.created_at <= end_date)
+        stmt = stmt.where(InventoryMovement.created_at <= end_date)
     
     # Order by newest first
-    query = query.order_by(desc(InventoryMovement.created_at))
-    return query.offset(skip).limit(limit).all()
+    stmt = stmt.order_by(desc(InventoryMovement.created_at))
+    return movement_rows.response(await db.execute(stmt.offset(skip).limit(limit)))
 
 
 @router.get("/inventory/balance", response_model=List[InventoryBalanceResponse])
-def read_balances(
+async def read_balances(
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
+):
+    return balance_rows.response(await db.execute(inventory_service.balances_statement()))
+
+
+@router.get("/inventory/valuation")
+def read_valuation(
+    format: Literal["json", "csv"] = "json",
+    as_of: date | None = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
-    # This might be heavy if many ingredients. 
-    # For now, iterate all ingredients.
-    ingredients = db.query(Ingredient).filter(Ingredient.active == True).all()
-    results = []
-    for ing in ingredients:
-        bal = inventory_service.get_balance(db, ing.id)
-        results.append(
-            InventoryBalanceResponse(
-                ingredient_id=ing.id,
-                ingredient_name=ing.name,
-                balance=bal,
-                unit=ing.unit,
-                avg_cost=None,  # Not implemented yet
-            )
+    """
+    Per-ingredient valuation (balance, unit cost, value, share of total), streamed.
+    With `as_of`, balances and prices are taken at the end of that day.
+    """
+    if format == "csv":
+        suffix = f"_{as_of.isoformat()}" if as_of else ""
+        return StreamingResponse(
+            inventory_service.valuation_csv(db, as_of),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="inventory_valuation{suffix}.csv"'},
         )
-    return results
+    return StreamingResponse(inventory_service.valuation_json(db, as_of), media_type="application/json")
 
 
 @router.get("/inventory/balance/{ingredient_id}", response_model=InventoryBalanceResponse)
-def read_balance_item(
+async def read_balance_item(
     ingredient_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    ing = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+    ing = await db.get(Ingredient, ingredient_id)
     if not ing:
         raise HTTPException(status_code=404, detail="Ingredient not found")
     
-    bal = inventory_service.get_balance(db, ingredient_id)
+    bal = await run_sync(db, inventory_service.get_balance, ingredient_id)
     return InventoryBalanceResponse(
         ingredient_id=ing.id,
         ingredient_name=ing.name,
@@ -1,22 +1,32 @@
 from __future__ import annotations
 
-from typing import List
+from datetime import datetime
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from app.core.security import admin_or_operator, get_current_user
-from app.database import get_db
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.principal import Principal
+from app.core.security import admin_or_operator, get_async_current_user, get_current_user
+from app.database import get_async_db, get_db, run_sync
+from app.models.data_version import get_table_stamp
 from app.models.recipe import Recipe, RecipeItem
-from app.models.user import User
 from app.schemas.recipe import (
     RecipeCostResponse,
     RecipeCreate,
     RecipeItemCreate,
     RecipeResponse,
     RecipeUpdate,
+    SimulationRequest,
+    SimulationResponse,
 )
+from app.schemas.search import AutocompleteItem
 from app.services.recipe_service import recipe_service
+from app.services.search_service import search_service
+from app.services.simulation_service import simulation_service
 
 router = APIRouter()
 
@@ -25,49 +35,118 @@ router = APIRouter()
 def create_recipe(
     payload: RecipeCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    _: Principal = Depends(admin_or_operator),
 ):
     # Check name uniqueness
     existing = db.query(Recipe).filter(Recipe.name == payload.name).first()
     if existing:
         raise HTTPException(status_code=400, detail="Recipe with this name already exists")
     
-    recipe = recipe_service.create_recipe(db, payload)
+    try:
+        recipe = recipe_service.create_recipe(db, payload)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     return recipe
 
 
 @router.get("/recipes", response_model=List[RecipeResponse])
-def read_recipes(
+async def read_recipes(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
+):
+    # Item changes touch the recipe's updated_at, so the recipes table alone versions the list
+    count, last_modified = await run_sync(db, get_table_stamp, Recipe)
+    etag = make_etag("recipes", count, last_modified, skip, limit)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response.headers.update(cache_headers(etag, last_modified))
+    stmt = select(Recipe).options(selectinload(Recipe.items)).offset(skip).limit(limit)
+    return (await db.execute(stmt)).scalars().all()
+
+
+@router.post("/recipes/simulate", response_model=SimulationResponse)
+def simulate_price_changes(
+    payload: SimulationRequest,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """What-if: cost impact of ingredient price changes on every recipe, per scenario."""
+    try:
+        return simulation_service.simulate(db, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Declared before /recipes/{recipe_id} so "search"/"autocomplete"/"costs" are not parsed as ids
+@router.get("/recipes/search", response_model=List[RecipeResponse])
+def search_recipes(
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """Accent-insensitive name search."""
+    return search_service.search_recipes(db, q, skip=skip, limit=limit)
+
+
+@router.get("/recipes/autocomplete", response_model=List[AutocompleteItem])
+def autocomplete_recipes(
+    q: str = Query(..., min_length=1),
+    limit: int = 10,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+):
+    """Word-prefix suggestions served from the in-memory index."""
+    return search_service.recipe_index.search(db, q, limit=limit)
+
+
+
+@router.get("/recipes/costs", response_model=List[RecipeCostResponse])
+def read_recipe_costs(
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: Literal["name", "total_cost", "cost_per_unit"] = "name",
+    order: Literal["asc", "desc"] = "asc",
+    include_breakdown: bool = False,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
-    recipes = (
-        db.query(Recipe)
-        .options(joinedload(Recipe.items))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    # Sync on purpose: the Decimal roll-up is CPU work and runs in the threadpool, not on the event loop
+    return recipe_service.calculate_all_costs(
+        db,
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        descending=order == "desc",
+        include_breakdown=include_breakdown,
     )
-    return recipes
 
 
 @router.get("/recipes/{recipe_id}", response_model=RecipeResponse)
-def read_recipe(
+async def read_recipe(
     recipe_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    _: Principal = Depends(get_async_current_user),
 ):
-    recipe = (
-        db.query(Recipe)
-        .options(joinedload(Recipe.items))
-        .filter(Recipe.id == recipe_id)
-        .first()
-    )
-    if not recipe:
+    last_modified = (await db.execute(select(Recipe.updated_at).where(Recipe.id == recipe_id))).scalar()
+    if last_modified is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    etag = make_etag("recipe", recipe_id, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    response.headers.update(cache_headers(etag, last_modified))
+    stmt = select(Recipe).options(selectinload(Recipe.items)).where(Recipe.id == recipe_id)
+    return (await db.execute(stmt)).scalar_one()
 
 
 @router.patch("/recipes/{recipe_id}", response_model=RecipeResponse)
@@ -75,7 +154,7 @@ def update_recipe(
     recipe_id: int,
     payload: RecipeUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    _: Principal = Depends(admin_or_operator),
 ):
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
     if not recipe:
@@ -87,16 +166,19 @@ def update_recipe(
 
     db.commit()
     db.refresh(recipe)
+    search_service.invalidate_recipes()
     return recipe
 
 
 @router.get("/recipes/{recipe_id}/cost", response_model=RecipeCostResponse)
 def get_recipe_cost(
     recipe_id: int,
+    as_of: datetime | None = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ):
-    cost_response = recipe_service.calculate_cost(db, recipe_id)
+    # as_of: cost using the ingredient prices effective at that moment
+    cost_response = recipe_service.calculate_cost(db, recipe_id, as_of=as_of)
     if not cost_response:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return cost_response
@@ -107,16 +189,26 @@ def add_recipe_item(
     recipe_id: int,
     payload: RecipeItemCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    _: Principal = Depends(admin_or_operator),
 ):
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
+    if payload.sub_recipe_id is not None:
+        try:
+            recipe_service.validate_sub_recipe(db, recipe_id, payload.sub_recipe_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     # Check if item exists
+    if payload.sub_recipe_id is not None:
+        match = RecipeItem.sub_recipe_id == payload.sub_recipe_id
+    else:
+        match = RecipeItem.ingredient_id == payload.ingredient_id
     existing = db.query(RecipeItem).filter(
         RecipeItem.recipe_id == recipe_id, 
-        RecipeItem.ingredient_id == payload.ingredient_id
+        match
     ).first()
     
     if existing:
@@ -128,22 +220,43 @@ def add_recipe_item(
         item = RecipeItem(
             recipe_id=recipe_id,
             ingredient_id=payload.ingredient_id,
+            sub_recipe_id=payload.sub_recipe_id,
             quantity=payload.quantity,
             waste_factor=payload.waste_factor
         )
         db.add(item)
-    
+
+    recipe.updated_at = datetime.utcnow()  # items are part of the recipe's representation
     db.commit()
     db.refresh(recipe)
     return recipe
 
 
+@router.put("/recipes/{recipe_id}/items", response_model=RecipeResponse)
+def replace_recipe_items(
+    recipe_id: int,
+    payload: List[RecipeItemCreate],
+    db: Session = Depends(get_db),
+    _: Principal = Depends(admin_or_operator),
+):
+    """Replace the complete item list of a recipe in one request (single commit)."""
+    recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
+    if not recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+
+    try:
+        return recipe_service.replace_items(db, recipe, payload)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.delete("/recipes/{recipe_id}/items/{ingredient_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_recipe_item(
     recipe_id: int,
     ingredient_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_or_operator),
+    _: Principal = Depends(admin_or_operator),
 ):
     item = db.query(RecipeItem).filter(
         RecipeItem.recipe_id == recipe_id,
@@ -152,7 +265,31 @@ def delete_recipe_item(
     
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-        
+
+    item.recipe.updated_at = datetime.utcnow()
+    db.delete(item)
+    db.commit()
+    return None
+
+
+@router.delete(
+    "/recipes/{recipe_id}/sub-recipes/{sub_recipe_id}", status_code=status.HTTP_204_NO_CONTENT
+)
+def delete_recipe_sub_recipe(
+    recipe_id: int,
+    sub_recipe_id: int,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(admin_or_operator),
+):
+    item = db.query(RecipeItem).filter(
+        RecipeItem.recipe_id == recipe_id,
+        RecipeItem.sub_recipe_id == sub_recipe_id
+    ).first()
+
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    item.recipe.updated_at = datetime.utcnow()
     db.delete(item)
     db.commit()
     return None
@@ -3,6 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.principal import Principal
 from app.core.security import admin_only, get_current_user, get_password_hash
 from app.database import get_db
 from app.models.user import User
@@ -15,7 +16,7 @@ router = APIRouter()
 def create_user(
     payload: UserCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(admin_only),
+    _: Principal = Depends(admin_only),
 ):
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing is not None:
@@ -34,5 +35,5 @@ def create_user(
 
 
 @router.get("/users/me", response_model=UserRead)
-def read_current_user(current_user: User = Depends(get_current_user)):
+def read_current_user(current_user: Principal = Depends(get_current_user)):
     return current_user
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload, object_session
+
+from app.core.config import settings
+from app.core.principal import Principal
+from app.models.api_key import ApiKey
+from app.models.user import RoleEnum, User
+
+KEY_PREFIX = "sol"
+API_PREFIX = "/api/v1"
+# Least to most privileged
+ROLE_ORDER = (RoleEnum.VIEWER, RoleEnum.OPERATOR, RoleEnum.ADMIN)
+
+
+def generate_api_key() -> tuple[str, str]:
+    """New (prefix, full key). The full key is shown once and never stored."""
+    prefix = secrets.token_hex(6)
+    return prefix, f"{KEY_PREFIX}_{prefix}_{secrets.token_urlsafe(32)}"
+
+
+def parse_prefix(key: str) -> str | None:
+    parts = key.split("_", 2)
+    if len(parts) != 3 or parts[0] != KEY_PREFIX:
+        return None
+    return parts[1]
+
+
+def hash_api_key(key: str) -> str:
+    # Keys are 256-bit random, so a keyed SHA-256 is enough; no need for a slow KDF
+    return hmac.new(settings.secret_key.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+
+def normalize_scope_path(path: str) -> str:
+    """Scopes use route templates relative to the API root: "/inventory/movements"."""
+    path = path.strip()
+    if path.startswith(API_PREFIX + "/"):
+        path = path[len(API_PREFIX):]
+    return path
+
+
+def scope_matches(scopes: frozenset[str], method: str, path: str) -> bool:
+    path = normalize_scope_path(path)
+    return f"{method} {path}" in scopes or f"* {path}" in scopes
+
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    key_hash: str
+    scopes: frozenset[str]
+    principal: Principal
+
+
+class ApiKeyCache:
+    """
+    Per-worker TTL cache of active keys by prefix, invalidated when ORM writes in this worker commit.
+
+    Unknown prefixes are remembered for `miss_ttl_seconds` too, so a client retrying a
+    revoked or mistyped key does not cost a query per request. Misses are capped at
+    `max_misses` (oldest dropped first): random prefixes cannot grow the cache.
+    """
+
+    def __init__(self, ttl_seconds: int, miss_ttl_seconds: int, max_misses: int = 10000):
+        self._ttl_seconds = ttl_seconds
+        self._miss_ttl_seconds = miss_ttl_seconds
+        self._max_misses = max_misses
+        self._entries: dict[str, tuple[float, CachedApiKey]] = {}
+        self._misses: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, prefix: str) -> CachedApiKey | None:
+        api_key = (
+            db.query(ApiKey)
+            .options(joinedload(ApiKey.user))
+            .filter(ApiKey.prefix == prefix, ApiKey.active == True)
+            .first()
+        )
+        # A key whose owner is gone authenticates nobody
+        if api_key is None or api_key.user is None:
+            return None
+        owner = Principal.from_user(api_key.user)
+        return CachedApiKey(
+            key_hash=api_key.key_hash,
+            scopes=frozenset(api_key.scope_list),
+            # The key acts as its owner, with the key's own role capped at the owner's current one
+            principal=Principal(
+                id=owner.id,
+                email=owner.email,
+                full_name=owner.full_name,
+                role=min(api_key.role, owner.role, key=ROLE_ORDER.index),
+                created_at=owner.created_at,
+            ),
+        )
+
+    def get(self, db: Session, prefix: str) -> CachedApiKey | None:
+        now = time.monotonic()
+        entry = self._entries.get(prefix)
+        if entry is not None and now < entry[0]:
+            return entry[1]
+        missed_until = self._misses.get(prefix)
+        if missed_until is not None and now < missed_until:
+            return None
+        cached = self._load(db, prefix)
+        with self._lock:
+            if cached is not None:
+                self._entries[prefix] = (now + self._ttl_seconds, cached)
+                self._misses.pop(prefix, None)
+            else:
+                self._entries.pop(prefix, None)
+                self._misses[prefix] = now + self._miss_ttl_seconds
+                self._misses.move_to_end(prefix)
+                while len(self._misses) > self._max_misses:
+                    self._misses.popitem(last=False)
+        return cached
+
+    def invalidate(self, prefix: str) -> None:
+        with self._lock:
+            self._entries.pop(prefix, None)
+            self._misses.pop(prefix, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._misses.clear()
+
+api_key_cache = ApiKeyCache(settings.api_key_cache_ttl_seconds, settings.api_key_miss_ttl_seconds)
+
+
+def authenticate_api_key(db: Session, key: str) -> CachedApiKey | None:
+    """The active key matching `key`, or None. Scopes are checked by the caller."""
+    prefix = parse_prefix(key)
+    if prefix is None:
+        return None
+    cached = api_key_cache.get(db, prefix)
+    if cached is None or not hmac.compare_digest(cached.key_hash, hash_api_key(key)):
+        return None
+    return cached
+
+
+# Evicted after commit, like cached principals: evicting during flush would let a
+# concurrent request re-cache the old row before the change is visible
+_STALE_KEYS = "stale_api_key_prefixes"
+_ALL_KEYS = "*"
+
+
+def _mark_stale(target, *prefixes: str) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_KEYS, set()).update(prefixes)
+
+
+@event.listens_for(ApiKey, "after_insert")
+@event.listens_for(ApiKey, "after_update")
+@event.listens_for(ApiKey, "after_delete")
+def _api_key_changed(mapper, connection, api_key: ApiKey) -> None:
+    _mark_stale(api_key, api_key.prefix, *(inspect(api_key).attrs.prefix.history.deleted or ()))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _owner_changed(mapper, connection, user: User) -> None:
+    # Owners change rarely; dropping every entry is simpler than indexing by owner
+    _mark_stale(user, _ALL_KEYS)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_api_keys(session: Session) -> None:
+    prefixes = session.info.pop(_STALE_KEYS, ())
+    if _ALL_KEYS in prefixes:
+        api_key_cache.clear()
+        return
+    for prefix in prefixes:
+        api_key_cache.invalidate(prefix)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_api_keys(session: Session) -> None:
+    session.info.pop(_STALE_KEYS, None)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import zlib
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:  # optional: without it clients get gzip
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Already compressed, or consumed incrementally (event streams must not be buffered)
+EXCLUDED_CONTENT_TYPES = frozenset(
+    {
+        "application/grpc",
+        "application/gzip",
+        "application/x-gzip",
+        "application/zip",
+        "text/event-stream",
+    }
+)
+EXCLUDED_TOP_LEVEL_TYPES = frozenset({"audio", "font", "image", "video"})
+
+# Chunks at least this large are compressed off the event loop
+THREAD_MIN_SIZE = 128 * 1024
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding as {coding: q}; codings with q=0 are refused."""
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header: str, available: tuple[str, ...]) -> str | None:
+    """The client's highest-q coding among `available` (which is in server preference order)."""
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes, more_body: bool) -> bytes:
+        # Sync-flush each chunk so a streamed response reaches the client as it is produced
+        flush_mode = zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+        return self._compressor.compress(chunk) + self._compressor.flush(flush_mode)
+
+
+class BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, chunk: bytes, more_body: bool) -> bytes:
+        compressed = self._compressor.process(chunk)
+        return compressed + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+def new_stream(encoding: str) -> GzipStream | BrotliStream:
+    if encoding == "br":
+        return BrotliStream(settings.brotli_quality)
+    return GzipStream(settings.gzip_level)
+
+
+def is_excluded(media_type: str) -> bool:
+    return media_type in EXCLUDED_CONTENT_TYPES or media_type.partition("/")[0] in EXCLUDED_TOP_LEVEL_TYPES
+
+
+class CompressionResponder:
+    """
+    Compresses one response with `encoding`, or only adds Vary when it is None.
+
+    The start message is held until the first body chunk: a single body under
+    `minimum_size` goes out as-is, anything larger or streamed is compressed
+    chunk by chunk. Chunks of THREAD_MIN_SIZE or more are compressed in a worker
+    thread so they do not stall the event loop.
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str | None, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.passthrough = False
+        self.stream: GzipStream | BrotliStream | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = "content-encoding" in headers or message["status"] == 206 or is_excluded(media_type)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            # Trailers, early hints and pathsend (a file on disk) are never compressed
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is not None and (more_body or len(body) >= self.minimum_size):
+                self.stream = new_stream(self.encoding)
+                body = await self.compress(body, more_body)
+                headers["Content-Encoding"] = self.encoding
+                del headers["Content-Length"]
+                if not more_body and not start.get("trailers", False):
+                    headers["Content-Length"] = str(len(body))
+            await self.send(start)
+        elif self.stream is not None:
+            body = await self.compress(body, more_body)
+        await self.send({**message, "body": body})
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MIN_SIZE:
+            return await anyio.to_thread.run_sync(self.stream.compress, body, more_body)
+        return self.stream.compress(body, more_body)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated response compression: brotli when installed and accepted, else gzip.
+
+    Bodies under COMPRESSION_MIN_SIZE go out as-is (health checks, single rows).
+    Streaming responses are compressed chunk by chunk. Event streams, media and
+    responses that already carry a Content-Encoding are passed through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.available = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""), self.available)
+        # No encoding still adds Vary, so caches keep compressed and identity bodies apart
+        await CompressionResponder(self.app, encoding, settings.compression_min_size)(scope, receive, send)
@@ -14,10 +14,60 @@ class Settings(BaseSettings):
     )
 
     database_url: str = Field(..., alias="DATABASE_URL")
+    # Connection pool (PostgreSQL; SQLite keeps SQLAlchemy's defaults). Recycle -1 = never
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, alias="DB_POOL_RECYCLE")
+    # True: test each connection on checkout (SELECT 1). False: rely on recycle and
+    # disconnect detection, one round trip cheaper per checkout
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    # Async endpoints; derived from DATABASE_URL (psycopg2 -> asyncpg, sqlite -> aiosqlite) when unset
+    async_database_url: str | None = Field(None, alias="ASYNC_DATABASE_URL")
+    # Optional read replica for GET requests; unset = everything goes to the primary.
+    # The async URL is derived from READ_DATABASE_URL like the primary's
+    read_database_url: str | None = Field(None, alias="READ_DATABASE_URL")
+    async_read_database_url: str | None = Field(None, alias="ASYNC_READ_DATABASE_URL")
     secret_key: str = Field(..., alias="SECRET_KEY")
     algorithm: str = Field("HS256", alias="ALGORITHM")
     access_token_expire_minutes: int = Field(60, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    refresh_token_expire_days: int = Field(7, alias="REFRESH_TOKEN_EXPIRE_DAYS")
+    # How often each worker pulls new rows from revoked_tokens
+    revocation_sync_seconds: int = Field(5, alias="REVOCATION_SYNC_SECONDS")
+    # How often (at most) a revocation also deletes expired revoked_tokens rows
+    revocation_prune_seconds: int = Field(3600, alias="REVOCATION_PRUNE_SECONDS")
     cors_origins: List[str] = Field(default_factory=list, alias="CORS_ORIGINS")
+    # Per-worker autocomplete index: rebuilt at most this often to pick up other workers' writes
+    search_index_ttl_seconds: int = Field(60, alias="SEARCH_INDEX_TTL_SECONDS")
+    # bcrypt runs in its own process pool; logins beyond max_pending get 503
+    bcrypt_rounds: int = Field(12, alias="BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(16, alias="PASSWORD_HASH_MAX_PENDING")
+    # Authenticated principals are re-read from the database at most this often per worker
+    principal_cache_ttl_seconds: int = Field(60, alias="PRINCIPAL_CACHE_TTL_SECONDS")
+    # Device API keys (X-API-Key) are re-read from the database at most this often per worker
+    api_key_cache_ttl_seconds: int = Field(60, alias="API_KEY_CACHE_TTL_SECONDS")
+    # ... and an unknown or revoked key is re-checked at most this often
+    api_key_miss_ttl_seconds: int = Field(5, alias="API_KEY_MISS_TTL_SECONDS")
+    # Live event stream (/events/stream)
+    events_heartbeat_seconds: int = Field(15, alias="EVENTS_HEARTBEAT_SECONDS")
+    events_retry_ms: int = Field(3000, alias="EVENTS_RETRY_MS")
+    events_queue_size: int = Field(256, alias="EVENTS_QUEUE_SIZE")
+    low_stock_threshold: float = Field(10.0, alias="LOW_STOCK_THRESHOLD")
+    # Per-request SQL stats: X-Query-Count/Server-Timing headers, and a warning when one
+    # read shape repeats more than this many times in a request (0 = never)
+    query_stats_headers: bool = Field(True, alias="QUERY_STATS_HEADERS")
+    query_repeat_warn_threshold: int = Field(10, alias="QUERY_REPEAT_WARN_THRESHOLD")
+    # Statements slower than this are logged (0 = off). On PostgreSQL a sample of slow
+    # SELECTs also logs EXPLAIN (ANALYZE, BUFFERS), at most explain_per_minute per worker
+    slow_query_ms: float = Field(500, alias="SLOW_QUERY_MS")
+    slow_query_explain_sample_rate: float = Field(0.1, alias="SLOW_QUERY_EXPLAIN_SAMPLE_RATE")
+    slow_query_explain_per_minute: int = Field(6, alias="SLOW_QUERY_EXPLAIN_PER_MINUTE")
+    # Response compression (brotli when installed, else gzip) for bodies of at least
+    # min_size bytes; streamed bodies are always compressed
+    compression_min_size: int = Field(1024, alias="COMPRESSION_MIN_SIZE")
+    gzip_level: int = Field(6, alias="GZIP_LEVEL")
+    brotli_quality: int = Field(4, alias="BROTLI_QUALITY")
 
     @field_validator("cors_origins", mode="before")
     @classmethod
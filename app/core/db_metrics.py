@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+
+@dataclass
+class PoolMetrics:
+    """Counters for one connection pool, fed by a timed pool.connect() and pool events."""
+
+    name: str
+    checkouts: int = 0
+    checkins: int = 0
+    invalidations: int = 0
+    # Acquisitions: the time pool.connect() took, queueing for a free connection included
+    checkout_waits: int = 0
+    checkout_wait_ms_total: float = 0.0
+    checkout_wait_ms_max: float = 0.0
+    checkout_timeouts: int = 0
+    # New DBAPI connections opened, and how long that took
+    connects: int = 0
+    connect_ms_total: float = 0.0
+    connect_ms_max: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe_wait(self, ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkout_waits += 1
+            self.checkout_wait_ms_total += ms
+            self.checkout_wait_ms_max = max(self.checkout_wait_ms_max, ms)
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def observe_connect(self, ms: float) -> None:
+        with self._lock:
+            self.connects += 1
+            self.connect_ms_total += ms
+            self.connect_ms_max = max(self.connect_ms_max, ms)
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = {
+                "pool": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checkout_waits": self.checkout_waits,
+                "checkout_wait_ms_total": round(self.checkout_wait_ms_total, 3),
+                "checkout_wait_ms_max": round(self.checkout_wait_ms_max, 3),
+                "checkout_timeouts": self.checkout_timeouts,
+                "connects": self.connects,
+                "connect_ms_total": round(self.connect_ms_total, 3),
+                "connect_ms_max": round(self.connect_ms_max, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                in_use=pool.checkedout(),
+                idle=pool.checkedin(),
+                # negative while the pool has not yet opened pool_size connections
+                overflow=pool.overflow(),
+                timeout=pool.timeout(),
+            )
+        return data
+
+
+_registry: dict[str, tuple[Engine, PoolMetrics]] = {}
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _time_checkouts(pool: Pool, metrics: PoolMetrics) -> None:
+    """Wrap this pool's connect(): every Engine/Session checkout goes through it."""
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            connection = connect()
+        except exc.TimeoutError:
+            metrics.observe_wait(_elapsed_ms(started), timed_out=True)
+            raise
+        metrics.observe_wait(_elapsed_ms(started))
+        return connection
+
+    pool.connect = timed_connect
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """Attach metrics to an engine's pool (for an AsyncEngine pass `.sync_engine`)."""
+    metrics = PoolMetrics(name)
+    _time_checkouts(engine.pool, metrics)
+
+    @event.listens_for(engine, "engine_disposed")
+    def _disposed(engine):
+        # dispose() swaps in a new pool; pool events carry over, the wrapper must be redone
+        _time_checkouts(engine.pool, metrics)
+
+    # Opening a connection is bracketed by do_connect/connect on the same pool entry
+    # (not a thread-local: AsyncSession greenlets share their thread)
+    @event.listens_for(engine, "do_connect")
+    def _do_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started", None)
+        metrics.observe_connect(_elapsed_ms(started) if started is not None else 0.0)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.increment("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        metrics.increment("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    _registry[name] = (engine, metrics)
+    return metrics
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    return {name: metrics.snapshot(engine.pool) for name, (engine, metrics) in _registry.items()}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import threading
+from typing import Any, AsyncIterator
+
+from app.core.config import settings
+
+# Event names pushed on /events/stream
+BALANCE_CHANGED = "balance"
+LOW_STOCK = "low_stock"
+BATCH_STATUS = "batch"
+
+
+def format_sse(event_id: int, event: str, data: dict[str, Any]) -> str:
+    # Decimals and datetimes are sent as strings, like in the JSON API
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.loop = loop
+        self.queue: asyncio.Queue[str] = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def offer(self, message: str) -> None:
+        # Runs on the subscriber's loop. A client that cannot keep up is dropped
+        # (EventSource reconnects by itself) instead of buffering without bound.
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broadcaster:
+    """
+    In-process fan-out of change events to every connected stream of this worker.
+
+    Publishers are the (sync) services, running in the threadpool; each event is
+    serialized once and handed to every subscriber's event loop, so a write costs the
+    same whatever the number of clients and clients never touch the database.
+    """
+
+    def __init__(self, max_queue: int | None = None):
+        self._max_queue = max_queue or settings.events_queue_size
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        subscription = Subscription(asyncio.get_running_loop(), self._max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            if not self._subscribers:
+                return
+            subscribers = list(self._subscribers)
+            event_id = next(self._ids)
+        message = format_sse(event_id, event, data)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:  # loop already closed
+                self.unsubscribe(subscription)
+
+    async def stream(
+        self, subscription: Subscription, heartbeat_seconds: float | None = None
+    ) -> AsyncIterator[str]:
+        heartbeat = heartbeat_seconds or settings.events_heartbeat_seconds
+        try:
+            # Reconnect delay for EventSource, in whole milliseconds as the field requires
+            yield f"retry: {settings.events_retry_ms}\n\n"
+            while not subscription.overflowed:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+broadcaster = Broadcaster()
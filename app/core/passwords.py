@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hash operations are already queued."""
+
+
+@lru_cache(maxsize=4)
+def crypt_context(rounds: int) -> CryptContext:
+    # min == max == default: any hash at another work factor "needs update" and is
+    # rehashed on the next successful login, whether rounds went up or down
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# --- Run inside the pool processes (module level so they can be pickled) ---
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> tuple[bool, str | None]:
+    try:
+        return crypt_context(rounds).verify_and_update(password, hashed)
+    except ValueError:  # not a recognizable hash
+        return False, None
+
+
+class PasswordHasher:
+    """
+    bcrypt in a dedicated process pool, off the request threadpool and outside the GIL.
+
+    `max_pending` bounds queued + running verifications; past it `verify_and_update`
+    raises PasswordHasherBusy immediately so a login burst is shed (503) instead of
+    piling up. Hashing new passwords (user creation, seeds) is rare and not bounded.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.rounds = rounds
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: forking a process that already runs threads is not safe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self._workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args, bounded: bool = True) -> Future:
+        with self._lock:
+            if bounded and self._pending >= self._max_pending:
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password, self.rounds, bounded=False).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit(_verify_and_update, password, hashed, self.rounds).result()[0]
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """(valid, new_hash); new_hash is set when the stored hash uses another work factor."""
+        future = self._submit(_verify_and_update, password, hashed, self.rounds)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.user import RoleEnum, User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by endpoints: a detached snapshot, never a live ORM row."""
+
+    id: int
+    email: str
+    full_name: str | None
+    role: RoleEnum
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            created_at=user.created_at,
+        )
+
+
+class PrincipalCache:
+    """
+    Per-worker TTL cache of principals keyed by token subject (email).
+
+    Writes through the ORM invalidate the entry in this worker when they commit (see the
+    User listeners below); other workers pick up role changes or deletions within `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int = 4096):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: dict[str, tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Principal | None:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if time.monotonic() >= expires_at:
+            self.invalidate(subject)
+            return None
+        return principal
+
+    def set(self, subject: str, principal: Principal) -> None:
+        with self._lock:
+            if len(self._entries) >= self._max_entries:
+                self._entries.clear()  # simple bound; entries are cheap to reload
+            self._entries[subject] = (time.monotonic() + self._ttl_seconds, principal)
+
+    def invalidate(self, subject: str) -> None:
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache(settings.principal_cache_ttl_seconds)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_principal_stale(mapper, connection, user: User) -> None:
+    # Evicted after commit: evicting during flush would let a concurrent request
+    # re-cache the old row before the change is visible
+    session = object_session(user)
+    if session is None:
+        return
+    stale = session.info.setdefault("stale_principals", set())
+    stale.add(user.email)
+    # An email change also retires the old subject
+    stale.update(inspect(user).attrs.email.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session: Session) -> None:
+    for subject in session.info.pop("stale_principals", ()):
+        principal_cache.invalidate(subject)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_principals(session: Session) -> None:
+    session.info.pop("stale_principals", None)
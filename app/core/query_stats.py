@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.slow_queries import slow_query_log
+from app.core.text import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Statements run (and time spent in the driver) while tracking is active."""
+
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+    # ASGI scope of the request being tracked, for the endpoint in log lines
+    scope: Scope | None = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.duration += seconds
+            # Only reads: N+1 is a read pattern, and rollup upserts per written row are by design
+            if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                self.shapes[normalize_sql(statement)] += 1
+
+    @property
+    def endpoint(self) -> str | None:
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")  # set once routing has matched
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Read shapes run more than `threshold` times, most repeated first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(scope: Scope | None = None) -> Iterator[QueryStats]:
+    """Count statements issued in this context (threadpool and greenlet calls inherit it)."""
+    stats = QueryStats(scope=scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# Registered on the Engine class, so every engine (primary, replica, async) is timed.
+# The same timing feeds the per-request stats and the slow-query log.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or slow_query_log.enabled:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    slow_query_log.observe(
+        conn, statement, parameters, executemany, seconds, stats.endpoint if stats is not None else None
+    )
+
+
+class QueryStatsMiddleware:
+    """
+    Counts SQL statements per request. Adds X-Query-Count and Server-Timing (db time)
+    headers and logs a warning when one read shape repeats more than
+    QUERY_REPEAT_WARN_THRESHOLD times, which is what an N+1 loop looks like.
+
+    Headers carry the statements run before the response starts; a streamed body's
+    queries are still counted for the warning.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope) as stats:
+
+            async def send_with_stats(message: Message) -> None:
+                if message["type"] == "http.response.start" and settings.query_stats_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers.append(
+                        "Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                self._warn_repeated(stats)
+
+    def _warn_repeated(self, stats: QueryStats) -> None:
+        threshold = settings.query_repeat_warn_threshold
+        if threshold <= 0:
+            return
+        for shape, n in stats.repeated(threshold):
+            logger.warning("Possible N+1 in %s: statement ran %d times: %s", stats.endpoint, n, shape)
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Generic, Iterable, Sequence, TypeVar
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _default(value: Any) -> Any:
+    # Decimals go out as their exact string, as Pydantic does for response models
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson with exact Decimals; datetimes, enums and UUIDs are native to orjson."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for plain data (dicts, lists, rows) encoded with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RowSerializer(Generic[M]):
+    """
+    Serializes flat query rows as a list of `model` straight to JSON bytes.
+
+    Built once per schema: a TypeAdapter over a TypedDict with the model's field
+    types, so pydantic-core formats every value exactly like the response_model path
+    (Decimal as string, enums by value, ISO datetimes) but skips building and
+    validating one model per row. Rows must carry exactly the model's fields, e.g.
+    `select(*serializer.columns(Ingredient))` or columns labelled with field names.
+    """
+
+    def __init__(self, model: type[M]):
+        self.model = model
+        self.fields: tuple[str, ...] = tuple(model.model_fields)
+        row_type = TypedDict(  # type: ignore[misc]
+            f"{model.__name__}Row",
+            {name: field.annotation for name, field in model.model_fields.items()},
+        )
+        self.adapter = TypeAdapter(list[row_type])
+
+    def columns(self, entity: Any) -> list[Any]:
+        """The mapped attributes of `entity` named like the model's fields, in field order."""
+        return [getattr(entity, name) for name in self.fields]
+
+    def dump(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        """Rows in field order (as selected by `columns`)."""
+        fields = self.fields
+        return self.adapter.dump_json([dict(zip(fields, row)) for row in rows])
+
+    def response(self, rows: Iterable[Sequence[Any]], **kwargs: Any) -> Response:
+        return Response(content=self.dump(rows), media_type="application/json", **kwargs)
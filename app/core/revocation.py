@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+
+class RevocationList:
+    """
+    Per-worker set of revoked JWT ids in front of the revoked_tokens table.
+
+    The set is refreshed with one incremental query at most every `sync_seconds`,
+    so checking a token that is not revoked (nearly every request) costs no query.
+    Revocations made by this worker apply at once; other workers see them after
+    their next sync. Entries are dropped once their token has expired, and expired
+    rows are deleted from the table at most every `prune_seconds`.
+    """
+
+    # Re-read rows revoked a little before the last sync: a transaction may commit
+    # a revoked_at stamped earlier than our previous read
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self, sync_seconds: int, prune_seconds: int = 3600):
+        self._sync_seconds = sync_seconds
+        self._prune_seconds = prune_seconds
+        self._jtis: dict[str, datetime] = {}  # jti -> expires_at
+        self._synced_at: datetime | None = None  # wall clock, compared with revoked_at
+        self._next_sync = 0.0
+        self._next_prune = time.monotonic() + prune_seconds
+        self._lock = threading.Lock()
+
+    def _sync(self, db: Session) -> None:
+        if time.monotonic() < self._next_sync:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            started_at = datetime.utcnow()
+            stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > started_at)
+            if self._synced_at is not None:
+                stmt = stmt.where(RevokedToken.revoked_at >= self._synced_at - self.OVERLAP)
+            self._jtis.update(db.execute(stmt).all())
+            # An expired token is rejected by its exp claim; its entry is no longer needed
+            self._jtis = {jti: expires_at for jti, expires_at in self._jtis.items() if expires_at > started_at}
+            self._synced_at = started_at
+            self._next_sync = time.monotonic() + self._sync_seconds
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self._sync(db)
+        return jti in self._jtis
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> bool:
+        """Record a revocation; False if the token was already revoked (e.g. refresh reuse)."""
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+        if time.monotonic() >= self._next_prune:
+            # Piggybacks on a write that already goes to the primary
+            self._next_prune = time.monotonic() + self._prune_seconds
+            db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            self._jtis[jti] = expires_at
+            return False
+        self._jtis[jti] = expires_at
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jtis.clear()
+            self._synced_at = None
+            self._next_sync = 0.0
+
+revocation_list = RevocationList(settings.revocation_sync_seconds, settings.revocation_prune_seconds)
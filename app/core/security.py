@@ -1,80 +1,215 @@
 from __future__ import annotations
 
+import uuid
 from datetime import datetime, timedelta
 from typing import Any
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.api_keys import authenticate_api_key, scope_matches
 from app.core.config import settings
-from app.database import get_db
+from app.core.passwords import PasswordHasher
+from app.core.principal import Principal, principal_cache
+from app.core.revocation import revocation_list
+from app.database import get_async_db, get_db, run_sync
 from app.models.user import RoleEnum, User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    rounds=settings.bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
-def create_access_token(data: dict[str, Any], expires_delta: timedelta | None = None) -> str:
+def user_token_claims(user: User | Principal) -> dict[str, Any]:
+    # uid pins the token to this account (an email re-registered later does not match);
+    # role lets clients adapt the UI, authorization always uses the principal's current role
+    return {"sub": user.email, "uid": user.id, "role": user.role.value}
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def _encode_token(data: dict[str, Any], token_type: str, expires_delta: timedelta) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + (
-        expires_delta
-        if expires_delta is not None
-        else timedelta(minutes=settings.access_token_expire_minutes)
+    # jti identifies the token in revoked_tokens
+    to_encode.update(
+        {"exp": datetime.utcnow() + expires_delta, "jti": uuid.uuid4().hex, "type": token_type}
     )
-    to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+def create_access_token(data: dict[str, Any], expires_delta: timedelta | None = None) -> str:
+    return _encode_token(
+        data,
+        ACCESS_TOKEN,
+        expires_delta if expires_delta is not None else timedelta(minutes=settings.access_token_expire_minutes),
+    )
+
+
+def create_refresh_token(data: dict[str, Any], expires_delta: timedelta | None = None) -> str:
+    return _encode_token(
+        data,
+        REFRESH_TOKEN,
+        expires_delta if expires_delta is not None else timedelta(days=settings.refresh_token_expire_days),
+    )
+
+
+def revoke_token(db: Session, payload: dict[str, Any]) -> bool:
+    """Revoke a decoded token; False if it was already revoked or cannot be (no jti)."""
+    jti = payload.get("jti")
+    if jti is None:
+        # Tokens issued before jti existed cannot be listed; they lapse at exp
+        return False
+    return revocation_list.revoke(db, jti, datetime.utcfromtimestamp(payload["exp"]))
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str | None, db: Session, token_type: str = ACCESS_TOKEN) -> dict[str, Any]:
+    """Validated claims of a token of the given type that has not been revoked."""
+    if not token:
+        raise _credentials_exception()
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str | None = payload.get("sub")
     except JWTError as exc:
-        raise credentials_exception from exc
-
-    if email is None:
+        raise _credentials_exception() from exc
+
+    # Tokens issued before refresh tokens existed have no type and are access tokens
+    if payload.get("type", ACCESS_TOKEN) != token_type or payload.get("sub") is None:
+        raise _credentials_exception()
+    jti = payload.get("jti")
+    if jti is not None and revocation_list.is_revoked(db, jti):
+        raise _credentials_exception()
+    return payload
+
+
+def principal_from_payload(payload: dict[str, Any], db: Session) -> Principal:
+    credentials_exception = _credentials_exception()
+    email: str = payload["sub"]
+
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.set(email, principal)
+
+    uid = payload.get("uid")
+    if uid is not None and uid != principal.id:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    return principal
+
+
+def _principal_from_token(token: str | None, db: Session) -> Principal:
+    return principal_from_payload(decode_token(token, db), db)
 
-    return user
 
+def _principal_from_api_key(request: Request, key: str, db: Session) -> Principal:
+    api_key = authenticate_api_key(db, key)
+    if api_key is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
+    # Scopes name the route template ("/recipes/{recipe_id}"), not the raw URL
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    if not scope_matches(api_key.scopes, request.method, path):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API key not allowed for this endpoint",
+        )
+    return api_key.principal
+
+
+def _authenticate(request: Request, token: str | None, api_key: str | None, db: Session) -> Principal:
+    # Devices send X-API-Key, people a bearer JWT. Either way the session is only
+    # used on a cache miss, and API keys never go through bcrypt.
+    if api_key:
+        return _principal_from_api_key(request, api_key, db)
+    return _principal_from_token(token, db)
+
+
+def get_current_user(
+    request: Request,
+    token: str | None = Depends(optional_oauth2_scheme),
+    api_key: str | None = Depends(api_key_header),
+    db: Session = Depends(get_db),
+) -> Principal:
+    return _authenticate(request, token, api_key, db)
 
-def admin_only(current_user: User = Depends(get_current_user)) -> User:
-    if current_user.role != RoleEnum.ADMIN:
+
+async def get_async_current_user(
+    request: Request,
+    token: str | None = Depends(optional_oauth2_scheme),
+    api_key: str | None = Depends(api_key_header),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """get_current_user for async endpoints: shares the endpoint's AsyncSession, no threadpool hop."""
+    return await run_sync(db, lambda session: _authenticate(request, token, api_key, session))
+
+
+def get_stream_user(
+    header_token: str | None = Depends(optional_oauth2_scheme),
+    access_token: str | None = Query(None),
+    # Closed as soon as the user is loaded, so a long-lived stream does not pin a connection
+    db: Session = Depends(get_db, scope="function"),
+) -> Principal:
+    # Browsers' EventSource cannot send headers, so the token may also come as ?access_token=
+    return _principal_from_token(header_token or access_token, db)
+
+
+def _require_admin(principal: Principal) -> Principal:
+    if principal.role != RoleEnum.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required",
         )
-    return current_user
+    return principal
 
 
-def admin_or_operator(current_user: User = Depends(get_current_user)) -> User:
-    if current_user.role not in [RoleEnum.ADMIN, RoleEnum.OPERATOR]:
+def _require_admin_or_operator(principal: Principal) -> Principal:
+    if principal.role not in [RoleEnum.ADMIN, RoleEnum.OPERATOR]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin or Operator privileges required",
         )
-    return current_user
+    return principal
+
+
+def admin_only(current_user: Principal = Depends(get_current_user)) -> Principal:
+    return _require_admin(current_user)
+
+
+def admin_or_operator(current_user: Principal = Depends(get_current_user)) -> Principal:
+    return _require_admin_or_operator(current_user)
+
+
+async def async_admin_or_operator(current_user: Principal = Depends(get_async_current_user)) -> Principal:
+    return _require_admin_or_operator(current_user)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import threading
+import time
+from typing import Any, Iterator
+
+import greenlet
+
+from app.core.config import settings
+from app.core.text import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+# Frames from these modules are plumbing, not the code that asked for the query
+_PLUMBING_PREFIXES = ("app.core.query_stats", "app.core.slow_queries", "app.database", "app.models.")
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Types of the bound parameters, never their values (which may be personal data)."""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} x {parameter_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def _stack() -> Iterator[Any]:
+    """Innermost frame first. AsyncSession statements run in a greenlet, whose stack
+    stops at its start; the awaiting coroutines are on the parent greenlet's stack."""
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return
+        frame = current.gr_frame
+
+
+def calling_function() -> str | None:
+    """The innermost app function (service, endpoint or dependency) on the stack, as module:qualname."""
+    for frame in _stack():
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith(_PLUMBING_PREFIXES):
+            return f"{module}:{frame.f_code.co_qualname}"
+    return None
+
+
+class ExplainBudget:
+    """Sampling plus a per-minute cap, so EXPLAIN ANALYZE (which re-runs the query) stays rare."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window_start = 0.0
+        self._used = 0
+
+    def allow(self) -> bool:
+        if random.random() >= settings.slow_query_explain_sample_rate:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start, self._used = now, 0
+            if self._used >= settings.slow_query_explain_per_minute:
+                return False
+            self._used += 1
+            return True
+
+
+def explain_analyze(dbapi_connection: Any, statement: str, parameters: Any) -> str | None:
+    """
+    EXPLAIN (ANALYZE, BUFFERS) on the same connection and transaction, inside a savepoint
+    so a failing EXPLAIN cannot abort the caller's transaction.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            logger.debug("EXPLAIN failed for slow query", exc_info=True)
+            return None
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than SLOW_QUERY_MS with their shape, bound-parameter types,
+    endpoint and calling function. On PostgreSQL a sample of slow SELECTs also gets
+    its EXPLAIN (ANALYZE, BUFFERS) plan, within ExplainBudget.
+    """
+
+    def __init__(self):
+        self.explain_budget = ExplainBudget()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.slow_query_ms > 0
+
+    def observe(
+        self,
+        conn,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        seconds: float,
+        endpoint: str | None,
+    ) -> None:
+        if not self.enabled or seconds * 1000 < settings.slow_query_ms:
+            return
+        message = "Slow query (%.1f ms) in %s via %s: %s | params %s"
+        args: list[Any] = [
+            seconds * 1000,
+            endpoint or "-",
+            calling_function() or "-",
+            normalize_sql(statement),
+            parameter_shape(parameters, executemany),
+        ]
+        if (
+            conn.dialect.name == "postgresql"
+            and not executemany
+            # ANALYZE executes the statement again: plain SELECTs only, never a write
+            and statement.lstrip().upper().startswith("SELECT")
+            and self.explain_budget.allow()
+        ):
+            plan = explain_analyze(conn.connection.dbapi_connection, statement, parameters)
+            if plan:
+                message += "\n%s"
+                args.append(plan)
+        logger.warning(message, *args)
+
+slow_query_log = SlowQueryLog()
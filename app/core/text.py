@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\?|%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_search_text(value: str | None) -> str:
+    """
+    Lowercase, accent-free form used for search: "Óleo  Essencial" -> "oleo essencial".
+    Stored alongside names so both the database and the in-memory index compare the same text.
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Statement "shape": literals and placeholders become ?, IN lists collapse to (?)
+    and whitespace is squeezed, so the same query with other values compares equal.
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return " ".join(shape.split())
@@ -1,19 +1,157 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Any, AsyncGenerator, Callable, TypeVar
+
+from fastapi import Request
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.core.config import settings
+from app.core.db_metrics import instrument_engine
+
+
+def pool_options(url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": settings.db_pool_pre_ping}
+    if make_url(url).get_backend_name() == "sqlite":
+        return options  # file/memory databases use SQLAlchemy's own pool choice
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    return options
+
+
+# Requests that never write; their sessions read from the replica when one is configured
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+class RoutingSession(Session):
+    """
+    Session bound to the primary that reads from `replica_bind` when opened with
+    `use_replica=True`.
+
+    The first write (a flush or an INSERT/UPDATE/DELETE statement) pins the session
+    to the primary for the rest of its life, so it reads its own writes instead of
+    a replica that may not have them yet.
+    """
+
+    def __init__(self, *args: Any, replica_bind: Engine | None = None, use_replica: bool = False, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+        self.use_replica = use_replica and replica_bind is not None
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def get_bind(self, mapper=None, *, clause=None, **kwargs: Any):
+        if self.use_replica:
+            if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+                self.use_replica = False
+            else:
+                return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+engine = create_engine(settings.database_url, **pool_options(settings.database_url))
+instrument_engine(engine, "primary")
+
+read_engine: Engine | None = None
+if settings.read_database_url:
+    read_engine = create_engine(settings.read_database_url, **pool_options(settings.read_database_url))
+    instrument_engine(read_engine, "replica")
+
+# Scripts and workers get primary sessions; request sessions come from get_db
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replica_bind=read_engine
+)
 
 Base = declarative_base()
 
+T = TypeVar("T")
+
+# Async driver per backend, used when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
 
-def get_db():
-    db = SessionLocal()
+
+@event.listens_for(Base.metadata, "before_create")
+def create_extensions(target, connection, **kw):
+    # pg_trgm backs the name search indexes (gin_trgm_ops)
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+def get_db(request: Request):
+    db = SessionLocal(use_replica=request.method in READ_METHODS)
     try:
         yield db
     finally:
         db.close()
+
+
+# --- Async stack ---
+# Created on first use so scripts and the sync path never need asyncpg/aiosqlite installed.
+_async_engine: AsyncEngine | None = None
+_async_read_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        url = settings.async_database_url or to_async_url(settings.database_url)
+        _async_engine = create_async_engine(url, **pool_options(url))
+        instrument_engine(_async_engine.sync_engine, "async")
+    return _async_engine
+
+
+def get_async_read_engine() -> AsyncEngine | None:
+    global _async_read_engine
+    if _async_read_engine is None and settings.read_database_url:
+        url = settings.async_read_database_url or to_async_url(settings.read_database_url)
+        _async_read_engine = create_async_engine(url, **pool_options(url))
+        instrument_engine(_async_read_engine.sync_engine, "async_replica")
+    return _async_read_engine
+
+
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    global _async_session_factory
+    if _async_session_factory is None:
+        read_engine = get_async_read_engine()
+        # Loaded attributes stay usable after commit: lazy loads are not possible outside run_sync
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(),
+            sync_session_class=RoutingSession,
+            replica_bind=read_engine.sync_engine if read_engine is not None else None,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_session_factory
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_factory()(use_replica=request.method in READ_METHODS) as db:
+        yield db
+
+
+async def run_sync(db: AsyncSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run sync service code (which takes a Session first) on an AsyncSession.
+
+    The code runs in a greenlet on the event loop; every statement it issues goes
+    through the async driver, so it never blocks a thread. Lazy loads work inside,
+    so responses that touch relationships should be built inside `fn` too.
+    """
+
+    def call(session: Session) -> T:
+        return fn(session, *args, **kwargs)
+
+    return await db.run_sync(call)
@@ -1,14 +1,20 @@
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import exc
 
 from app.api.api_v1.api import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.query_stats import QueryStatsMiddleware
 
 logging.basicConfig(level=logging.INFO)
 
 app = FastAPI(title="Solidifica Ops Backend")
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 if settings.cors_origins:
     app.add_middleware(
@@ -19,4 +25,15 @@ if settings.cors_origins:
         allow_headers=["*"],
     )
 
+
+@app.exception_handler(exc.TimeoutError)
+async def pool_timeout_handler(request: Request, error: exc.TimeoutError) -> JSONResponse:
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT: shed the request
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database busy, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(api_router, prefix="/api/v1")
@@ -0,0 +1,112 @@
+"""
+Idempotent schema upgrade for databases created before the current models.
+
+`create_all` only creates missing tables, so columns, nullability changes and
+constraints added to existing tables are applied here, along with the data the
+new columns need. Every step checks the live schema first and can be re-run safely.
+"""
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import bindparam, inspect, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from app import models  # noqa: F401
+from app.core.text import normalize_search_text
+from app.database import Base
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe, RecipeItem
+
+logger = logging.getLogger(__name__)
+
+# (table, column, DDL type) added to tables that already existed
+ADDED_COLUMNS = (
+    ("ingredients", "search_name", "VARCHAR"),
+    ("recipes", "search_name", "VARCHAR"),
+    ("batches", "produced_at", "TIMESTAMP"),
+    ("recipe_items", "sub_recipe_id", "INTEGER REFERENCES recipes (id)"),
+)
+
+RECIPE_ITEM_CONSTRAINTS = {
+    "uq_recipe_sub_recipe": "UNIQUE (recipe_id, sub_recipe_id)",
+    "ck_recipe_item_single_source": "CHECK ((ingredient_id IS NULL) <> (sub_recipe_id IS NULL))",
+}
+
+
+def _columns(conn: Connection, table: str) -> dict[str, dict]:
+    return {column["name"]: column for column in inspect(conn).get_columns(table)}
+
+
+def _add_columns(conn: Connection) -> None:
+    for table, column, ddl in ADDED_COLUMNS:
+        if column not in _columns(conn, table):
+            logger.info("Adding %s.%s", table, column)
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _rebuild_recipe_items_sqlite(conn: Connection) -> None:
+    """SQLite cannot alter a column or add constraints: copy into a fresh table."""
+    logger.info("Rebuilding recipe_items for sub-recipes")
+    for index in inspect(conn).get_indexes("recipe_items"):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index['name']}")
+    conn.exec_driver_sql("ALTER TABLE recipe_items RENAME TO recipe_items_old")
+    RecipeItem.__table__.create(conn)
+    columns = ", ".join(_columns(conn, "recipe_items_old"))
+    conn.exec_driver_sql(f"INSERT INTO recipe_items ({columns}) SELECT {columns} FROM recipe_items_old")
+    conn.exec_driver_sql("DROP TABLE recipe_items_old")
+
+
+def _upgrade_recipe_items(conn: Connection) -> None:
+    # Sub-recipe items have no ingredient: ingredient_id became nullable
+    if conn.dialect.name == "sqlite":
+        if not _columns(conn, "recipe_items")["ingredient_id"]["nullable"]:
+            _rebuild_recipe_items_sqlite(conn)
+        return
+    if not _columns(conn, "recipe_items")["ingredient_id"]["nullable"]:
+        conn.exec_driver_sql("ALTER TABLE recipe_items ALTER COLUMN ingredient_id DROP NOT NULL")
+    inspector = inspect(conn)
+    existing = {c["name"] for c in inspector.get_unique_constraints("recipe_items")}
+    existing |= {c["name"] for c in inspector.get_check_constraints("recipe_items")}
+    for name, ddl in RECIPE_ITEM_CONSTRAINTS.items():
+        if name not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE recipe_items ADD CONSTRAINT {name} {ddl}")
+
+
+def backfill_search_names(conn: Connection, batch_size: int = 1000) -> int:
+    """
+    Fill search_name for rows written before it existed (the ORM hook only runs on
+    insert/update). Normalized in Python, like the hook, so both sides match exactly.
+    """
+    filled = 0
+    for table in (Ingredient.__table__, Recipe.__table__):
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            # Keep updated_at: the rows themselves did not change
+            .values(search_name=bindparam("normalized"), updated_at=table.c.updated_at)
+        )
+        while True:
+            rows = conn.execute(
+                select(table.c.id, table.c.name).where(table.c.search_name.is_(None)).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            conn.execute(stmt, [{"row_id": id_, "normalized": normalize_search_text(name)} for id_, name in rows])
+            filled += len(rows)
+    return filled
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Bring every table to the current models: tables, columns, constraints, then indexes."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        _add_columns(conn)
+        _upgrade_recipe_items(conn)
+        backfill_search_names(conn)
+    # Indexes last: some cover the columns added above
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
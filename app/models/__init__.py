@@ -1,7 +1,12 @@
+from app.models.api_key import ApiKey
 from app.models.batch import Batch, BatchConsumption, BatchStatusEnum
+from app.models.data_version import DataVersion
 from app.models.ingredient import Ingredient, UnitEnum
+from app.models.ingredient_price import IngredientPrice
 from app.models.inventory import InventoryMovement, MovementTypeEnum
 from app.models.recipe import Recipe, RecipeItem
+from app.models.revoked_token import RevokedToken
+from app.models.rollup import InventoryBalance, InventoryDailyRollup, ProductionDailyRollup
 from app.models.user import RoleEnum, User
 
 __all__ = [
@@ -9,6 +14,7 @@ __all__ = [
     "User",
     "Ingredient",
     "UnitEnum",
+    "IngredientPrice",
     "InventoryMovement",
     "MovementTypeEnum",
     "Recipe",
@@ -16,4 +22,10 @@ __all__ = [
     "Batch",
     "BatchConsumption",
     "BatchStatusEnum",
+    "InventoryBalance",
+    "InventoryDailyRollup",
+    "ProductionDailyRollup",
+    "DataVersion",
+    "RevokedToken",
+    "ApiKey",
 ]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database import Base
+from app.models.user import RoleEnum, User
+
+
+class ApiKey(Base):
+    """Long-lived credential for devices. Only an HMAC of the key is stored."""
+
+    __tablename__ = "api_keys"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    # Public part of the key, used to find the row without scanning hashes
+    prefix: Mapped[str] = mapped_column(String(16), unique=True, index=True, nullable=False)
+    key_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Requests are made on behalf of this user (e.g. InventoryMovement.created_by)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum), nullable=False, default=RoleEnum.OPERATOR)
+    # One "METHOD /path" per line, the route template below /api/v1 ("*" matches any method)
+    scopes: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    user: Mapped[User] = relationship("User")
+
+    @property
+    def scope_list(self) -> list[str]:
+        return [scope for scope in self.scopes.splitlines() if scope]
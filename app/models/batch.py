@@ -3,7 +3,7 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, Numeric, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -38,6 +38,8 @@ class Batch(Base):
     
     created_by: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Set when the batch is produced; analytics and rollups bucket on it (created_at for older rows)
+    produced_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
@@ -49,6 +51,12 @@ class Batch(Base):
         "BatchConsumption", back_populates="batch", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # Batches by status in creation order; also serves the analytics fallback for
+        # produced rows without produced_at (status = PRODUCED, created_at range)
+        Index("idx_batches_status_created", "status", "created_at"),
+    )
+
 
 class BatchConsumption(Base):
     __tablename__ = "batch_consumptions"
@@ -66,4 +74,6 @@ class BatchConsumption(Base):
 
     __table_args__ = (
         UniqueConstraint("batch_id", "ingredient_id", name="uq_batch_consumption_ingredient"),
+        # Consumption per ingredient; the unique constraint leads with batch_id
+        Index("idx_batch_consumptions_ingredient", "ingredient_id"),
     )
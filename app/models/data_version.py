@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Integer, String, event, func, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapped, Session, mapped_column, object_session
+
+from app.database import Base
+from app.models.batch import Batch, BatchStatusEnum
+from app.models.ingredient import Ingredient
+from app.models.inventory import InventoryMovement
+from app.models.rollup import upsert_increment
+
+# Bumped after every commit that changed stock, value, production or low-stock figures
+INVENTORY_VERSION = "inventory"
+
+# Ingredient columns the dashboard figures read (value, alerts)
+_DASHBOARD_INGREDIENT_FIELDS = ("cost_per_unit", "name", "unit", "active")
+
+
+class DataVersion(Base):
+    """Monotonic counters that response caches key on; shared by all workers."""
+
+    __tablename__ = "data_versions"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+def get_data_version(db: Session, name: str) -> int:
+    return db.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar() or 0
+
+
+def get_table_stamp(db: Session, model) -> tuple[int, datetime | None]:
+    """
+    Row count and latest updated_at of a table that tracks its own updates: changes
+    whenever a row is added, removed or modified, so it can stand in for a version.
+    """
+    count, last_modified = db.execute(select(func.count(), func.max(model.updated_at))).one()
+    return count, last_modified
+
+
+def _mark_inventory_changed(connection: Connection, target) -> None:
+    # Bumped once per transaction after commit, never inside the writer's transaction:
+    # the single version row would otherwise serialize every stock write until commit
+    session = object_session(target)
+    if session is not None:
+        session.info["inventory_version_engine"] = connection.engine
+
+
+@event.listens_for(InventoryMovement, "after_insert")
+def _movement_inserted(mapper, connection: Connection, target) -> None:
+    _mark_inventory_changed(connection, target)
+
+
+# Planned batches do not count until produced (same rule as the production rollup)
+@event.listens_for(Batch, "after_insert")
+def _batch_inserted(mapper, connection: Connection, target: Batch) -> None:
+    if target.status == BatchStatusEnum.PRODUCED:
+        _mark_inventory_changed(connection, target)
+
+
+@event.listens_for(Batch, "after_update")
+def _batch_updated(mapper, connection: Connection, target: Batch) -> None:
+    if BatchStatusEnum.PRODUCED in inspect(target).attrs.status.history.added:
+        _mark_inventory_changed(connection, target)
+
+
+@event.listens_for(Ingredient, "after_insert")
+def _ingredient_inserted(mapper, connection: Connection, target) -> None:
+    _mark_inventory_changed(connection, target)
+
+
+@event.listens_for(Ingredient, "after_update")
+def _ingredient_updated(mapper, connection: Connection, target) -> None:
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _DASHBOARD_INGREDIENT_FIELDS):
+        _mark_inventory_changed(connection, target)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_inventory_version(session: Session) -> None:
+    engine = session.info.pop("inventory_version_engine", None)
+    if engine is not None:
+        with engine.begin() as connection:
+            upsert_increment(connection, DataVersion, keys={"name": INVENTORY_VERSION}, increments={"version": 1})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_inventory_change(session: Session) -> None:
+    session.info.pop("inventory_version_engine", None)
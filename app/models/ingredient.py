@@ -3,9 +3,10 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, Enum, Integer, Numeric, String
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Boolean, DateTime, Enum, Index, Integer, Numeric, String, text
+from sqlalchemy.orm import Mapped, mapped_column, validates
 
+from app.core.text import normalize_search_text
 from app.database import Base
 
 
@@ -20,6 +21,8 @@ class Ingredient(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    # Accent-free lowercase copy of name, kept in sync by _sync_search_name
+    search_name: Mapped[str | None] = mapped_column(String, nullable=True)
     unit: Mapped[UnitEnum] = mapped_column(Enum(UnitEnum), nullable=False)
     cost_per_unit: Mapped[float] = mapped_column(Numeric(10, 4), default=0.0)
     supplier_name: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -28,3 +31,25 @@ class Ingredient(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+
+    __table_args__ = (
+        # Trigram GIN index serves LIKE '%term%' on PostgreSQL (plain index elsewhere)
+        Index(
+            "idx_ingredients_search_name_trgm",
+            "search_name",
+            postgresql_using="gin",
+            postgresql_ops={"search_name": "gin_trgm_ops"},
+        ),
+        # Catalog, balances and low-stock alerts only ever list active ingredients
+        Index(
+            "idx_ingredients_active",
+            "id",
+            postgresql_where=text("active = true"),
+            sqlite_where=text("active = 1"),
+        ),
+    )
+
+    @validates("name")
+    def _sync_search_name(self, key: str, value: str) -> str:
+        self.search_name = normalize_search_text(value)
+        return value
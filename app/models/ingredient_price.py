@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class IngredientPrice(Base):
+    """Append-only history of Ingredient.cost_per_unit; one row per cost change."""
+
+    __tablename__ = "ingredient_prices"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id"), nullable=False)
+    cost_per_unit: Mapped[float] = mapped_column(Numeric(10, 4), nullable=False)
+    effective_from: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+
+    __table_args__ = (
+        Index("idx_ingredient_prices_ingredient_effective", "ingredient_id", "effective_from"),
+    )
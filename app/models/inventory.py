@@ -35,4 +35,6 @@ class InventoryMovement(Base):
 
     __table_args__ = (
         Index("idx_inventory_ingredient_created", "ingredient_id", "created_at"),
+        # Unfiltered movement feed (newest first)
+        Index("idx_inventory_created", "created_at"),
     )
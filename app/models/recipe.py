@@ -3,9 +3,20 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, Numeric, String, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    CheckConstraint,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
+from app.core.text import normalize_search_text
 from app.database import Base
 from app.models.ingredient import Ingredient, UnitEnum
 from app.models.user import User
@@ -16,6 +27,8 @@ class Recipe(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    # Accent-free lowercase copy of name, kept in sync by _sync_search_name
+    search_name: Mapped[str | None] = mapped_column(String, nullable=True)
     yield_quantity: Mapped[float] = mapped_column(Numeric(10, 4), nullable=False, default=1.0)
     yield_unit: Mapped[UnitEnum] = mapped_column(Enum(UnitEnum), nullable=False, default=UnitEnum.un)
     notes: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -25,7 +38,27 @@ class Recipe(Base):
     )
 
     # Relationships
-    items: Mapped[list["RecipeItem"]] = relationship("RecipeItem", back_populates="recipe", cascade="all, delete-orphan")
+    items: Mapped[list["RecipeItem"]] = relationship(
+        "RecipeItem",
+        back_populates="recipe",
+        cascade="all, delete-orphan",
+        foreign_keys="RecipeItem.recipe_id",
+    )
+
+    __table_args__ = (
+        # Trigram GIN index serves LIKE '%term%' on PostgreSQL (plain index elsewhere)
+        Index(
+            "idx_recipes_search_name_trgm",
+            "search_name",
+            postgresql_using="gin",
+            postgresql_ops={"search_name": "gin_trgm_ops"},
+        ),
+    )
+
+    @validates("name")
+    def _sync_search_name(self, key: str, value: str) -> str:
+        self.search_name = normalize_search_text(value)
+        return value
 
 
 class RecipeItem(Base):
@@ -33,14 +66,26 @@ class RecipeItem(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     recipe_id: Mapped[int] = mapped_column(ForeignKey("recipes.id"), nullable=False)
-    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id"), nullable=False)
+    # Exactly one of ingredient_id / sub_recipe_id is set.
+    # A sub-recipe (e.g. a soap base) is an intermediate product; its quantity is in its yield_unit.
+    ingredient_id: Mapped[int | None] = mapped_column(ForeignKey("ingredients.id"), nullable=True)
+    sub_recipe_id: Mapped[int | None] = mapped_column(ForeignKey("recipes.id"), nullable=True)
     quantity: Mapped[float] = mapped_column(Numeric(10, 4), nullable=False)
     waste_factor: Mapped[float] = mapped_column(Numeric(10, 4), default=0.0)
 
     # Relationships
-    recipe: Mapped[Recipe] = relationship("Recipe", back_populates="items")
-    ingredient: Mapped[Ingredient] = relationship("Ingredient")
+    recipe: Mapped[Recipe] = relationship("Recipe", back_populates="items", foreign_keys=[recipe_id])
+    ingredient: Mapped[Ingredient | None] = relationship("Ingredient")
+    sub_recipe: Mapped[Recipe | None] = relationship("Recipe", foreign_keys=[sub_recipe_id])
 
     __table_args__ = (
         UniqueConstraint("recipe_id", "ingredient_id", name="uq_recipe_ingredient"),
+        UniqueConstraint("recipe_id", "sub_recipe_id", name="uq_recipe_sub_recipe"),
+        CheckConstraint(
+            "(ingredient_id IS NULL) <> (sub_recipe_id IS NULL)",
+            name="ck_recipe_item_single_source",
+        ),
+        # Reverse lookups ("where used"); the unique constraints lead with recipe_id
+        Index("idx_recipe_items_ingredient", "ingredient_id"),
+        Index("idx_recipe_items_sub_recipe", "sub_recipe_id"),
     )
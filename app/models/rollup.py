@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.batch import Batch, BatchStatusEnum
+from app.models.ingredient import Ingredient
+from app.models.inventory import InventoryMovement, MovementTypeEnum
+
+
+class InventoryBalance(Base):
+    """Current stock per ingredient, maintained on every movement insert."""
+
+    __tablename__ = "inventory_balances"
+
+    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id"), primary_key=True)
+    quantity: Mapped[Decimal] = mapped_column(Numeric(14, 4), nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class InventoryDailyRollup(Base):
+    """Net stock and value movement per ingredient and day (value at the movement's unit cost)."""
+
+    __tablename__ = "inventory_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    ingredient_id: Mapped[int] = mapped_column(ForeignKey("ingredients.id"), primary_key=True)
+    quantity_delta: Mapped[Decimal] = mapped_column(Numeric(14, 4), nullable=False, default=0)
+    value_delta: Mapped[Decimal] = mapped_column(Numeric(14, 4), nullable=False, default=0)
+
+
+class ProductionDailyRollup(Base):
+    """Produced batches, units and cost per recipe and day (day of Batch.produced_at)."""
+
+    __tablename__ = "production_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    recipe_id: Mapped[int] = mapped_column(ForeignKey("recipes.id"), primary_key=True)
+    batches: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    units: Mapped[Decimal] = mapped_column(Numeric(14, 4), nullable=False, default=0)
+    cost: Mapped[Decimal] = mapped_column(Numeric(14, 4), nullable=False, default=0)
+
+
+def upsert_increment(connection: Connection, model, keys: dict, increments: dict, **values) -> None:
+    """
+    INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col.
+    Atomic, so concurrent writers never lose an increment.
+    """
+    table = model.__table__
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+    else:
+        raise NotImplementedError(f"Rollups are not supported on {dialect}")
+
+    stmt = stmt.values(**keys, **increments, **values)
+    set_ = {column: table.c[column] + stmt.excluded[column] for column in increments}
+    set_.update({column: stmt.excluded[column] for column in values})
+    connection.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=set_))
+
+
+# --- Maintenance hooks ---
+# Mapper events run inside the flush, on the same connection and transaction as the
+# write itself, so rollups commit or roll back together with the movement/batch.
+@event.listens_for(InventoryMovement, "after_insert")
+def _apply_movement(mapper, connection: Connection, movement: InventoryMovement) -> None:
+    quantity = Decimal(movement.quantity)
+    if movement.type == MovementTypeEnum.OUT:
+        quantity = -quantity
+
+    unit_cost = movement.unit_cost_at_time
+    if unit_cost is None:
+        unit_cost = connection.execute(
+            select(Ingredient.cost_per_unit).where(Ingredient.id == movement.ingredient_id)
+        ).scalar()
+    value = quantity * Decimal(unit_cost or 0)
+
+    upsert_increment(
+        connection,
+        InventoryBalance,
+        keys={"ingredient_id": movement.ingredient_id},
+        increments={"quantity": quantity},
+        updated_at=datetime.utcnow(),
+    )
+    upsert_increment(
+        connection,
+        InventoryDailyRollup,
+        keys={"day": movement.created_at.date(), "ingredient_id": movement.ingredient_id},
+        increments={"quantity_delta": quantity, "value_delta": value},
+    )
+
+
+def _apply_production(connection: Connection, batch: Batch) -> None:
+    produced_at = batch.produced_at or batch.created_at
+    upsert_increment(
+        connection,
+        ProductionDailyRollup,
+        keys={"day": produced_at.date(), "recipe_id": batch.recipe_id},
+        increments={
+            "batches": 1,
+            "units": Decimal(batch.actual_units or 0),
+            "cost": Decimal(batch.cost_snapshot_total or 0),
+        },
+    )
+
+
+@event.listens_for(Batch, "after_insert")
+def _apply_inserted_batch(mapper, connection: Connection, batch: Batch) -> None:
+    if batch.status == BatchStatusEnum.PRODUCED:
+        _apply_production(connection, batch)
+
+
+@event.listens_for(Batch, "after_update")
+def _apply_updated_batch(mapper, connection: Connection, batch: Batch) -> None:
+    history = inspect(batch).attrs.status.history
+    if BatchStatusEnum.PRODUCED in history.added and BatchStatusEnum.PRODUCED not in history.deleted:
+        _apply_production(connection, batch)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List
+
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator
+
+from app.core.api_keys import normalize_scope_path
+from app.models.user import RoleEnum
+
+METHODS = {"*", "GET", "POST", "PUT", "PATCH", "DELETE"}
+
+
+class ApiKeyCreate(BaseModel):
+    name: str
+    # Defaults to the admin creating the key
+    user_id: int | None = None
+    role: RoleEnum = RoleEnum.OPERATOR
+    # Route templates below /api/v1; a leading /api/v1 is accepted and dropped
+    scopes: List[str] = Field(..., min_length=1, examples=[["POST /inventory/movements"]])
+
+    @field_validator("scopes")
+    @classmethod
+    def check_scopes(cls, scopes: List[str]) -> List[str]:
+        normalized = []
+        for scope in scopes:
+            method, _, path = scope.strip().partition(" ")
+            if method.upper() not in METHODS or not path.startswith("/"):
+                raise ValueError(f"Invalid scope '{scope}', expected 'METHOD /path'")
+            normalized.append(f"{method.upper()} {normalize_scope_path(path)}")
+        return normalized
+
+
+class ApiKeyResponse(BaseModel):
+    id: int
+    name: str
+    prefix: str
+    user_id: int
+    role: RoleEnum
+    scopes: List[str] = Field(validation_alias=AliasChoices("scope_list", "scopes"))
+    active: bool
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ApiKeyCreated(ApiKeyResponse):
+    # Returned once at creation; only its hash is kept
+    key: str
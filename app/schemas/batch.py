@@ -38,6 +38,7 @@ class BatchResponse(BaseModel):
     cost_snapshot_total: Decimal | None = None
     cost_snapshot_per_unit: Decimal | None = None
     created_at: datetime
+    produced_at: datetime | None = None
     consumptions: List[BatchConsumptionSchema] = []
 
     model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import List
 
@@ -17,3 +17,26 @@ class LowStockAlert(BaseModel):
     current_balance: Decimal
     unit: str
     # threshold: Decimal # Optional
+
+
+class ProductionPoint(BaseModel):
+    period: date
+    batches: int
+    # Units produced; with group_by=ingredient, quantity of the ingredient consumed
+    units: Decimal
+    cost: Decimal
+
+
+class ProductionSeries(BaseModel):
+    key: int | None = None  # recipe_id / ingredient_id, None when not grouped
+    name: str | None = None
+    points: List[ProductionPoint]
+
+
+class ProductionAnalyticsResponse(BaseModel):
+    granularity: str
+    group_by: str
+    date_from: date
+    date_to: date
+    periods: List[date]
+    series: List[ProductionSeries]
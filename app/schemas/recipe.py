@@ -4,21 +4,30 @@ from datetime import datetime
 from decimal import Decimal
 from typing import List
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from app.models.ingredient import UnitEnum
 
 
 # --- Recipe Item Schemas ---
 class RecipeItemCreate(BaseModel):
-    ingredient_id: int
+    # Either a raw ingredient or another recipe used as an intermediate product
+    ingredient_id: int | None = None
+    sub_recipe_id: int | None = None
     quantity: Decimal
     waste_factor: Decimal = Decimal(0)
 
+    @model_validator(mode="after")
+    def check_single_source(self) -> "RecipeItemCreate":
+        if (self.ingredient_id is None) == (self.sub_recipe_id is None):
+            raise ValueError("Provide exactly one of ingredient_id or sub_recipe_id")
+        return self
+
 
 class RecipeItemResponse(BaseModel):
     id: int
-    ingredient_id: int
+    ingredient_id: int | None = None
+    sub_recipe_id: int | None = None
     quantity: Decimal
     waste_factor: Decimal
     
@@ -58,7 +67,8 @@ class RecipeResponse(RecipeBase):
 
 # --- Cost Response Schemas ---
 class ItemCostBreakdown(BaseModel):
-    ingredient_id: int
+    ingredient_id: int | None = None
+    sub_recipe_id: int | None = None # Set for intermediate products; name/unit/cost then refer to it
     ingredient_name: str
     quantity: Decimal
     unit: str
@@ -72,4 +82,59 @@ class RecipeCostResponse(BaseModel):
     total_cost: Decimal
     cost_per_unit: Decimal
     yield_quantity: Decimal
-    breakdown: List[ItemCostBreakdown]
+    breakdown: List[ItemCostBreakdown] = []
+
+
+# --- Where Used Schemas ---
+class IngredientUsageResponse(BaseModel):
+    recipe_id: int
+    recipe_name: str
+    via_sub_recipe: bool # False when the ingredient is a direct item of the recipe
+    quantity: Decimal # Per batch (yield_quantity units), through sub-recipes, waste excluded
+    item_cost: Decimal
+    recipe_total_cost: Decimal
+    cost_share: Decimal # item_cost / recipe_total_cost
+
+
+# --- Price Simulation Schemas ---
+class PriceChange(BaseModel):
+    ingredient_id: int
+    new_cost: Decimal | None = None
+    percent_change: Decimal | None = None # +10 means a 10% increase
+
+    @model_validator(mode="after")
+    def check_single_change(self) -> "PriceChange":
+        if (self.new_cost is None) == (self.percent_change is None):
+            raise ValueError("Provide exactly one of new_cost or percent_change")
+        return self
+
+
+class PriceScenario(BaseModel):
+    name: str
+    changes: List[PriceChange]
+
+
+class SimulationRequest(BaseModel):
+    scenarios: List[PriceScenario] = Field(min_length=1)
+    include_unaffected: bool = False # Also list recipes no scenario touches
+
+
+class SimulatedRecipe(BaseModel):
+    recipe_id: int
+    recipe_name: str
+    yield_quantity: Decimal
+    base_cost: float # Gross cost (waste included) of one batch at current prices
+    base_cost_per_unit: float
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    # Aligned with SimulationResponse.recipes (columnar to keep large results compact)
+    cost_deltas: List[float]
+    cost_per_unit_deltas: List[float]
+    affected_recipes: int
+
+
+class SimulationResponse(BaseModel):
+    recipes: List[SimulatedRecipe]
+    scenarios: List[ScenarioResult]
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, ConfigDict
+
+
+class AutocompleteItem(BaseModel):
+    id: int
+    name: str
+
+    model_config = ConfigDict(from_attributes=True)
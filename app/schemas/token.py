@@ -6,3 +6,13 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    # Also revoke this refresh token (recommended); the access token is always revoked
+    refresh_token: str | None = None
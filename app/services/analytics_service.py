@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, and_, cast, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.batch import Batch, BatchConsumption, BatchStatusEnum
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe
+from app.schemas.dashboard import ProductionAnalyticsResponse, ProductionPoint, ProductionSeries
+
+GRANULARITIES = ("day", "week", "month")
+GROUP_BYS = ("none", "recipe", "ingredient")
+DEFAULT_PERIODS = {"day": 30, "week": 12, "month": 12}
+
+# key (recipe/ingredient id or None) -> (batches, units, cost)
+BucketValues = dict[int | None, tuple[int, Decimal, Decimal]]
+
+
+def date_bucket(column, granularity: str, dialect: str):
+    """SQL expression truncating a timestamp to the start of its day/week/month (weeks start on Monday)."""
+    if dialect == "postgresql":
+        return cast(func.date_trunc(granularity, column), Date)
+    if dialect == "sqlite":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            # next Sunday (or today if Sunday), then back to that week's Monday
+            return func.date(column, "weekday 0", "-6 days")
+        return func.date(column, "start of month")
+    raise NotImplementedError(f"Date bucketing is not supported on {dialect}")
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def shift_bucket(start: date, granularity: str, periods: int = 1) -> date:
+    if granularity == "day":
+        return start + timedelta(days=periods)
+    if granularity == "week":
+        return start + timedelta(weeks=periods)
+    months = start.year * 12 + start.month - 1 + periods
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _as_date(value) -> date:
+    # SQLite returns the bucket as 'YYYY-MM-DD'
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+class AnalyticsService:
+    # A bucket whose end is further back than this is final and cached by the worker:
+    # produced_at is stamped at production time, so nothing new can fall into it.
+    # The grace covers transactions that stamped produced_at before the boundary but commit after.
+    CLOSE_GRACE = timedelta(minutes=5)
+    MAX_PERIODS = 400
+    # LRU bound on closed buckets across granularities and groupings (a few years of each)
+    MAX_CLOSED_BUCKETS = 5000
+
+    def __init__(self, max_closed_buckets: int = MAX_CLOSED_BUCKETS):
+        self._closed: OrderedDict[tuple[str, str, date], BucketValues] = OrderedDict()
+        self._max_closed = max_closed_buckets
+        self._lock = threading.Lock()
+
+    def clear_cache(self) -> None:
+        """Drop cached closed buckets (needed after back-dated edits or a rollup rebuild)."""
+        with self._lock:
+            self._closed.clear()
+
+    def production_series(
+        self,
+        db: Session,
+        granularity: str = "day",
+        date_from: date | None = None,
+        date_to: date | None = None,
+        group_by: str = "none",
+    ) -> ProductionAnalyticsResponse:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}")
+        if group_by not in GROUP_BYS:
+            raise ValueError(f"Invalid group_by: {group_by}")
+
+        now = datetime.utcnow()
+        date_to = date_to or now.date()
+        if date_from is None:
+            date_from = shift_bucket(
+                bucket_start(date_to, granularity), granularity, 1 - DEFAULT_PERIODS[granularity]
+            )
+        if date_from > date_to:
+            raise ValueError("'from' must not be after 'to'")
+
+        # Periods are aligned to whole buckets so every bucket is either fully cached or not
+        periods = [bucket_start(date_from, granularity)]
+        while shift_bucket(periods[-1], granularity) <= date_to:
+            periods.append(shift_bucket(periods[-1], granularity))
+            if len(periods) > self.MAX_PERIODS:
+                raise ValueError(f"Range too large: more than {self.MAX_PERIODS} {granularity} periods")
+
+        values: dict[date, BucketValues] = {}
+        pending: list[date] = []
+        with self._lock:
+            for start in periods:
+                cached = self._closed.get((granularity, group_by, start))
+                if cached is None:
+                    pending.append(start)
+                else:
+                    self._closed.move_to_end((granularity, group_by, start))
+                    values[start] = cached
+
+        if pending:
+            fetched = self._query_buckets(
+                db, granularity, group_by, pending[0], shift_bucket(pending[-1], granularity)
+            )
+            closed_before = now - self.CLOSE_GRACE
+            for start in pending:
+                bucket = fetched.get(start, {})
+                values[start] = bucket
+                end = datetime.combine(shift_bucket(start, granularity), time.min)
+                if end <= closed_before:
+                    with self._lock:
+                        self._closed[(granularity, group_by, start)] = bucket
+                        while len(self._closed) > self._max_closed:
+                            self._closed.popitem(last=False)
+
+        keys = sorted({key for bucket in values.values() for key in bucket}, key=lambda k: (k is not None, k))
+        names = self._names(db, group_by, [key for key in keys if key is not None])
+        empty = (0, Decimal(0), Decimal(0))
+        series = []
+        for key in keys:
+            points = []
+            for start in periods:
+                batches, units, cost = values[start].get(key, empty)
+                points.append(ProductionPoint(period=start, batches=batches, units=units, cost=cost))
+            series.append(ProductionSeries(key=key, name=names.get(key), points=points))
+
+        return ProductionAnalyticsResponse(
+            granularity=granularity,
+            group_by=group_by,
+            date_from=periods[0],
+            date_to=date_to,
+            periods=periods,
+            series=series,
+        )
+
+    def _query_buckets(
+        self, db: Session, granularity: str, group_by: str, start: date, end: date
+    ) -> dict[date, BucketValues]:
+        start_at, end_at = datetime.combine(start, time.min), datetime.combine(end, time.min)
+        produced_at = func.coalesce(Batch.produced_at, Batch.created_at)
+        bucket = date_bucket(produced_at, granularity, db.get_bind().dialect.name).label("bucket")
+
+        if group_by == "ingredient":
+            key = BatchConsumption.ingredient_id
+            columns = (
+                func.count(func.distinct(Batch.id)),
+                func.sum(BatchConsumption.quantity_used),
+                func.sum(BatchConsumption.quantity_used * BatchConsumption.unit_cost_at_time),
+            )
+        else:
+            key = Batch.recipe_id if group_by == "recipe" else None
+            columns = (
+                func.count(Batch.id),
+                func.sum(Batch.actual_units),
+                func.sum(Batch.cost_snapshot_total),
+            )
+
+        group_columns = [bucket] if key is None else [bucket, key]
+        stmt = (
+            select(*group_columns, *columns)
+            .where(
+                Batch.status == BatchStatusEnum.PRODUCED,
+                # Spelled out (instead of filtering on the coalesce) so produced_at's index applies
+                or_(
+                    and_(Batch.produced_at >= start_at, Batch.produced_at < end_at),
+                    and_(
+                        Batch.produced_at.is_(None),
+                        Batch.created_at >= start_at,
+                        Batch.created_at < end_at,
+                    ),
+                ),
+            )
+            .group_by(*group_columns)
+        )
+        if group_by == "ingredient":
+            stmt = stmt.join(BatchConsumption, BatchConsumption.batch_id == Batch.id)
+
+        result: dict[date, BucketValues] = {}
+        for row in db.execute(stmt).all():
+            if key is None:
+                row_bucket, row_key, (batches, units, cost) = row[0], None, row[1:]
+            else:
+                row_bucket, row_key, (batches, units, cost) = row[0], row[1], row[2:]
+            result.setdefault(_as_date(row_bucket), {})[row_key] = (
+                int(batches),
+                Decimal(str(units or 0)),
+                Decimal(str(cost or 0)),
+            )
+        return result
+
+    def _names(self, db: Session, group_by: str, keys: list[int]) -> dict[int, str]:
+        if not keys:
+            return {}
+        model = Ingredient if group_by == "ingredient" else Recipe
+        rows = db.execute(select(model.id, model.name).where(model.id.in_(keys))).all()
+        return {row.id: row.name for row in rows}
+
+analytics_service = AnalyticsService()
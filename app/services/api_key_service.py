@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+from app.core.api_keys import generate_api_key, hash_api_key
+from app.models.api_key import ApiKey
+from app.models.user import User
+from app.schemas.api_key import ApiKeyCreate
+
+
+class ApiKeyService:
+    def create_api_key(self, db: Session, key_in: ApiKeyCreate, owner_id: int) -> tuple[ApiKey, str]:
+        """Returns the new row and the plain key, which is not stored anywhere."""
+        user_id = key_in.user_id if key_in.user_id is not None else owner_id
+        if db.get(User, user_id) is None:
+            raise ValueError("User not found")
+
+        prefix, key = generate_api_key()
+        api_key = ApiKey(
+            name=key_in.name,
+            prefix=prefix,
+            key_hash=hash_api_key(key),
+            user_id=user_id,
+            role=key_in.role,
+            scopes="\n".join(key_in.scopes),
+        )
+        db.add(api_key)
+        db.commit()
+        db.refresh(api_key)
+        return api_key, key
+
+    def list_api_keys(self, db: Session) -> list[ApiKey]:
+        return db.query(ApiKey).order_by(ApiKey.id).all()
+
+    def revoke_api_key(self, db: Session, api_key_id: int) -> ApiKey:
+        api_key = db.get(ApiKey, api_key_id)
+        if api_key is None:
+            raise ValueError("API key not found")
+        api_key.active = False  # invalidates the worker cache through the mapper event
+        db.commit()
+        db.refresh(api_key)
+        return api_key
+
+api_key_service = ApiKeyService()
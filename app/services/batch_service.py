@@ -5,12 +5,14 @@ from decimal import Decimal
 
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.events import BATCH_STATUS, broadcaster
 from app.models.batch import Batch, BatchConsumption, BatchStatusEnum
 from app.models.inventory import MovementTypeEnum
 from app.models.recipe import Recipe
 from app.schemas.batch import BatchCreate, BatchProduce
 from app.schemas.inventory import InventoryMovementCreate
 from app.services.inventory_service import inventory_service
+from app.services.recipe_graph import RecipeGraph
 
 
 class BatchService:
@@ -28,6 +30,7 @@ class BatchService:
         db.add(batch)
         db.commit()
         db.refresh(batch)
+        self._publish_status(batch)
         return batch
 
     def produce_batch(
@@ -43,57 +46,54 @@ class BatchService:
         # Determine actual units
         actual_units = produce_in.actual_units if produce_in.actual_units is not None else batch.planned_units
         
-        # Get Recipe Items to calculate consumption
-        # Using joinedload above on batch.recipe is inconsistent, 
-        # better to fetch recipe with items explicitly or rely on lazy load if session open.
-        # Let's verify recipe structure.
+        # Get Recipe Items to calculate consumption.
+        # Sub-recipes (intermediate products) are exploded down to leaf ingredients.
         recipe = db.query(Recipe).options(joinedload(Recipe.items)).filter(Recipe.id == batch.recipe_id).first()
         
         if not recipe or not recipe.items:
              raise ValueError("Recipe not found or has no items")
 
+        # Avoid division by zero
+        if recipe.yield_quantity <= 0:
+             raise ValueError("Recipe yield must be positive")
+
+        # Factor = Actual Produced / Recipe Yield, applied at every level of the DAG
+        # Planning says "consumo por item = item.quantity * fator * (1 + waste_factor)"
+        graph = RecipeGraph.load_subtree(db, [recipe.id])
+        requirements = graph.explode(recipe.id, actual_units)
+
         # Validation Pass: Check Stock
         stock_deductions = []
         total_cost = Decimal(0)
 
-        # Factor = Actual Produced / Recipe Yield
-        # Example: Recipe Yield 10. Produced 20. Factor = 2.
-        # Avoid division by zero
-        if recipe.yield_quantity <= 0:
-             raise ValueError("Recipe yield must be positive")
-             
-        factor = actual_units / recipe.yield_quantity
-        
-        for item in recipe.items:
-             quantity_needed = item.quantity * factor
-             # Add waste factor? (Net -> Gross) or just consumption?
-             # Planning says "consumo por item = item.quantity * fator * (1 + waste_factor)"
-             quantity_needed = quantity_needed * (1 + item.waste_factor)
-             
+        # One query for every ingredient's balance
+        balances = inventory_service.get_balances(db, list(requirements))
+        for ingredient_id, quantity_needed in requirements.items():
              # Check Balance
-             current_balance = inventory_service.get_balance(db, item.ingredient_id)
+             current_balance = balances[ingredient_id]
              if current_balance < quantity_needed:
-                  raise ValueError(f"Insufficient stock for ingredient ID {item.ingredient_id}. Need {quantity_needed}, have {current_balance}")
+                  raise ValueError(f"Insufficient stock for ingredient ID {ingredient_id}. Need {quantity_needed}, have {current_balance}")
              
              # Prepare deduction logic
              # We need current COST of ingredient to freeze it
              # In MVP, cost is fixed in Ingredient.cost_per_unit.
              # FUTURE: Weighted Average Cost.
-             unit_cost = item.ingredient.cost_per_unit
+             unit_cost = graph.ingredient_costs[ingredient_id]
              total_for_item = quantity_needed * unit_cost
              total_cost += total_for_item
              
              stock_deductions.append({
-                 "ingredient_id": item.ingredient_id,
+                 "ingredient_id": ingredient_id,
                  "quantity": quantity_needed,
                  "unit_cost": unit_cost
              })
 
-        # Execution Pass
+        # Execution Pass: everything below commits once, as one transaction
         consumptions = []
+        movements = []
         for ded in stock_deductions:
-             # Create OUT movement
-            inventory_service.create_movement(
+             # Create OUT movement (stock was checked above for all of them)
+            movement = inventory_service.add_movement(
                 db,
                 InventoryMovementCreate(
                     ingredient_id=ded["ingredient_id"],
@@ -102,8 +102,10 @@ class BatchService:
                     unit_cost_at_time=ded["unit_cost"], # Optional for OUT but good for tracking
                     note=f"Production Batch {batch.code}"
                 ),
-                user_id
+                user_id,
+                check_stock=False,
             )
+            movements.append(movement)
             
             # Create Consumption Record
             cons = BatchConsumption(
@@ -118,11 +120,27 @@ class BatchService:
         # Update Batch
         batch.status = BatchStatusEnum.PRODUCED
         batch.actual_units = actual_units
+        batch.produced_at = datetime.utcnow()
         batch.cost_snapshot_total = total_cost
         batch.cost_snapshot_per_unit = total_cost / actual_units if actual_units > 0 else 0
         
         db.commit()
         db.refresh(batch)
+        inventory_service.publish_movements(db, movements)
+        self._publish_status(batch)
         return batch
 
+    def _publish_status(self, batch: Batch) -> None:
+        broadcaster.publish(
+            BATCH_STATUS,
+            {
+                "batch_id": batch.id,
+                "code": batch.code,
+                "recipe_id": batch.recipe_id,
+                "status": batch.status.value,
+                "actual_units": batch.actual_units,
+                "cost_snapshot_total": batch.cost_snapshot_total,
+            },
+        )
+
 batch_service = BatchService()
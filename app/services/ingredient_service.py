@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.ingredient import Ingredient
+from app.models.ingredient_price import IngredientPrice
+from app.schemas.ingredient import IngredientCreate, IngredientUpdate
+from app.services.search_service import search_service
+
+
+def price_as_of_subquery(as_of: datetime, ingredient_ids):
+    """
+    Latest IngredientPrice per ingredient with effective_from <= as_of.
+    `ingredient_ids` may be a list or a SELECT; the window only ranks those ingredients,
+    which the (ingredient_id, effective_from) index serves directly.
+    """
+    ranked = (
+        select(
+            IngredientPrice.ingredient_id,
+            IngredientPrice.cost_per_unit,
+            func.row_number()
+            .over(
+                partition_by=IngredientPrice.ingredient_id,
+                order_by=(IngredientPrice.effective_from.desc(), IngredientPrice.id.desc()),
+            )
+            .label("rn"),
+        )
+        .where(
+            IngredientPrice.ingredient_id.in_(ingredient_ids),
+            IngredientPrice.effective_from <= as_of,
+        )
+        .subquery()
+    )
+    return (
+        select(ranked.c.ingredient_id, ranked.c.cost_per_unit)
+        .where(ranked.c.rn == 1)
+        .subquery("price_as_of")
+    )
+
+
+class IngredientService:
+    def create_ingredient(
+        self, db: Session, ingredient_in: IngredientCreate, user_id: int | None = None
+    ) -> Ingredient:
+        ingredient = Ingredient(**ingredient_in.model_dump())
+        db.add(ingredient)
+        db.flush()  # to get ID
+        self._record_price(db, ingredient, user_id)
+        db.commit()
+        db.refresh(ingredient)
+        search_service.invalidate_ingredients()
+        return ingredient
+
+    def update_ingredient(
+        self,
+        db: Session,
+        ingredient: Ingredient,
+        ingredient_in: IngredientUpdate,
+        user_id: int | None = None,
+    ) -> Ingredient:
+        old_cost = ingredient.cost_per_unit
+        created_at = ingredient.created_at
+        update_data = ingredient_in.model_dump(exclude_unset=True)
+        for key, value in update_data.items():
+            setattr(ingredient, key, value)
+
+        new_cost = update_data.get("cost_per_unit")
+        if new_cost is not None and Decimal(str(new_cost)) != Decimal(str(old_cost)):
+            if not self._has_price_history(db, ingredient.id):
+                # Ingredient predates the history: keep its old cost for earlier dates
+                db.add(
+                    IngredientPrice(
+                        ingredient_id=ingredient.id,
+                        cost_per_unit=old_cost,
+                        effective_from=created_at or datetime.min,
+                    )
+                )
+            self._record_price(db, ingredient, user_id)
+
+        db.commit()
+        db.refresh(ingredient)
+        search_service.invalidate_ingredients()
+        return ingredient
+
+    def backfill_price_history(self, db: Session) -> int:
+        """One baseline row (current cost from created_at) per ingredient without history."""
+        missing = select(
+            Ingredient.id,
+            Ingredient.cost_per_unit,
+            func.coalesce(Ingredient.created_at, datetime.min),
+        ).where(~select(IngredientPrice.id).where(IngredientPrice.ingredient_id == Ingredient.id).exists())
+        result = db.execute(
+            insert(IngredientPrice).from_select(["ingredient_id", "cost_per_unit", "effective_from"], missing)
+        )
+        db.commit()
+        return result.rowcount
+
+    def _has_price_history(self, db: Session, ingredient_id: int) -> bool:
+        return db.execute(
+            select(IngredientPrice.id).where(IngredientPrice.ingredient_id == ingredient_id).limit(1)
+        ).first() is not None
+
+    def _record_price(self, db: Session, ingredient: Ingredient, user_id: int | None) -> None:
+        # History is append-only: never updated, never deleted
+        db.add(
+            IngredientPrice(
+                ingredient_id=ingredient.id,
+                cost_per_unit=ingredient.cost_per_unit,
+                effective_from=datetime.utcnow(),
+                created_by=user_id,
+            )
+        )
+
+ingredient_service = IngredientService()
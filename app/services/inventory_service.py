@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import csv
+import io
+import json
+from datetime import date, datetime, time
 from decimal import Decimal
+from typing import Iterator
 
-from sqlalchemy import func, select
+from sqlalchemy import Float, Select, case, func, null, select, type_coerce
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.events import BALANCE_CHANGED, LOW_STOCK, broadcaster
+from app.core.responses import dumps
+from app.models.ingredient import Ingredient
 from app.models.inventory import InventoryMovement, MovementTypeEnum
+from app.models.rollup import InventoryBalance, InventoryDailyRollup
 from app.schemas.inventory import InventoryMovementCreate
+from app.services.ingredient_service import price_as_of_subquery
 
 
 class InventoryService:
@@ -17,40 +28,61 @@ class InventoryService:
         Assuming ADJUST quantity is signed (positive adds, negative removes).
         IN and OUT quantities are absolute (should be positive).
         """
-        # Sum quantities grouped by type
-        stmt = (
+        return self.get_balances(db, [ingredient_id])[ingredient_id]
+
+    def get_balances(self, db: Session, ingredient_ids: list[int]) -> dict[int, Decimal]:
+        """get_balance for several ingredients in one query; 0 for ingredients never moved."""
+        signed = case(
+            (InventoryMovement.type == MovementTypeEnum.OUT, -InventoryMovement.quantity),
+            else_=InventoryMovement.quantity,
+        )
+        rows = db.execute(
+            select(InventoryMovement.ingredient_id, func.sum(signed))
+            .where(InventoryMovement.ingredient_id.in_(ingredient_ids))
+            .group_by(InventoryMovement.ingredient_id)
+        ).all()
+        balances = {ingredient_id: Decimal(0) for ingredient_id in ingredient_ids}
+        balances.update({ingredient_id: Decimal(total or 0) for ingredient_id, total in rows})
+        return balances
+
+    def balances_statement(self) -> Select:
+        """Every active ingredient with its balance (from the rollup), labelled like InventoryBalanceResponse."""
+        return (
             select(
-                InventoryMovement.type,
-                func.sum(InventoryMovement.quantity).label("total"),
+                Ingredient.id.label("ingredient_id"),
+                Ingredient.name.label("ingredient_name"),
+                func.coalesce(InventoryBalance.quantity, 0).label("balance"),
+                Ingredient.unit,
+                null().label("avg_cost"),  # Not implemented yet
             )
-            .where(InventoryMovement.ingredient_id == ingredient_id)
-            .group_by(InventoryMovement.type)
+            .outerjoin(InventoryBalance, InventoryBalance.ingredient_id == Ingredient.id)
+            .where(Ingredient.active == True)
+            .order_by(Ingredient.id)
         )
-        results = db.execute(stmt).all()
-
-        total_in = Decimal(0)
-        total_out = Decimal(0)
-        total_adjust = Decimal(0)
-
-        for type_, total in results:
-            if total is None:
-                continue
-            if type_ == MovementTypeEnum.IN:
-                total_in = total
-            elif type_ == MovementTypeEnum.OUT:
-                total_out = total
-            elif type_ == MovementTypeEnum.ADJUST:
-                total_adjust = total
-
-        # Balance = IN - OUT + ADJUST
-        # We assume OUT quantity is stored as positive but represents subtraction.
-        return total_in - total_out + total_adjust
 
     def create_movement(
         self, db: Session, movement_in: InventoryMovementCreate, user_id: int
     ) -> InventoryMovement:
+        db_obj = self.add_movement(db, movement_in, user_id)
+        db.commit()
+        db.refresh(db_obj)
+        self.publish_movements(db, [db_obj])
+        return db_obj
+
+    def add_movement(
+        self,
+        db: Session,
+        movement_in: InventoryMovementCreate,
+        user_id: int,
+        check_stock: bool = True,
+    ) -> InventoryMovement:
+        """
+        Validate and add a movement to the session without committing, so callers can
+        write several in one transaction. `check_stock=False` is for callers that
+        already checked balances for the whole set (see produce_batch).
+        """
         # Check constraints
-        if movement_in.type == MovementTypeEnum.OUT:
+        if movement_in.type == MovementTypeEnum.OUT and check_stock:
             current_balance = self.get_balance(db, movement_in.ingredient_id)
             if current_balance < movement_in.quantity:
                 raise ValueError("Insufficient stock for this OUT movement.")
@@ -73,8 +105,146 @@ class InventoryService:
             created_by=user_id,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
         return db_obj
 
+    def publish_movements(self, db: Session, movements: list[InventoryMovement]) -> None:
+        # Only after commit, so listeners never see a change that was rolled back
+        if not broadcaster.subscriber_count or not movements:
+            return
+        ingredient_ids = {movement.ingredient_id for movement in movements}
+        balances = dict(
+            db.execute(
+                select(InventoryBalance.ingredient_id, InventoryBalance.quantity).where(
+                    InventoryBalance.ingredient_id.in_(ingredient_ids)
+                )
+            ).all()
+        )
+
+        crossed: dict[int, Decimal] = {}
+        threshold = Decimal(str(settings.low_stock_threshold))
+        for movement in movements:
+            delta = -movement.quantity if movement.type == MovementTypeEnum.OUT else movement.quantity
+            balance = balances.get(movement.ingredient_id) or Decimal(0)
+            broadcaster.publish(
+                BALANCE_CHANGED,
+                {
+                    "ingredient_id": movement.ingredient_id,
+                    "movement_id": movement.id,
+                    "type": movement.type.value,
+                    "delta": delta,
+                    "balance": balance,
+                },
+            )
+            # New alert only when this movement crosses the threshold downwards
+            if balance < threshold <= balance - delta:
+                crossed[movement.ingredient_id] = balance
+
+        if not crossed:
+            return
+        ingredients = db.execute(
+            select(Ingredient).where(Ingredient.id.in_(crossed), Ingredient.active == True)
+        ).scalars()
+        for ingredient in ingredients:
+            broadcaster.publish(
+                LOW_STOCK,
+                {
+                    "ingredient_id": ingredient.id,
+                    "name": ingredient.name,
+                    "unit": ingredient.unit.value,
+                    "current_balance": crossed[ingredient.id],
+                    "threshold": threshold,
+                },
+            )
+
+    # --- Valuation report ---
+    VALUATION_COLUMNS = ("ingredient_id", "name", "unit", "balance", "unit_cost", "value", "share")
+    VALUATION_BATCH_SIZE = 1000
+
+    def valuation_statement(self, as_of: date | None = None) -> Select:
+        """
+        One statement for the whole report: balance x unit cost per ingredient, with each
+        value's share of the total from a window SUM() OVER (), so rows can be streamed
+        without a second pass. Like the dashboard total, only positive stock has value.
+        """
+        if as_of is None:
+            balances = select(
+                InventoryBalance.ingredient_id, InventoryBalance.quantity.label("balance")
+            ).subquery("balances")
+            unit_cost = Ingredient.cost_per_unit
+        else:
+            balances = (
+                select(
+                    InventoryDailyRollup.ingredient_id,
+                    func.sum(InventoryDailyRollup.quantity_delta).label("balance"),
+                )
+                .where(InventoryDailyRollup.day <= as_of)
+                .group_by(InventoryDailyRollup.ingredient_id)
+                .subquery("balances")
+            )
+            prices = price_as_of_subquery(
+                datetime.combine(as_of, time.max), select(balances.c.ingredient_id)
+            )
+            unit_cost = func.coalesce(prices.c.cost_per_unit, Ingredient.cost_per_unit)
+
+        value = case((balances.c.balance > 0, balances.c.balance * unit_cost), else_=0)
+        total = func.sum(value).over()
+        stmt = (
+            select(
+                Ingredient.id.label("ingredient_id"),
+                Ingredient.name,
+                Ingredient.unit,
+                balances.c.balance,
+                unit_cost.label("unit_cost"),
+                value.label("value"),
+                # Float result type: the Numeric(14, 4) of the operands would round shares to 4 places
+                type_coerce(value / func.nullif(total, 0), Float).label("share"),
+                total.label("total_value"),
+            )
+            .select_from(balances)
+            .join(Ingredient, Ingredient.id == balances.c.ingredient_id)
+            .where(balances.c.balance != 0)
+            .order_by(value.desc(), Ingredient.id)
+        )
+        if as_of is not None:
+            stmt = stmt.outerjoin(prices, prices.c.ingredient_id == Ingredient.id)
+        return stmt
+
+    def iter_valuation(self, db: Session, as_of: date | None = None) -> Iterator[dict]:
+        result = db.execute(
+            self.valuation_statement(as_of).execution_options(yield_per=self.VALUATION_BATCH_SIZE)
+        )
+        for row in result:
+            share = Decimal(str(row.share)) if row.share is not None else Decimal(0)
+            yield {
+                "ingredient_id": row.ingredient_id,
+                "name": row.name,
+                "unit": row.unit.value,
+                "balance": Decimal(str(row.balance)),
+                "unit_cost": Decimal(str(row.unit_cost)),
+                "value": Decimal(str(row.value)),
+                "share": share.quantize(Decimal("0.000001")),
+                "total_value": Decimal(str(row.total_value)),
+            }
+
+    def valuation_json(self, db: Session, as_of: date | None = None) -> Iterator[str]:
+        """{"as_of": ..., "items": [...], "total_value": ...}, one chunk per row."""
+        yield '{"as_of":%s,"items":[' % json.dumps(as_of.isoformat() if as_of else None)
+        total_value = Decimal(0)
+        for n, item in enumerate(self.iter_valuation(db, as_of)):
+            total_value = item.pop("total_value")
+            yield ("," if n else "") + dumps(item).decode()
+        yield '],"total_value":"%s"}' % total_value
+
+    def valuation_csv(self, db: Session, as_of: date | None = None) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.VALUATION_COLUMNS)
+        for n, item in enumerate(self.iter_valuation(db, as_of), start=1):
+            writer.writerow([item[column] for column in self.VALUATION_COLUMNS])
+            if n % self.VALUATION_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
 inventory_service = InventoryService()
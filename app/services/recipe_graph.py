@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import Float, cast, func, literal_column, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe, RecipeItem
+from app.services.ingredient_service import price_as_of_subquery
+
+
+class RecipeCycleError(ValueError):
+    """Raised when sub-recipe references form a loop (A uses B uses A)."""
+
+
+@dataclass(frozen=True)
+class SubRecipeEdge:
+    sub_recipe_id: int
+    quantity: Decimal  # expressed in the sub-recipe's yield unit
+    waste_factor: Decimal
+
+
+@dataclass(frozen=True)
+class LeafItem:
+    ingredient_id: int
+    quantity: Decimal
+    waste_factor: Decimal
+
+
+def find_descendant_ids(db: Session, recipe_ids: Iterable[int]) -> set[int]:
+    """Every recipe reachable through sub-recipe items (one query per DAG level)."""
+    seen: set[int] = set()
+    frontier = set(recipe_ids)
+    while frontier:
+        rows = db.execute(
+            select(RecipeItem.sub_recipe_id).where(
+                RecipeItem.recipe_id.in_(frontier),
+                RecipeItem.sub_recipe_id.is_not(None),
+            )
+        ).scalars()
+        frontier = set(rows) - seen
+        seen |= frontier
+    return seen
+
+
+def find_ancestor_ids(db: Session, recipe_ids: Iterable[int]) -> set[int]:
+    """Every recipe that uses one of `recipe_ids`, directly or through other bases."""
+    seen: set[int] = set()
+    frontier = set(recipe_ids)
+    while frontier:
+        rows = db.execute(
+            select(RecipeItem.recipe_id).where(RecipeItem.sub_recipe_id.in_(frontier))
+        ).scalars()
+        frontier = set(rows) - seen
+        seen |= frontier
+    return seen
+
+
+# Deeper nesting than this is not followed by rolled_up_cost_subquery (a guard, not a limit in practice)
+MAX_SUB_RECIPE_DEPTH = 16
+
+
+def rolled_up_cost_subquery():
+    """
+    (recipe_id, total_cost) for every recipe with sub-recipes expanded, as one recursive
+    CTE, so the database can sort and paginate on cost. Same rollup as
+    RecipeGraph.total_cost, but in floating point: use it for ordering, not for amounts.
+    """
+    item = aliased(RecipeItem)
+    sub_recipe = aliased(Recipe)
+    tree = select(
+        Recipe.id.label("root_id"),
+        Recipe.id.label("recipe_id"),
+        cast(literal_column("1"), Float).label("factor"),
+        literal_column("0").label("depth"),
+    ).cte("recipe_tree", recursive=True)
+    tree = tree.union_all(
+        select(
+            tree.c.root_id,
+            item.sub_recipe_id,
+            tree.c.factor * item.quantity / cast(sub_recipe.yield_quantity, Float),
+            tree.c.depth + 1,
+        )
+        .join(item, item.recipe_id == tree.c.recipe_id)
+        .join(sub_recipe, sub_recipe.id == item.sub_recipe_id)
+        .where(sub_recipe.yield_quantity > 0, tree.c.depth < MAX_SUB_RECIPE_DEPTH)
+    )
+    return (
+        select(
+            tree.c.root_id.label("recipe_id"),
+            func.sum(tree.c.factor * RecipeItem.quantity * Ingredient.cost_per_unit).label("total_cost"),
+        )
+        .join(RecipeItem, RecipeItem.recipe_id == tree.c.recipe_id)
+        .join(Ingredient, Ingredient.id == RecipeItem.ingredient_id)
+        .group_by(tree.c.root_id)
+        .subquery("rolled_up_cost")
+    )
+
+
+class RecipeGraph:
+    """
+    In-memory view of the recipe DAG used to roll costs up from leaf ingredients.
+
+    Totals are memoized per recipe, so a base shared by many products is costed once.
+    """
+
+    def __init__(
+        self,
+        yields: dict[int, Decimal],
+        direct_costs: dict[int, Decimal],
+        edges: dict[int, list[SubRecipeEdge]],
+        leaf_items: dict[int, list[LeafItem]] | None = None,
+        ingredient_costs: dict[int, Decimal] | None = None,
+    ):
+        self.yields = yields
+        self.direct_costs = direct_costs
+        self.edges = edges
+        self.leaf_items = leaf_items
+        self.ingredient_costs = ingredient_costs or {}
+        self._totals: dict[int, Decimal] = {}
+
+    @classmethod
+    def load_subtree(
+        cls, db: Session, root_ids: Iterable[int], as_of: datetime | None = None
+    ) -> RecipeGraph:
+        """
+        Only the recipes reachable from `root_ids`, with item-level detail.
+        One query per DAG level; needed for production explosion.
+
+        With `as_of`, ingredient costs come from the ingredient_prices history through
+        a window over the level's ingredients (same single query). Ingredients with no
+        history before that date fall back to their current cost.
+        """
+        edges: dict[int, list[SubRecipeEdge]] = defaultdict(list)
+        leaf_items: dict[int, list[LeafItem]] = defaultdict(list)
+        direct_costs: dict[int, Decimal] = defaultdict(Decimal)
+        ingredient_costs: dict[int, Decimal] = {}
+
+        seen: set[int] = set()
+        frontier = set(root_ids)
+        while frontier:
+            seen |= frontier
+            prices = None
+            cost_column = Ingredient.cost_per_unit
+            if as_of is not None:
+                level_ingredients = select(RecipeItem.ingredient_id).where(
+                    RecipeItem.recipe_id.in_(frontier)
+                )
+                prices = price_as_of_subquery(as_of, level_ingredients)
+                cost_column = func.coalesce(prices.c.cost_per_unit, Ingredient.cost_per_unit)
+
+            stmt = (
+                select(
+                    RecipeItem.recipe_id,
+                    RecipeItem.ingredient_id,
+                    RecipeItem.sub_recipe_id,
+                    RecipeItem.quantity,
+                    RecipeItem.waste_factor,
+                    cost_column.label("cost_per_unit"),
+                )
+                .select_from(RecipeItem)
+                .outerjoin(Ingredient, Ingredient.id == RecipeItem.ingredient_id)
+            )
+            if prices is not None:
+                stmt = stmt.outerjoin(prices, prices.c.ingredient_id == RecipeItem.ingredient_id)
+            stmt = stmt.where(RecipeItem.recipe_id.in_(frontier)).order_by(RecipeItem.id)
+            rows = db.execute(stmt).all()
+
+            next_frontier: set[int] = set()
+            for row in rows:
+                waste = row.waste_factor or Decimal(0)
+                if row.sub_recipe_id is not None:
+                    edges[row.recipe_id].append(SubRecipeEdge(row.sub_recipe_id, row.quantity, waste))
+                    next_frontier.add(row.sub_recipe_id)
+                else:
+                    leaf_items[row.recipe_id].append(LeafItem(row.ingredient_id, row.quantity, waste))
+                    ingredient_costs[row.ingredient_id] = row.cost_per_unit
+                    direct_costs[row.recipe_id] += row.quantity * row.cost_per_unit
+            frontier = next_frontier - seen
+
+        yields = {
+            row.id: row.yield_quantity
+            for row in db.execute(select(Recipe.id, Recipe.yield_quantity).where(Recipe.id.in_(seen)))
+        }
+        return cls(yields, dict(direct_costs), edges, leaf_items, ingredient_costs)
+
+    # --- Traversal ---
+    def topological_order(self, recipe_ids: Iterable[int]) -> list[int]:
+        """
+        Post-order of the subgraphs under `recipe_ids` (sub-recipes before the recipes
+        using them). Shared bases appear once. Raises RecipeCycleError on loops.
+        """
+        order: list[int] = []
+        done: set[int] = set()
+        for root in recipe_ids:
+            if root in done:
+                continue
+            on_path: set[int] = set()
+            stack: list[tuple[int, bool]] = [(root, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    on_path.discard(node)
+                    done.add(node)
+                    order.append(node)
+                    continue
+                if node in done:
+                    continue
+                if node in on_path:
+                    raise RecipeCycleError(f"Recipe {node} is part of a sub-recipe cycle")
+                on_path.add(node)
+                stack.append((node, True))
+                for edge in self.edges.get(node, []):
+                    if edge.sub_recipe_id in on_path:
+                        raise RecipeCycleError(f"Recipe {edge.sub_recipe_id} is part of a sub-recipe cycle")
+                    if edge.sub_recipe_id not in done:
+                        stack.append((edge.sub_recipe_id, False))
+        return order
+
+    # --- Cost rollup ---
+    def total_cost(self, recipe_id: int) -> Decimal:
+        """Cost of one full batch (yield_quantity units) of the recipe."""
+        if recipe_id in self._totals:
+            return self._totals[recipe_id]
+        for node in self.topological_order([recipe_id]):
+            if node in self._totals:
+                continue
+            total = Decimal(self.direct_costs.get(node, 0))
+            for edge in self.edges.get(node, []):
+                total += edge.quantity * self.unit_cost(edge.sub_recipe_id)
+            self._totals[node] = total
+        return self._totals[recipe_id]
+
+    def unit_cost(self, recipe_id: int) -> Decimal:
+        yield_quantity = self.yields.get(recipe_id, Decimal(0))
+        if yield_quantity <= 0:
+            return Decimal(0)
+        return self.total_cost(recipe_id) / yield_quantity
+
+    def ingredient_quantity(self, recipe_id: int, ingredient_id: int) -> Decimal:
+        """
+        Net quantity of a leaf ingredient in one batch of the recipe, through any sub-recipes.
+        Waste is excluded, matching the cost rollup.
+        """
+        if self.leaf_items is None:
+            raise RuntimeError("Graph was loaded without item detail; use load_subtree")
+        quantities: dict[int, Decimal] = {}
+        for node in self.topological_order([recipe_id]):
+            quantity = sum(
+                (item.quantity for item in self.leaf_items.get(node, []) if item.ingredient_id == ingredient_id),
+                Decimal(0),
+            )
+            for edge in self.edges.get(node, []):
+                sub_yield = self.yields.get(edge.sub_recipe_id, Decimal(0))
+                if sub_yield > 0:
+                    quantity += edge.quantity * quantities[edge.sub_recipe_id] / sub_yield
+            quantities[node] = quantity
+        return quantities[recipe_id]
+
+    # --- Production ---
+    def explode(self, recipe_id: int, units: Decimal) -> dict[int, Decimal]:
+        """
+        Leaf-ingredient consumption (waste included) for producing `units` of the recipe.
+        consumo por item = item.quantity * fator * (1 + waste_factor), applied down every level.
+        """
+        if self.leaf_items is None:
+            raise RuntimeError("Graph was loaded without item detail; use load_subtree")
+        self.topological_order([recipe_id])  # cycle check before walking
+
+        consumption: dict[int, Decimal] = defaultdict(Decimal)
+        stack: list[tuple[int, Decimal]] = [(recipe_id, units)]
+        while stack:
+            node, node_units = stack.pop()
+            yield_quantity = self.yields.get(node, Decimal(0))
+            if yield_quantity <= 0:
+                raise ValueError("Recipe yield must be positive")
+            factor = node_units / yield_quantity
+            for item in self.leaf_items.get(node, []):
+                consumption[item.ingredient_id] += item.quantity * factor * (1 + item.waste_factor)
+            for edge in self.edges.get(node, []):
+                stack.append((edge.sub_recipe_id, edge.quantity * factor * (1 + edge.waste_factor)))
+        return dict(consumption)
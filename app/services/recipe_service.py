@@ -1,17 +1,28 @@
 from __future__ import annotations
 
+from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session, aliased, joinedload
 
 from app.models.ingredient import Ingredient
 from app.models.recipe import Recipe, RecipeItem
 from app.schemas.recipe import (
+    IngredientUsageResponse,
     ItemCostBreakdown,
     RecipeCostResponse,
     RecipeCreate,
     RecipeItemCreate,
 )
+from app.services.recipe_graph import (
+    RecipeCycleError,
+    RecipeGraph,
+    find_ancestor_ids,
+    find_descendant_ids,
+    rolled_up_cost_subquery,
+)
+from app.services.search_service import search_service
 
 
 class RecipeService:
@@ -28,9 +39,12 @@ class RecipeService:
 
         # Create Items
         for item_in in recipe_in.items:
+            if item_in.sub_recipe_id is not None:
+                self.validate_sub_recipe(db, recipe.id, item_in.sub_recipe_id)
             item = RecipeItem(
                 recipe_id=recipe.id,
                 ingredient_id=item_in.ingredient_id,
+                sub_recipe_id=item_in.sub_recipe_id,
                 quantity=item_in.quantity,
                 waste_factor=item_in.waste_factor,
             )
@@ -38,12 +52,164 @@ class RecipeService:
         
         db.commit()
         db.refresh(recipe)
+        search_service.invalidate_recipes()
         return recipe
 
-    def calculate_cost(self, db: Session, recipe_id: int) -> RecipeCostResponse | None:
+    def validate_sub_recipe(self, db: Session, recipe_id: int, sub_recipe_id: int) -> None:
+        self.validate_sub_recipes(db, recipe_id, [sub_recipe_id])
+
+    def validate_sub_recipes(self, db: Session, recipe_id: int, sub_recipe_ids: list[int]) -> None:
+        """Reject sub-recipe links that point nowhere or would close a cycle."""
+        if not sub_recipe_ids:
+            return
+        if recipe_id in sub_recipe_ids:
+            raise RecipeCycleError("A recipe cannot use itself as a sub-recipe")
+        found = set(db.execute(select(Recipe.id).where(Recipe.id.in_(sub_recipe_ids))).scalars())
+        missing = sorted(set(sub_recipe_ids) - found)
+        if missing:
+            raise ValueError(f"Sub-recipe {', '.join(map(str, missing))} not found")
+        if recipe_id in find_descendant_ids(db, sub_recipe_ids):
+            raise RecipeCycleError(
+                f"A sub-recipe of recipe {recipe_id} already uses it; this would create a cycle"
+            )
+
+    def replace_items(
+        self, db: Session, recipe: Recipe, items_in: list[RecipeItemCreate]
+    ) -> Recipe:
+        """
+        Make the recipe's items exactly `items_in`.
+        Diffs against the current rows and applies bulk DELETE / UPDATE / INSERT
+        statements with a single commit.
+        """
+
+        def key(item) -> tuple[str, int]:
+            if item.sub_recipe_id is not None:
+                return ("sub_recipe", item.sub_recipe_id)
+            return ("ingredient", item.ingredient_id)
+
+        wanted: dict[tuple[str, int], RecipeItemCreate] = {}
+        for item_in in items_in:
+            if key(item_in) in wanted:
+                raise ValueError(f"Duplicate item for {key(item_in)[0]} {key(item_in)[1]}")
+            wanted[key(item_in)] = item_in
+
+        ingredient_ids = [k[1] for k in wanted if k[0] == "ingredient"]
+        if ingredient_ids:
+            found = set(
+                db.execute(select(Ingredient.id).where(Ingredient.id.in_(ingredient_ids))).scalars()
+            )
+            missing = sorted(set(ingredient_ids) - found)
+            if missing:
+                raise ValueError(f"Ingredient {', '.join(map(str, missing))} not found")
+        self.validate_sub_recipes(db, recipe.id, [k[1] for k in wanted if k[0] == "sub_recipe"])
+
+        current = db.execute(
+            select(
+                RecipeItem.id,
+                RecipeItem.ingredient_id,
+                RecipeItem.sub_recipe_id,
+                RecipeItem.quantity,
+                RecipeItem.waste_factor,
+            ).where(RecipeItem.recipe_id == recipe.id)
+        ).all()
+
+        to_delete: list[int] = []
+        to_update: list[dict] = []
+        existing_keys = set()
+        for row in current:
+            existing_keys.add(key(row))
+            item_in = wanted.get(key(row))
+            if item_in is None:
+                to_delete.append(row.id)
+            elif item_in.quantity != row.quantity or item_in.waste_factor != row.waste_factor:
+                to_update.append(
+                    {"id": row.id, "quantity": item_in.quantity, "waste_factor": item_in.waste_factor}
+                )
+        to_insert = [
+            {
+                "recipe_id": recipe.id,
+                "ingredient_id": item_in.ingredient_id,
+                "sub_recipe_id": item_in.sub_recipe_id,
+                "quantity": item_in.quantity,
+                "waste_factor": item_in.waste_factor,
+            }
+            for k, item_in in wanted.items()
+            if k not in existing_keys
+        ]
+
+        if to_delete:
+            db.execute(delete(RecipeItem).where(RecipeItem.id.in_(to_delete)))
+        if to_update:
+            db.execute(update(RecipeItem), to_update)
+        if to_insert:
+            db.execute(insert(RecipeItem), to_insert)
+
+        recipe.updated_at = datetime.utcnow()
+        db.commit()
+
+        return (
+            db.query(Recipe)
+            .options(joinedload(Recipe.items))
+            .filter(Recipe.id == recipe.id)
+            .populate_existing()
+            .first()
+        )
+
+    def recipes_using_ingredients(self, db: Session, ingredient_ids: list[int]) -> set[int]:
+        """Recipes with a direct item for any of the ingredients (idx_recipe_items_ingredient)."""
+        if not ingredient_ids:
+            return set()
+        return set(
+            db.execute(
+                select(RecipeItem.recipe_id).where(RecipeItem.ingredient_id.in_(ingredient_ids))
+            ).scalars()
+        )
+
+    def affected_recipe_ids(self, db: Session, ingredient_ids: list[int]) -> set[int]:
+        """
+        Every recipe whose cost depends on the ingredients: direct users plus, through
+        sub-recipes, their ancestors. Cost recalculations only need to touch these.
+        """
+        direct = self.recipes_using_ingredients(db, ingredient_ids)
+        return direct | find_ancestor_ids(db, direct)
+
+    def get_ingredient_usage(self, db: Session, ingredient_id: int) -> list[IngredientUsageResponse]:
+        direct = self.recipes_using_ingredients(db, [ingredient_id])
+        affected = direct | find_ancestor_ids(db, direct)
+        if not affected:
+            return []
+
+        graph = RecipeGraph.load_subtree(db, affected)
+        unit_cost = graph.ingredient_costs[ingredient_id]
+        names = dict(db.execute(select(Recipe.id, Recipe.name).where(Recipe.id.in_(affected))).all())
+
+        usage = []
+        for recipe_id in sorted(affected, key=lambda r: names[r]):
+            quantity = graph.ingredient_quantity(recipe_id, ingredient_id)
+            item_cost = quantity * unit_cost
+            total_cost = graph.total_cost(recipe_id)
+            usage.append(
+                IngredientUsageResponse(
+                    recipe_id=recipe_id,
+                    recipe_name=names[recipe_id],
+                    via_sub_recipe=recipe_id not in direct,
+                    quantity=quantity,
+                    item_cost=item_cost,
+                    recipe_total_cost=total_cost,
+                    cost_share=item_cost / total_cost if total_cost > 0 else Decimal(0),
+                )
+            )
+        return usage
+
+    def calculate_cost(
+        self, db: Session, recipe_id: int, as_of: datetime | None = None
+    ) -> RecipeCostResponse | None:
         recipe = (
             db.query(Recipe)
-            .options(joinedload(Recipe.items).joinedload(RecipeItem.ingredient))
+            .options(
+                joinedload(Recipe.items).joinedload(RecipeItem.ingredient),
+                joinedload(Recipe.items).joinedload(RecipeItem.sub_recipe),
+            )
             .filter(Recipe.id == recipe_id)
             .first()
         )
@@ -51,31 +217,53 @@ class RecipeService:
         if not recipe:
             return None
 
+        # Only recipes using intermediate products (or historical prices) need the DAG,
+        # and only their own subtree
+        graph = None
+        if as_of is not None or any(item.sub_recipe_id is not None for item in recipe.items):
+            graph = RecipeGraph.load_subtree(db, [recipe.id], as_of=as_of)
+
         breakdown = []
         total_cost = Decimal(0)
 
         for item in recipe.items:
-            unit_cost = item.ingredient.cost_per_unit
             quantity_needed = item.quantity
             
             # TODO: Consider waste_factor logic. 
             # Usually quantity in recipe is "gross quantity" (already includes waste) or "net".
             # If standard recipe implies net, we should divide by (1-waste).
             # For this MVP, let's assume quantity is what is consumed from stock (Gross).
-            
-            item_total = quantity_needed * unit_cost
-            total_cost += item_total
-            
-            breakdown.append(
-                ItemCostBreakdown(
-                    ingredient_id=item.ingredient.id,
-                    ingredient_name=item.ingredient.name,
-                    quantity=quantity_needed,
-                    unit=item.ingredient.unit,
-                    unit_cost=unit_cost,
-                    total_cost=item_total
+
+            if item.sub_recipe_id is not None:
+                unit_cost = graph.unit_cost(item.sub_recipe_id)
+                item_total = quantity_needed * unit_cost
+                breakdown.append(
+                    ItemCostBreakdown(
+                        sub_recipe_id=item.sub_recipe_id,
+                        ingredient_name=item.sub_recipe.name,
+                        quantity=quantity_needed,
+                        unit=item.sub_recipe.yield_unit,
+                        unit_cost=unit_cost,
+                        total_cost=item_total,
+                    )
                 )
-            )
+            else:
+                if as_of is not None:
+                    unit_cost = graph.ingredient_costs[item.ingredient_id]
+                else:
+                    unit_cost = item.ingredient.cost_per_unit
+                item_total = quantity_needed * unit_cost
+                breakdown.append(
+                    ItemCostBreakdown(
+                        ingredient_id=item.ingredient.id,
+                        ingredient_name=item.ingredient.name,
+                        quantity=quantity_needed,
+                        unit=item.ingredient.unit,
+                        unit_cost=unit_cost,
+                        total_cost=item_total
+                    )
+                )
+            total_cost += item_total
 
         cost_per_unit = total_cost / recipe.yield_quantity if recipe.yield_quantity > 0 else Decimal(0)
 
@@ -88,4 +276,88 @@ class RecipeService:
             breakdown=breakdown
         )
 
+    def calculate_all_costs(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        sort_by: str = "name",
+        descending: bool = False,
+        include_breakdown: bool = False,
+    ) -> list[RecipeCostResponse]:
+        """
+        Cost report for the whole catalog, sorted and paginated in the database.
+        Sorting by cost orders on the recursive rollup in SQL; only the page's recipes
+        and their sub-recipe subtrees are then loaded and costed exactly, so a page
+        never costs the whole catalog in Python.
+        """
+        stmt = select(Recipe.id, Recipe.name, Recipe.yield_quantity)
+        if sort_by == "name":
+            order_column = Recipe.name
+        else:
+            costs = rolled_up_cost_subquery()
+            total_expr = func.coalesce(costs.c.total_cost, 0)
+            sort_columns = {
+                "total_cost": total_expr,
+                "cost_per_unit": case(
+                    (Recipe.yield_quantity > 0, total_expr / Recipe.yield_quantity),
+                    else_=0,
+                ),
+            }
+            order_column = sort_columns[sort_by]
+            stmt = stmt.outerjoin(costs, costs.c.recipe_id == Recipe.id)
+        order_column = order_column.desc() if descending else order_column.asc()
+        recipes = db.execute(stmt.order_by(order_column, Recipe.id).offset(skip).limit(limit)).all()
+
+        graph = RecipeGraph.load_subtree(db, [recipe.id for recipe in recipes])
+        page = [(recipe, graph.total_cost(recipe.id), graph.unit_cost(recipe.id)) for recipe in recipes]
+
+        breakdowns: dict[int, list[ItemCostBreakdown]] = {recipe.id: [] for recipe, _, _ in page}
+        if include_breakdown and page:
+            # One extra query for the whole page, never one per recipe
+            sub_recipe = aliased(Recipe)
+            item_rows = db.execute(
+                select(
+                    RecipeItem.recipe_id,
+                    RecipeItem.quantity,
+                    RecipeItem.sub_recipe_id,
+                    Ingredient.id.label("ingredient_id"),
+                    func.coalesce(Ingredient.name, sub_recipe.name).label("name"),
+                    func.coalesce(Ingredient.unit, sub_recipe.yield_unit).label("unit"),
+                    Ingredient.cost_per_unit,
+                )
+                .outerjoin(Ingredient, Ingredient.id == RecipeItem.ingredient_id)
+                .outerjoin(sub_recipe, sub_recipe.id == RecipeItem.sub_recipe_id)
+                .where(RecipeItem.recipe_id.in_(breakdowns.keys()))
+                .order_by(RecipeItem.recipe_id, RecipeItem.id)
+            ).all()
+            for item in item_rows:
+                if item.sub_recipe_id is not None:
+                    unit_cost = graph.unit_cost(item.sub_recipe_id)
+                else:
+                    unit_cost = item.cost_per_unit
+                breakdowns[item.recipe_id].append(
+                    ItemCostBreakdown(
+                        ingredient_id=item.ingredient_id,
+                        sub_recipe_id=item.sub_recipe_id,
+                        ingredient_name=item.name,
+                        quantity=item.quantity,
+                        unit=item.unit,
+                        unit_cost=unit_cost,
+                        total_cost=item.quantity * unit_cost,
+                    )
+                )
+
+        return [
+            RecipeCostResponse(
+                recipe_id=recipe.id,
+                recipe_name=recipe.name,
+                total_cost=total_cost,
+                cost_per_unit=cost_per_unit,
+                yield_quantity=recipe.yield_quantity,
+                breakdown=breakdowns[recipe.id],
+            )
+            for recipe, total_cost, cost_per_unit in page
+        ]
+
 recipe_service = RecipeService()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.batch import Batch, BatchStatusEnum
+from app.models.ingredient import Ingredient
+from app.models.inventory import InventoryMovement, MovementTypeEnum
+from app.models.rollup import InventoryBalance, InventoryDailyRollup, ProductionDailyRollup
+
+
+class RollupService:
+    def rebuild(self, db: Session) -> None:
+        """
+        Recompute every rollup table from inventory_movements and batches.
+        Day-to-day the tables are maintained on write; this is for the initial backfill
+        and for repairs after raw SQL edits that bypass the ORM.
+        """
+        signed_quantity = case(
+            (InventoryMovement.type == MovementTypeEnum.OUT, -InventoryMovement.quantity),
+            else_=InventoryMovement.quantity,
+        )
+        unit_cost = func.coalesce(InventoryMovement.unit_cost_at_time, Ingredient.cost_per_unit, 0)
+        movement_day = func.date(InventoryMovement.created_at)
+
+        db.execute(delete(InventoryBalance))
+        db.execute(delete(InventoryDailyRollup))
+        db.execute(delete(ProductionDailyRollup))
+
+        db.execute(
+            insert(InventoryBalance).from_select(
+                ["ingredient_id", "quantity", "updated_at"],
+                select(
+                    InventoryMovement.ingredient_id,
+                    func.sum(signed_quantity),
+                    literal(datetime.utcnow()),
+                ).group_by(InventoryMovement.ingredient_id),
+            )
+        )
+        db.execute(
+            insert(InventoryDailyRollup).from_select(
+                ["day", "ingredient_id", "quantity_delta", "value_delta"],
+                select(
+                    movement_day,
+                    InventoryMovement.ingredient_id,
+                    func.sum(signed_quantity),
+                    func.sum(signed_quantity * unit_cost),
+                )
+                .join(Ingredient, Ingredient.id == InventoryMovement.ingredient_id)
+                .group_by(movement_day, InventoryMovement.ingredient_id),
+            )
+        )
+
+        batch_day = func.date(func.coalesce(Batch.produced_at, Batch.created_at))
+        db.execute(
+            insert(ProductionDailyRollup).from_select(
+                ["day", "recipe_id", "batches", "units", "cost"],
+                select(
+                    batch_day,
+                    Batch.recipe_id,
+                    func.count(Batch.id),
+                    func.coalesce(func.sum(Batch.actual_units), 0),
+                    func.coalesce(func.sum(Batch.cost_snapshot_total), 0),
+                )
+                .where(Batch.status == BatchStatusEnum.PRODUCED)
+                .group_by(batch_day, Batch.recipe_id),
+            )
+        )
+        db.commit()
+
+rollup_service = RollupService()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.core.text import normalize_search_text
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    id: int
+    name: str
+
+
+class PrefixIndex:
+    """
+    Per-worker sorted index for autocomplete.
+
+    Every word start of every name is a key ("oleo essencial" is found by "ole" and "ess"),
+    so a lookup is one bisect plus a short scan. It is rebuilt lazily after `invalidate()`
+    (local writes) or once `ttl_seconds` have passed (writes made by other workers).
+    """
+
+    def __init__(self, loader: Callable[[Session], list[SearchHit]], ttl_seconds: int):
+        self._loader = loader
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._keys: list[str] = []
+        self._hits: list[SearchHit] = []
+        self._built_at: float | None = None
+
+    def invalidate(self) -> None:
+        self._built_at = None
+
+    def _is_fresh(self) -> bool:
+        return self._built_at is not None and time.monotonic() - self._built_at < self._ttl_seconds
+
+    def _ensure_built(self, db: Session) -> None:
+        if self._is_fresh():
+            return
+        with self._lock:
+            if self._is_fresh():
+                return
+            entries: list[tuple[str, SearchHit]] = []
+            for hit in self._loader(db):
+                normalized = normalize_search_text(hit.name)
+                start = 0
+                for word in normalized.split(" "):
+                    entries.append((normalized[start:], hit))
+                    start += len(word) + 1
+            entries.sort(key=lambda entry: (entry[0], entry[1].id))
+            self._keys = [key for key, _ in entries]
+            self._hits = [hit for _, hit in entries]
+            self._built_at = time.monotonic()
+
+    def search(self, db: Session, prefix: str, limit: int = 10) -> list[SearchHit]:
+        self._ensure_built(db)
+        prefix = normalize_search_text(prefix)
+        keys, hits = self._keys, self._hits  # snapshot; a rebuild swaps both lists
+        results: list[SearchHit] = []
+        seen: set[int] = set()
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix) and len(results) < limit:
+            hit = hits[position]
+            if hit.id not in seen:
+                seen.add(hit.id)
+                results.append(hit)
+            position += 1
+        return results
+
+
+def _load_active_ingredients(db: Session) -> list[SearchHit]:
+    rows = db.execute(select(Ingredient.id, Ingredient.name).where(Ingredient.active == True)).all()
+    return [SearchHit(row.id, row.name) for row in rows]
+
+
+def _load_recipes(db: Session) -> list[SearchHit]:
+    rows = db.execute(select(Recipe.id, Recipe.name)).all()
+    return [SearchHit(row.id, row.name) for row in rows]
+
+
+class SearchService:
+    def __init__(self):
+        ttl = settings.search_index_ttl_seconds
+        self.ingredient_index = PrefixIndex(_load_active_ingredients, ttl)
+        self.recipe_index = PrefixIndex(_load_recipes, ttl)
+
+    def search_ingredients(
+        self, db: Session, q: str, skip: int = 0, limit: int = 20, active_only: bool = True
+    ) -> list[Ingredient]:
+        """Accent-insensitive substring search; LIKE '%term%' is served by the pg_trgm index."""
+        term = normalize_search_text(q)
+        query = db.query(Ingredient).filter(Ingredient.search_name.contains(term, autoescape=True))
+        if active_only:
+            query = query.filter(Ingredient.active == True)
+        starts_first = case((Ingredient.search_name.startswith(term, autoescape=True), 0), else_=1)
+        return query.order_by(starts_first, Ingredient.search_name, Ingredient.id).offset(skip).limit(limit).all()
+
+    def search_recipes(self, db: Session, q: str, skip: int = 0, limit: int = 20) -> list[Recipe]:
+        term = normalize_search_text(q)
+        starts_first = case((Recipe.search_name.startswith(term, autoescape=True), 0), else_=1)
+        return (
+            db.query(Recipe)
+            .options(joinedload(Recipe.items))
+            .filter(Recipe.search_name.contains(term, autoescape=True))
+            .order_by(starts_first, Recipe.search_name, Recipe.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def invalidate_ingredients(self) -> None:
+        self.ingredient_index.invalidate()
+
+    def invalidate_recipes(self) -> None:
+        self.recipe_index.invalidate()
+
+search_service = SearchService()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe
+from app.schemas.recipe import (
+    ScenarioResult,
+    SimulatedRecipe,
+    SimulationRequest,
+    SimulationResponse,
+)
+from app.services.recipe_graph import RecipeGraph
+from app.services.recipe_service import recipe_service
+
+
+class SimulationService:
+    def build_quantity_matrix(
+        self, graph: RecipeGraph, recipe_ids: list[int], ingredient_ids: list[int]
+    ) -> np.ndarray:
+        """
+        recipes x ingredients matrix of gross leaf quantities for one batch of each recipe.
+        Waste is included (quantity * (1 + waste_factor)) and sub-recipes are flattened,
+        children first, so each row is built from rows that are already final.
+        """
+        row_of = {recipe_id: n for n, recipe_id in enumerate(recipe_ids)}
+        col_of = {ingredient_id: n for n, ingredient_id in enumerate(ingredient_ids)}
+        matrix = np.zeros((len(recipe_ids), len(ingredient_ids)))
+
+        for recipe_id in graph.topological_order(recipe_ids):
+            row = matrix[row_of[recipe_id]]
+            for item in graph.leaf_items.get(recipe_id, []):
+                row[col_of[item.ingredient_id]] += float(item.quantity * (1 + item.waste_factor))
+            for edge in graph.edges.get(recipe_id, []):
+                sub_yield = graph.yields.get(edge.sub_recipe_id, Decimal(0))
+                if sub_yield <= 0:
+                    continue
+                sub_units = float(edge.quantity * (1 + edge.waste_factor) / sub_yield)
+                row += sub_units * matrix[row_of[edge.sub_recipe_id]]
+        return matrix
+
+    def simulate(self, db: Session, request: SimulationRequest) -> SimulationResponse:
+        changed_ids = sorted(
+            {change.ingredient_id for scenario in request.scenarios for change in scenario.changes}
+        )
+
+        # Only recipes that depend on a changed ingredient need rows (plus the sub-recipes
+        # they are built from), found through the "where used" reverse index.
+        recipe_query = select(Recipe.id, Recipe.name, Recipe.yield_quantity).order_by(Recipe.id)
+        if request.include_unaffected:
+            recipes = db.execute(recipe_query).all()
+            graph = RecipeGraph.load_subtree(db, [recipe.id for recipe in recipes])
+        else:
+            affected = recipe_service.affected_recipe_ids(db, changed_ids)
+            graph = RecipeGraph.load_subtree(db, affected)
+            recipes = db.execute(recipe_query.where(Recipe.id.in_(graph.yields))).all()
+        recipe_ids = [recipe.id for recipe in recipes]
+
+        # Current prices for every loaded ingredient or one named in a scenario
+        known_costs = dict(graph.ingredient_costs)
+        missing = [i for i in changed_ids if i not in known_costs]
+        if missing:
+            rows = db.execute(
+                select(Ingredient.id, Ingredient.cost_per_unit).where(Ingredient.id.in_(missing))
+            ).all()
+            known_costs.update({row.id: row.cost_per_unit for row in rows})
+        unknown = [i for i in changed_ids if i not in known_costs]
+        if unknown:
+            raise ValueError(f"Ingredients not found: {unknown}")
+
+        ingredient_ids = sorted(known_costs)
+        col_of = {ingredient_id: n for n, ingredient_id in enumerate(ingredient_ids)}
+        quantities = self.build_quantity_matrix(graph, recipe_ids, ingredient_ids)
+        base_prices = np.array([float(known_costs[i] or 0) for i in ingredient_ids])
+        base_costs = quantities @ base_prices
+
+        # Price deltas: changed ingredients x scenarios. Everything else is zero,
+        # so only those columns of the quantity matrix take part in the product.
+        changed_cols = [col_of[i] for i in changed_ids]
+        change_row = {ingredient_id: n for n, ingredient_id in enumerate(changed_ids)}
+        price_deltas = np.zeros((len(changed_ids), len(request.scenarios)))
+        for k, scenario in enumerate(request.scenarios):
+            for change in scenario.changes:
+                old = known_costs[change.ingredient_id] or Decimal(0)
+                if change.new_cost is not None:
+                    new = change.new_cost
+                else:
+                    new = old * (1 + change.percent_change / 100)
+                price_deltas[change_row[change.ingredient_id], k] = float(new - old)
+
+        changed_quantities = quantities[:, changed_cols]
+        cost_deltas = changed_quantities @ price_deltas  # recipes x scenarios
+
+        yields = np.array([float(recipe.yield_quantity) for recipe in recipes])
+        safe_yields = np.where(yields > 0, yields, 1.0)
+        per_unit_factor = np.where(yields > 0, 1.0 / safe_yields, 0.0)
+
+        if request.include_unaffected:
+            rows_kept = np.arange(len(recipes))
+        else:
+            rows_kept = np.flatnonzero((changed_quantities != 0).any(axis=1))
+
+        kept_deltas = cost_deltas[rows_kept]
+        kept_per_unit = kept_deltas * per_unit_factor[rows_kept, None]
+
+        return SimulationResponse(
+            recipes=[
+                SimulatedRecipe(
+                    recipe_id=recipes[n].id,
+                    recipe_name=recipes[n].name,
+                    yield_quantity=recipes[n].yield_quantity,
+                    base_cost=round(float(base_costs[n]), 4),
+                    base_cost_per_unit=round(float(base_costs[n] * per_unit_factor[n]), 4),
+                )
+                for n in rows_kept
+            ],
+            scenarios=[
+                ScenarioResult(
+                    name=scenario.name,
+                    cost_deltas=np.round(kept_deltas[:, k], 4).tolist(),
+                    cost_per_unit_deltas=np.round(kept_per_unit[:, k], 4).tolist(),
+                    affected_recipes=int(np.count_nonzero(kept_deltas[:, k])),
+                )
+                for k, scenario in enumerate(request.scenarios)
+            ],
+        )
+
+simulation_service = SimulationService()
@@ -0,0 +1,91 @@
+"""
+Sync (threadpool + psycopg2) vs async (asyncpg) database access under concurrent load.
+
+Runs the same service call both ways against DATABASE_URL / ASYNC_DATABASE_URL:
+  - sync:  a thread pool of --threads workers (Starlette's default is 40), one Session each
+  - async: --concurrency coroutines on one event loop, one AsyncSession each (run_sync)
+
+This isolates the database access pattern only; benchmarks/http_concurrency.py
+measures the endpoints themselves, auth dependency and threadpool hops included.
+
+Usage:
+    python -m benchmarks.db_concurrency --requests 2000 --concurrency 200 --threads 40
+    python -m benchmarks.db_concurrency --sleep-ms 20   # add server-side latency per call
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import models  # noqa: F401
+from app.database import SessionLocal, get_async_engine, get_async_session_factory, run_sync
+from app.services.dashboard_service import dashboard_service
+
+
+def workload(db: Session, sleep_ms: int) -> None:
+    if sleep_ms and db.get_bind().dialect.name == "postgresql":
+        # Stands in for a slower query or a distant database
+        db.execute(text("SELECT pg_sleep(:s)"), {"s": sleep_ms / 1000})
+    dashboard_service.get_stats(db)
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>5}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+def run_sync_benchmark(requests: int, threads: int, sleep_ms: int) -> None:
+    def one() -> float:
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            workload(db, sleep_ms)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(lambda _: one(), range(requests)))
+    report("sync", latencies, time.perf_counter() - started)
+
+
+async def run_async_benchmark(requests: int, concurrency: int, sleep_ms: int) -> None:
+    factory = get_async_session_factory()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            async with factory() as db:
+                await run_sync(db, workload, sleep_ms)
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = list(await asyncio.gather(*(one() for _ in range(requests))))
+    report("async", latencies, time.perf_counter() - started)
+    await get_async_engine().dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=40)
+    parser.add_argument("--sleep-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.requests} calls, {args.threads} threads vs {args.concurrency} coroutines")
+    run_sync_benchmark(args.requests, args.threads, args.sleep_ms)
+    asyncio.run(run_async_benchmark(args.requests, args.concurrency, args.sleep_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Endpoint throughput through the full HTTP stack, auth dependency included.
+
+Fires --requests GETs at each --path with --concurrency clients in flight, using
+a bearer token for the first admin user in DATABASE_URL. Against --url when
+given (a running uvicorn/gunicorn), else in-process through the ASGI app, which
+still runs the real dependencies, sessions and threadpool hops.
+
+Compare an async endpoint (one AsyncSession per request) with a sync one
+(threadpool + Session) under the same load, e.g. the dashboard stats vs the
+recipe cost catalog.
+
+Usage:
+    python -m benchmarks.http_concurrency --requests 2000 --concurrency 200
+    python -m benchmarks.http_concurrency --url http://localhost:8000 --path /api/v1/inventory/balance
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import select
+
+from app import models  # noqa: F401
+from app.core.security import create_access_token, user_token_claims
+from app.database import SessionLocal
+from app.models.user import RoleEnum, User
+from benchmarks.db_concurrency import report
+
+DEFAULT_PATHS = ("/api/v1/dashboard/stats", "/api/v1/inventory/balance", "/api/v1/recipes/costs")
+
+
+def admin_token() -> str:
+    with SessionLocal() as db:
+        user = db.execute(select(User).where(User.role == RoleEnum.ADMIN).limit(1)).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No admin user: run scripts/seed_admin.py first")
+        return create_access_token(data=user_token_claims(user))
+
+
+async def run_http_benchmark(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+    await client.get(path)  # warm up caches and pools
+    started = time.perf_counter()
+    latencies = list(await asyncio.gather(*(one() for _ in range(requests))))
+    print(path)
+    report("http", latencies, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> None:
+    headers = {"Authorization": f"Bearer {admin_token()}"}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, headers=headers, timeout=60)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers, timeout=60
+        )
+    async with client:
+        for path in args.path or DEFAULT_PATHS:
+            await run_http_benchmark(client, path, args.requests, args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--url", help="base URL of a running server; in-process when omitted")
+    parser.add_argument("--path", action="append", help="endpoint to hit (repeatable)")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, {args.concurrency} in flight")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Serialization cost of a large list response, per path.
+
+Encodes the same --rows ingredients (Decimal-heavy IngredientResponse) as:
+  - encoder:   jsonable_encoder + json.dumps (plain JSONResponse, no response_model)
+  - model:     response_model path: validate ORM objects, pydantic-core dump_json
+  - rows:      RowSerializer over selected column rows (no ORM objects, no validation)
+  - orjson:    FastJSONResponse over row dicts
+
+Only serialization is timed; the database fetch is the same for every path.
+
+Usage:
+    python -m benchmarks.json_serialization --rows 1000 --repeat 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import models  # noqa: F401
+from app.core.responses import RowSerializer, dumps
+from app.models.ingredient import Ingredient, UnitEnum
+from app.schemas.ingredient import IngredientResponse
+
+
+def build_rows(count: int) -> tuple[list[Ingredient], list[tuple]]:
+    now = datetime.utcnow()
+    ingredients = [
+        Ingredient(
+            id=n,
+            name=f"Ingredient {n}",
+            unit=UnitEnum.g,
+            cost_per_unit=Decimal("0.0125") * n,
+            supplier_name=None,
+            active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for n in range(1, count + 1)
+    ]
+    fields = tuple(IngredientResponse.model_fields)
+    rows = [tuple(getattr(ingredient, name) for name in fields) for ingredient in ingredients]
+    return ingredients, rows
+
+
+def measure(name: str, encode: Callable[[], bytes], repeat: int, rows: int, baseline: float | None) -> float:
+    encode()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode()
+    per_call = (time.perf_counter() - started) / repeat
+    gain = f"  x{baseline / per_call:5.1f}" if baseline else ""
+    print(f"{name:>8}: {per_call * 1000:7.2f} ms/response  {rows / per_call:12,.0f} rows/s{gain}")
+    return per_call
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    ingredients, rows = build_rows(args.rows)
+    fields = tuple(IngredientResponse.model_fields)
+    adapter = TypeAdapter(list[IngredientResponse])
+    serializer = RowSerializer(IngredientResponse)
+
+    def encoder() -> bytes:
+        validated = [IngredientResponse.model_validate(ingredient) for ingredient in ingredients]
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def model() -> bytes:
+        return adapter.dump_json(adapter.validate_python(ingredients, from_attributes=True))
+
+    def row_serializer() -> bytes:
+        return serializer.dump(rows)
+
+    def orjson_rows() -> bytes:
+        return dumps([dict(zip(fields, row)) for row in rows])
+
+    assert json.loads(model()) == json.loads(row_serializer())
+
+    baseline = measure("encoder", encoder, args.repeat, args.rows, None)
+    measure("model", model, args.repeat, args.rows, baseline)
+    measure("rows", row_serializer, args.repeat, args.rows, baseline)
+    measure("orjson", orjson_rows, args.repeat, args.rows, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Session
+
+from app import models  # noqa: F401
+from app.database import SessionLocal
+from app.services.ingredient_service import ingredient_service
+
+
+def main() -> None:
+    db: Session = SessionLocal()
+    try:
+        count = ingredient_service.backfill_price_history(db)
+        print(f"Price history seeded for {count} ingredients")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
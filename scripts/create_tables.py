@@ -1,9 +1,10 @@
-from app import models  # noqa: F401
-from app.database import Base, engine
+from app.database import engine
+from app.migrations import upgrade_schema
 
 
 def main() -> None:
-    Base.metadata.create_all(bind=engine)
+    # Creates missing tables and upgrades existing ones (columns, constraints, indexes)
+    upgrade_schema(engine)
 
 
 if __name__ == "__main__":
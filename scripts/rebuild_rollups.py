@@ -0,0 +1,18 @@
+from sqlalchemy.orm import Session
+
+from app import models  # noqa: F401
+from app.database import SessionLocal
+from app.services.rollup_service import rollup_service
+
+
+def main() -> None:
+    db: Session = SessionLocal()
+    try:
+        rollup_service.rebuild(db)
+        print("Rollups rebuilt")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
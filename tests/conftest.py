@@ -1,31 +1,59 @@
-from typing import Generator
+import os
+import tempfile
+from typing import AsyncGenerator, Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
-from app.core.security import create_access_token
-from app.database import Base, get_db
+from app.core.api_keys import api_key_cache
+from app.core.principal import principal_cache
+from app.core.revocation import revocation_list
+from app.core.security import create_access_token, user_token_claims
+from app.database import Base, get_async_db, get_db
 from app.main import app
 from app.models.user import RoleEnum, User
+from app.services.analytics_service import analytics_service
+from app.services.dashboard_service import dashboard_service
+from app.services.search_service import search_service
 
-# Use SQLite in-memory for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# SQLite file shared by the sync engine (fixtures, sync endpoints) and the aiosqlite
+# engine behind async endpoints; an in-memory database would be private to one connection
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="solidifica-tests-"), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: each TestClient runs its own event loop, pooled connections would outlive it
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def assert_query_budget(response, budget: int) -> None:
+    """Fail when the request ran more SQL statements than `budget` (X-Query-Count header)."""
+    count = int(response.headers["X-Query-Count"])
+    assert count <= budget, f"{count} SQL statements, budget is {budget}"
+
 
 @pytest.fixture(scope="function")
 def db() -> Generator[Session, None, None]:
     # Create tables
     Base.metadata.create_all(bind=engine)
+    # Per-worker in-memory state must not leak between tests
+    search_service.invalidate_ingredients()
+    search_service.invalidate_recipes()
+    dashboard_service.cache.clear()
+    analytics_service.clear_cache()
+    principal_cache.clear()
+    revocation_list.clear()
+    api_key_cache.clear()
     session = TestingSessionLocal()
     try:
         yield session
@@ -42,7 +70,12 @@ def client(db: Session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -58,7 +91,7 @@ def admin_token(db: Session) -> str:
     )
     db.add(user)
     db.commit()
-    return create_access_token(data={"sub": user.email})
+    return create_access_token(data=user_token_claims(user))
 
 
 @pytest.fixture
@@ -71,7 +104,7 @@ def operator_token(db: Session) -> str:
     )
     db.add(user)
     db.commit()
-    return create_access_token(data={"sub": user.email})
+    return create_access_token(data=user_token_claims(user))
 
 
 @pytest.fixture
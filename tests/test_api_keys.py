@@ -0,0 +1,149 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.ingredient import Ingredient, UnitEnum
+from app.models.user import RoleEnum, User
+from tests.conftest import async_engine, engine
+
+MOVEMENTS_SCOPE = "POST /inventory/movements"
+
+
+@pytest.fixture
+def flour(db: Session) -> Ingredient:
+    ingredient = Ingredient(name="Flour", unit=UnitEnum.g, cost_per_unit=0.005)
+    db.add(ingredient)
+    db.commit()
+    db.refresh(ingredient)
+    return ingredient
+
+
+@pytest.fixture
+def device_key(client: TestClient, admin_headers: dict) -> dict:
+    response = client.post(
+        "/api/v1/api-keys",
+        json={"name": "Scale 1", "role": "OPERATOR", "scopes": ["post /api/v1/inventory/movements"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_api_key_is_shown_once_and_stored_hashed(client: TestClient, admin_headers: dict, device_key: dict):
+    assert device_key["key"].startswith(f"sol_{device_key['prefix']}_")
+    assert device_key["scopes"] == [MOVEMENTS_SCOPE]
+
+    [listed] = client.get("/api/v1/api-keys", headers=admin_headers).json()
+    assert "key" not in listed
+    assert listed["prefix"] == device_key["prefix"]
+
+
+def test_device_posts_movements_with_api_key(client: TestClient, device_key: dict, flour: Ingredient):
+    headers = {"X-API-Key": device_key["key"]}
+    payload = {"ingredient_id": flour.id, "type": "IN", "quantity": 10, "unit_cost_at_time": 0.005}
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM api_keys" in statement:
+            statements.append(statement)
+
+    # Async endpoints authenticate on their own AsyncSession
+    engines = (engine, async_engine.sync_engine)
+    for bind in engines:
+        event.listen(bind, "before_cursor_execute", capture)
+    try:
+        for _ in range(3):
+            response = client.post("/api/v1/inventory/movements", json=payload, headers=headers)
+            assert response.status_code == 201
+    finally:
+        for bind in engines:
+            event.remove(bind, "before_cursor_execute", capture)
+    assert len(statements) == 1  # later requests are served by the worker cache
+    assert response.json()["created_by"] == device_key["user_id"]
+
+    # Out of scope
+    assert client.get("/api/v1/inventory/movements", headers=headers).status_code == 403
+    # Wrong secret with a valid prefix
+    forged = {"X-API-Key": device_key["key"][:-4] + "abcd"}
+    assert client.post("/api/v1/inventory/movements", json=payload, headers=forged).status_code == 401
+
+
+def test_revoked_api_key_is_rejected(
+    client: TestClient, admin_headers: dict, device_key: dict, flour: Ingredient
+):
+    headers = {"X-API-Key": device_key["key"]}
+    payload = {"ingredient_id": flour.id, "type": "IN", "quantity": 1, "unit_cost_at_time": 0.005}
+    assert client.post("/api/v1/inventory/movements", json=payload, headers=headers).status_code == 201
+
+    response = client.delete(f"/api/v1/api-keys/{device_key['id']}", headers=admin_headers)
+    assert response.json()["active"] is False
+    assert client.post("/api/v1/inventory/movements", json=payload, headers=headers).status_code == 401
+
+
+def test_invalid_scope_is_rejected(client: TestClient, admin_headers: dict):
+    response = client.post(
+        "/api/v1/api-keys", json={"name": "x", "scopes": ["FETCH movements"]}, headers=admin_headers
+    )
+    assert response.status_code == 422
+
+
+def test_unknown_key_lookups_are_cached(client: TestClient, flour: Ingredient):
+    headers = {"X-API-Key": "sol_000000000000_not-a-real-key"}
+    payload = {"ingredient_id": flour.id, "type": "IN", "quantity": 1, "unit_cost_at_time": 0.005}
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM api_keys" in statement:
+            statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for bind in engines:
+        event.listen(bind, "before_cursor_execute", capture)
+    try:
+        for _ in range(3):
+            assert client.post("/api/v1/inventory/movements", json=payload, headers=headers).status_code == 401
+    finally:
+        for bind in engines:
+            event.remove(bind, "before_cursor_execute", capture)
+    assert len(statements) == 1
+
+
+def test_key_of_deleted_owner_is_rejected(
+    client: TestClient, admin_headers: dict, db: Session, flour: Ingredient
+):
+    owner = User(email="scale@example.com", hashed_password="x", role=RoleEnum.OPERATOR)
+    db.add(owner)
+    db.commit()
+    response = client.post(
+        "/api/v1/api-keys",
+        json={"name": "Scale 2", "user_id": owner.id, "scopes": [MOVEMENTS_SCOPE]},
+        headers=admin_headers,
+    )
+    headers = {"X-API-Key": response.json()["key"]}
+    payload = {"ingredient_id": flour.id, "type": "IN", "quantity": 1, "unit_cost_at_time": 0.005}
+
+    db.delete(owner)
+    db.commit()
+    assert client.post("/api/v1/inventory/movements", json=payload, headers=headers).status_code == 401
+
+
+def test_key_role_is_capped_at_owner_role(client: TestClient, admin_headers: dict, db: Session):
+    owner = User(email="lead@example.com", hashed_password="x", role=RoleEnum.ADMIN)
+    db.add(owner)
+    db.commit()
+    response = client.post(
+        "/api/v1/api-keys",
+        json={"name": "Lead", "user_id": owner.id, "role": "ADMIN", "scopes": ["GET /api-keys"]},
+        headers=admin_headers,
+    )
+    headers = {"X-API-Key": response.json()["key"]}
+    assert client.get("/api/v1/api-keys", headers=headers).status_code == 200
+
+    owner.role = RoleEnum.OPERATOR
+    db.flush()
+    # Still cached until the demotion commits
+    assert client.get("/api/v1/api-keys", headers=headers).status_code == 200
+    db.commit()
+    assert client.get("/api/v1/api-keys", headers=headers).status_code == 403
@@ -0,0 +1,223 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.passwords import crypt_context
+from app.core.principal import principal_cache
+from app.core.revocation import RevocationList
+from app.core.security import create_access_token, get_password_hash, password_hasher
+from app.models.revoked_token import RevokedToken
+from app.models.user import RoleEnum, User
+from tests.conftest import engine
+
+
+@pytest.fixture
+def user_queries():
+    """Statements that read the users table, captured at the engine."""
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def test_login_token_carries_uid_and_role(client: TestClient, db: Session):
+    user = User(
+        email="chef@test.com",
+        hashed_password=get_password_hash("s3cret"),
+        role=RoleEnum.OPERATOR,
+    )
+    db.add(user)
+    db.commit()
+
+    response = client.post("/api/v1/auth/login", data={"username": "chef@test.com", "password": "s3cret"})
+    assert response.status_code == 200
+    claims = jwt.decode(response.json()["access_token"], settings.secret_key, algorithms=[settings.algorithm])
+    assert (claims["sub"], claims["uid"], claims["role"]) == ("chef@test.com", user.id, "OPERATOR")
+
+
+def test_principal_is_cached_per_subject(client: TestClient, admin_headers: dict, user_queries: list):
+    for _ in range(3):
+        assert client.get("/api/v1/users/me", headers=admin_headers).status_code == 200
+    assert len(user_queries) == 1
+
+
+def test_role_change_invalidates_principal(client: TestClient, db: Session, admin_headers: dict):
+    payload = {"email": "new@test.com", "password": "pw", "role": "VIEWER"}
+    assert client.post("/api/v1/users", json=payload, headers=admin_headers).status_code == 201
+
+    admin = db.query(User).filter(User.email == "admin@test.com").one()
+    admin.role = RoleEnum.VIEWER
+    db.flush()
+    # Evicted on commit, not during the flush
+    assert principal_cache.get("admin@test.com").role == RoleEnum.ADMIN
+    db.rollback()
+    assert principal_cache.get("admin@test.com").role == RoleEnum.ADMIN
+
+    admin.role = RoleEnum.VIEWER
+    db.commit()
+    assert principal_cache.get("admin@test.com") is None
+
+    payload["email"] = "other@test.com"
+    assert client.post("/api/v1/users", json=payload, headers=admin_headers).status_code == 403
+
+
+def test_deleted_user_and_foreign_uid_are_rejected(client: TestClient, db: Session, admin_headers: dict):
+    admin = db.query(User).filter(User.email == "admin@test.com").one()
+    forged = create_access_token(data={"sub": admin.email, "uid": admin.id + 100, "role": "ADMIN"})
+    response = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {forged}"})
+    assert response.status_code == 401
+
+    assert client.get("/api/v1/users/me", headers=admin_headers).status_code == 200
+    db.delete(admin)
+    db.commit()
+    assert client.get("/api/v1/users/me", headers=admin_headers).status_code == 401
+
+
+def test_login_rehashes_on_work_factor_change(client: TestClient, db: Session):
+    user = User(email="old@test.com", hashed_password=crypt_context(4).hash("pw"), role=RoleEnum.VIEWER)
+    db.add(user)
+    db.commit()
+
+    bad = client.post("/api/v1/auth/login", data={"username": "old@test.com", "password": "nope"})
+    assert bad.status_code == 401
+    assert user.hashed_password.startswith("$2b$04$")
+
+    response = client.post("/api/v1/auth/login", data={"username": "old@test.com", "password": "pw"})
+    assert response.status_code == 200
+    db.refresh(user)
+    assert user.hashed_password.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
+    assert password_hasher.verify("pw", user.hashed_password)
+
+
+def test_login_sheds_load_when_hash_pool_is_saturated(client: TestClient, db: Session, monkeypatch):
+    db.add(User(email="busy@test.com", hashed_password=crypt_context(4).hash("pw"), role=RoleEnum.VIEWER))
+    db.commit()
+    monkeypatch.setattr(password_hasher, "_max_pending", 0)
+
+    response = client.post("/api/v1/auth/login", data={"username": "busy@test.com", "password": "pw"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+@pytest.fixture
+def login_tokens(client: TestClient, db: Session) -> dict:
+    db.add(User(email="op2@test.com", hashed_password=crypt_context(4).hash("pw"), role=RoleEnum.OPERATOR))
+    db.commit()
+    response = client.post("/api/v1/auth/login", data={"username": "op2@test.com", "password": "pw"})
+    return response.json()
+
+
+def test_refresh_rotates_and_is_single_use(client: TestClient, login_tokens: dict):
+    refresh_token = login_tokens["refresh_token"]
+    # A refresh token is not an access token
+    response = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {refresh_token}"})
+    assert response.status_code == 401
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != refresh_token
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).json()["email"] == "op2@test.com"
+
+    # Reuse of the old refresh token is refused
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+    # An access token cannot be used to refresh
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": rotated["access_token"]})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_tokens(client: TestClient, login_tokens: dict):
+    headers = {"Authorization": f"Bearer {login_tokens['access_token']}"}
+    response = client.post(
+        "/api/v1/auth/logout", json={"refresh_token": login_tokens["refresh_token"]}, headers=headers
+    )
+    assert response.status_code == 204
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": login_tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_logout_with_legacy_token_without_jti(client: TestClient, admin_token: str):
+    legacy = jwt.encode(
+        {"sub": "admin@test.com", "exp": datetime.utcnow() + timedelta(minutes=5)},
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+    headers = {"Authorization": f"Bearer {legacy}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    # Nothing to revoke: the token keeps working until it expires
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 204
+
+
+def test_revocation_check_is_served_from_memory(client: TestClient, admin_headers: dict):
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "revoked_tokens" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        for _ in range(5):
+            assert client.get("/api/v1/users/me", headers=admin_headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert len(statements) == 1  # initial sync only
+
+
+def test_revocations_propagate_to_other_workers(db: Session):
+    other_worker = RevocationList(sync_seconds=0)
+    assert not other_worker.is_revoked(db, "abc")
+
+    db.add(RevokedToken(jti="abc", expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.commit()
+    assert other_worker.is_revoked(db, "abc")
+
+
+def test_expired_revocations_are_evicted_and_pruned(db: Session, monkeypatch):
+    import app.core.revocation as revocation
+
+    now = datetime.utcnow()
+    revocations = RevocationList(sync_seconds=0, prune_seconds=0)
+    db.add(RevokedToken(jti="stale", expires_at=now + timedelta(hours=1)))
+    db.commit()
+    assert revocations.is_revoked(db, "stale")
+
+    class Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now + timedelta(hours=2)
+
+    monkeypatch.setattr(revocation, "datetime", Later)
+    revocations.is_revoked(db, "other")
+    assert "stale" not in revocations._jtis
+
+    # The next revocation also deletes expired rows
+    assert revocations.revoke(db, "fresh", now + timedelta(hours=3))
+    assert [row.jti for row in db.query(RevokedToken).all()] == ["fresh"]
+
+
+def test_async_endpoint_authenticates_on_its_async_session(client: TestClient, admin_headers: dict):
+    from app.database import get_db
+    from app.main import app
+
+    def no_sync_session():
+        raise AssertionError("async endpoint opened a sync session")
+        yield  # pragma: no cover
+
+    app.dependency_overrides[get_db] = no_sync_session
+    assert client.get("/api/v1/inventory/balance", headers=admin_headers).status_code == 200
+    assert client.post("/api/v1/batches", json={}, headers=admin_headers).status_code == 422
+    response = client.get("/api/v1/inventory/balance", headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
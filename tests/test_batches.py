@@ -90,3 +90,43 @@ def test_produce_batch_insufficient_stock(
     response = client.post(f"/api/v1/batches/{batch_id}/produce", json={}, headers=admin_headers)
     assert response.status_code == 400
     assert "Insufficient stock" in response.json()["detail"]
+
+
+def test_produce_batch_explodes_sub_recipes(
+    client: TestClient, admin_headers: dict, db: Session, ingredients_setup: dict
+):
+    # Base yields 100g from 80g Flour + 20g Sugar; Product uses 50g Base (10% waste) per unit
+    base = Recipe(name="Base", yield_quantity=100, yield_unit=UnitEnum.g)
+    product = Recipe(name="Bar", yield_quantity=1, yield_unit=UnitEnum.un)
+    db.add_all([base, product])
+    db.flush()
+    db.add_all([
+        RecipeItem(recipe_id=base.id, ingredient_id=ingredients_setup["flour"].id, quantity=80, waste_factor=0),
+        RecipeItem(recipe_id=base.id, ingredient_id=ingredients_setup["sugar"].id, quantity=20, waste_factor=0),
+        RecipeItem(recipe_id=product.id, sub_recipe_id=base.id, quantity=50, waste_factor=0.1),
+    ])
+    db.commit()
+
+    for ingredient in ("flour", "sugar"):
+        client.post(
+            "/api/v1/inventory/movements",
+            json={"ingredient_id": ingredients_setup[ingredient].id, "type": "IN", "quantity": 1000, "unit_cost_at_time": 0.01},
+            headers=admin_headers,
+        )
+
+    batch_id = client.post(
+        "/api/v1/batches", json={"recipe_id": product.id, "planned_units": 10}, headers=admin_headers
+    ).json()["id"]
+    response = client.post(f"/api/v1/batches/{batch_id}/produce", json={}, headers=admin_headers)
+    assert response.status_code == 200
+
+    # 10 bars -> 550g Base -> 440g Flour + 110g Sugar
+    used = {c["ingredient_id"]: float(c["quantity_used"]) for c in response.json()["consumptions"]}
+    assert used == {ingredients_setup["flour"].id: 440.0, ingredients_setup["sugar"].id: 110.0}
+    # 440 * 0.005 + 110 * 0.002 = 2.42
+    assert float(response.json()["cost_snapshot_total"]) == 2.42
+
+    # Production rollup is updated on the PLANNED -> PRODUCED transition
+    stats = client.get("/api/v1/dashboard/stats", headers=admin_headers).json()
+    assert float(stats["monthly_production_cost"]) == 2.42
+    assert float(stats["total_products_produced"]) == 10.0
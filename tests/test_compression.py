@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+import zlib
+from decimal import Decimal
+
+import brotli
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.models.ingredient import Ingredient
+from app.models.rollup import InventoryBalance
+
+
+@pytest.fixture
+def catalog(db: Session) -> None:
+    db.execute(
+        insert(Ingredient),
+        [
+            {
+                "id": n,
+                "name": f"Ingredient {n}",
+                "search_name": f"ingredient {n}",
+                "unit": "g",
+                "cost_per_unit": Decimal("0.0125"),
+            }
+            for n in range(1, 301)
+        ],
+    )
+    db.execute(insert(InventoryBalance), [{"ingredient_id": n, "quantity": n} for n in range(1, 301)])
+    db.commit()
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("gzip, deflate, br", ("gzip",)) == "gzip"
+    assert negotiate_encoding("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("gzip;q=0, *", ("gzip",)) is None
+    assert negotiate_encoding("*", ("br", "gzip")) == "br"
+    assert negotiate_encoding("identity", ("gzip",)) is None
+    assert negotiate_encoding("", ("gzip",)) is None
+
+
+def test_large_list_is_gzipped(client: TestClient, admin_headers: dict, catalog):
+    response = client.get("/api/v1/ingredients?limit=300", headers={**admin_headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert len(response.json()) == 300
+
+
+def test_small_and_unnegotiated_responses_are_not_compressed(client: TestClient, admin_headers: dict, catalog):
+    response = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/api/v1/ingredients?limit=300", headers={**admin_headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_streamed_valuation_is_gzipped(client: TestClient, admin_headers: dict, catalog):
+    with client.stream(
+        "GET", "/api/v1/inventory/valuation", headers={**admin_headers, "Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    body = gzip.decompress(raw)
+    assert len(body) > 3 * len(raw)
+    assert body.count(b'"ingredient_id"') == 300
+
+
+def test_stream_chunks_are_flushed_and_event_streams_skipped():
+    async def chunks():
+        for n in range(3):
+            yield b"x" * n
+
+    async def stream(request):
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    async def events(request):
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/stream", stream), Route("/events", events)])
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        # Even tiny chunks are compressed: the size of a stream is unknown up front
+        assert response.headers["content-encoding"] == "gzip"
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        assert decompressor.decompress(b"".join(response.iter_raw())) == b"xxx"
+
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content == b"xxx"
+
+
+def test_large_list_is_brotli_compressed(client: TestClient, admin_headers: dict, catalog):
+    headers = {**admin_headers, "Accept-Encoding": "gzip, br"}
+    with client.stream("GET", "/api/v1/ingredients?limit=300", headers=headers) as response:
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["vary"] == "Accept-Encoding"
+        raw = b"".join(response.iter_raw())
+    assert int(response.headers["content-length"]) == len(raw)
+    assert len(orjson.loads(brotli.decompress(raw))) == 300
+
+
+def test_streamed_brotli_chunks_are_flushed():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        for n in range(1, 4):
+            await send({"type": "http.response.body", "body": b"y" * n, "more_body": n < 3})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"br")]}
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+
+    start, *bodies = messages
+    assert (b"content-encoding", b"br") in start["headers"]
+    decompressor = brotli.Decompressor()
+    # Each chunk decodes on arrival: the stream is flushed, not buffered until the end
+    assert [decompressor.process(message["body"]) for message in bodies] == [b"y", b"yy", b"yyy"]
+    assert decompressor.is_finished()
@@ -1,13 +1,17 @@
+from datetime import date, datetime
 from decimal import Decimal
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from app.models.batch import Batch, BatchStatusEnum
+from app.models.batch import Batch, BatchConsumption, BatchStatusEnum
 from app.models.ingredient import Ingredient, UnitEnum
 from app.models.inventory import InventoryMovement, MovementTypeEnum
 from app.models.recipe import Recipe, RecipeItem
+from app.services.analytics_service import AnalyticsService
+from tests.conftest import engine
 
 
 @pytest.fixture
@@ -87,3 +91,226 @@ def test_dashboard_alerts(
     alert_names = [a["name"] for a in data]
     assert "Saffron" in alert_names
     assert "Water" not in alert_names
+
+
+def test_rollups_maintained_on_write_match_rebuild(
+    client: TestClient, admin_headers: dict, db: Session, dashboard_setup: dict
+):
+    from app.models.rollup import InventoryBalance, InventoryDailyRollup, ProductionDailyRollup
+    from app.services.rollup_service import rollup_service
+
+    # OUT without unit cost is valued at the ingredient's current cost
+    response = client.post(
+        "/api/v1/inventory/movements",
+        json={"ingredient_id": dashboard_setup["saffron"].id, "type": "OUT", "quantity": 2},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+
+    def snapshot():
+        db.expire_all()
+        return (
+            sorted((b.ingredient_id, float(b.quantity)) for b in db.query(InventoryBalance)),
+            sorted(
+                (str(r.day), r.ingredient_id, float(r.quantity_delta), float(r.value_delta))
+                for r in db.query(InventoryDailyRollup)
+            ),
+            sorted(
+                (str(r.day), r.recipe_id, r.batches, float(r.units), float(r.cost))
+                for r in db.query(ProductionDailyRollup)
+            ),
+        )
+
+    incremental = snapshot()
+    assert (dashboard_setup["saffron"].id, 3.0) in incremental[0]
+
+    rollup_service.rebuild(db)
+    assert snapshot() == incremental
+
+    data = client.get("/api/v1/dashboard/stats", headers=admin_headers).json()
+    # Saffron: 3 * 50 = 150, Water: 10
+    assert float(data["total_inventory_value"]) == 160.0
+
+
+def test_dashboard_etag_and_version_invalidation(
+    client: TestClient, admin_headers: dict, dashboard_setup: dict
+):
+    first = client.get("/api/v1/dashboard/stats", headers=admin_headers)
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+
+    # Same version -> 304 with no body
+    response = client.get("/api/v1/dashboard/stats", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Alerts validators are independent and depend on the threshold
+    alerts = client.get("/api/v1/dashboard/alerts?threshold=10", headers=admin_headers)
+    assert alerts.headers["etag"] != etag
+    other = client.get("/api/v1/dashboard/alerts?threshold=5", headers=admin_headers)
+    assert other.headers["etag"] != alerts.headers["etag"]
+
+    # A movement bumps the inventory version: new ETag and fresh numbers
+    client.post(
+        "/api/v1/inventory/movements",
+        json={"ingredient_id": dashboard_setup["water"].id, "type": "IN", "quantity": 1000, "unit_cost_at_time": 0.01},
+        headers=admin_headers,
+    )
+    response = client.get("/api/v1/dashboard/stats", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert float(response.json()["total_inventory_value"]) == 270.0
+
+
+def test_inventory_version_bumps_once_per_commit(db: Session, dashboard_setup: dict):
+    from app.models.data_version import INVENTORY_VERSION, get_data_version
+    from app.models.user import RoleEnum, User
+
+    user = User(email="writer@test.com", hashed_password="x", role=RoleEnum.ADMIN)
+    db.add(user)
+    db.commit()
+    water = dashboard_setup["water"]
+    before = get_data_version(db, INVENTORY_VERSION)
+
+    statements: list[str] = []
+    capture = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        for _ in range(3):
+            db.add(InventoryMovement(ingredient_id=water.id, type=MovementTypeEnum.IN, quantity=1, created_by=user.id))
+        db.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    # Nothing touches data_versions inside the writer's transaction
+    assert statements and not any("data_versions" in statement for statement in statements)
+    db.commit()
+    assert get_data_version(db, INVENTORY_VERSION) == before + 1
+
+    db.add(InventoryMovement(ingredient_id=water.id, type=MovementTypeEnum.IN, quantity=1, created_by=user.id))
+    db.flush()
+    db.rollback()
+    assert get_data_version(db, INVENTORY_VERSION) == before + 1
+
+    # Only ingredient fields the dashboard reads count
+    water = db.get(Ingredient, water.id)
+    water.supplier_name = "Tap"
+    db.commit()
+    assert get_data_version(db, INVENTORY_VERSION) == before + 1
+    water.cost_per_unit = 0.02
+    db.commit()
+    assert get_data_version(db, INVENTORY_VERSION) == before + 2
+
+
+def _produced_batch(db: Session, code: str, recipe: Recipe, produced_at, units, cost, consumptions=()):
+    batch = Batch(
+        code=code,
+        recipe_id=recipe.id,
+        status=BatchStatusEnum.PRODUCED,
+        planned_units=units,
+        actual_units=units,
+        cost_snapshot_total=cost,
+        produced_at=produced_at,
+        created_by=1,
+    )
+    batch.consumptions = [
+        BatchConsumption(ingredient_id=ingredient.id, quantity_used=quantity, unit_cost_at_time=unit_cost)
+        for ingredient, quantity, unit_cost in consumptions
+    ]
+    db.add(batch)
+    db.commit()
+    return batch
+
+
+@pytest.fixture
+def production_history(db: Session):
+    flour = Ingredient(name="Flour", unit=UnitEnum.g, cost_per_unit=0.01, active=True)
+    bread = Recipe(name="Bread", yield_quantity=1, yield_unit=UnitEnum.un)
+    cake = Recipe(name="Cake", yield_quantity=1, yield_unit=UnitEnum.un)
+    db.add_all([flour, bread, cake])
+    db.commit()
+
+    _produced_batch(db, "B1", bread, datetime(2026, 1, 5, 9), 10, 20, [(flour, 1000, 0.01)])
+    _produced_batch(db, "B2", bread, datetime(2026, 1, 11, 18), 5, 10, [(flour, 500, 0.01)])  # Sunday
+    _produced_batch(db, "C1", cake, datetime(2026, 2, 2, 8), 2, 30, [(flour, 300, 0.01)])
+    return {"flour": flour, "bread": bread, "cake": cake}
+
+
+def test_production_series_by_month(client: TestClient, admin_headers: dict, production_history: dict):
+    response = client.get(
+        "/api/v1/dashboard/production?granularity=month&from=2026-01-15&to=2026-03-10",
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["periods"] == ["2026-01-01", "2026-02-01", "2026-03-01"]
+    [total] = data["series"]
+    assert total["key"] is None
+    assert [p["batches"] for p in total["points"]] == [2, 1, 0]
+    assert [float(p["cost"]) for p in total["points"]] == [30.0, 30.0, 0.0]
+
+    response = client.get(
+        "/api/v1/dashboard/production?granularity=month&from=2026-01-01&to=2026-02-28&group_by=recipe",
+        headers=admin_headers,
+    )
+    series = {s["name"]: s for s in response.json()["series"]}
+    assert [float(p["units"]) for p in series["Bread"]["points"]] == [15.0, 0.0]
+    assert [float(p["units"]) for p in series["Cake"]["points"]] == [0.0, 2.0]
+
+
+def test_production_series_weeks_and_ingredients(
+    client: TestClient, admin_headers: dict, production_history: dict
+):
+    # Weeks start on Monday: Jan 5 (Mon) and Jan 11 (Sun) share a bucket
+    response = client.get(
+        "/api/v1/dashboard/production?granularity=week&from=2026-01-05&to=2026-02-08&group_by=ingredient",
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["periods"][0] == "2026-01-05"
+    [flour] = data["series"]
+    assert flour["key"] == production_history["flour"].id
+    points = {p["period"]: p for p in flour["points"]}
+    assert float(points["2026-01-05"]["units"]) == 1500.0
+    assert points["2026-01-05"]["batches"] == 2
+    assert float(points["2026-02-02"]["cost"]) == 3.0
+
+
+def test_production_series_caches_closed_buckets(
+    client: TestClient, admin_headers: dict, db: Session, production_history: dict
+):
+    url = "/api/v1/dashboard/production?granularity=month&from=2026-01-01"
+    first = client.get(url, headers=admin_headers).json()
+
+    # A back-dated insert into a closed month is not seen (bucket is final) ...
+    _produced_batch(db, "B3", production_history["bread"], datetime(2026, 1, 20), 1, 100)
+    # ... while the open month is recomputed on every request
+    _produced_batch(db, "B4", production_history["bread"], datetime.utcnow(), 1, 7)
+
+    second = client.get(url, headers=admin_headers).json()
+    [before], [after] = first["series"], second["series"]
+    assert after["points"][0] == before["points"][0]
+    assert float(after["points"][-1]["cost"]) == float(before["points"][-1]["cost"]) + 7
+
+
+def test_closed_bucket_cache_is_bounded(db: Session, production_history: dict):
+    analytics = AnalyticsService(max_closed_buckets=3)
+    analytics.production_series(db, granularity="month", date_from=date(2025, 1, 1), date_to=date(2025, 12, 31))
+    assert len(analytics._closed) == 3
+    # Least recently used buckets go first: the latest three months stay
+    assert [start for _, _, start in analytics._closed] == [date(2025, 10, 1), date(2025, 11, 1), date(2025, 12, 1)]
+
+    series = analytics.production_series(db, granularity="month", date_from=date(2026, 1, 1), date_to=date(2026, 2, 28))
+    assert [point.batches for point in series.series[0].points] == [2, 1]
+    assert len(analytics._closed) == 3
+
+
+def test_production_series_rejects_bad_range(client: TestClient, admin_headers: dict):
+    response = client.get(
+        "/api/v1/dashboard/production?from=2026-02-01&to=2026-01-01", headers=admin_headers
+    )
+    assert response.status_code == 400
+    response = client.get(
+        "/api/v1/dashboard/production?granularity=day&from=2020-01-01&to=2026-01-01", headers=admin_headers
+    )
+    assert response.status_code == 400
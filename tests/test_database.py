@@ -0,0 +1,167 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+
+import app.database as database
+from app.core.db_metrics import instrument_engine, pool_stats
+from app.database import Base, RoutingSession, get_db, to_async_url
+from app.main import app
+from app.models.ingredient import Ingredient
+
+
+def test_to_async_url_swaps_driver():
+    assert to_async_url("postgresql+psycopg2://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert to_async_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert to_async_url("sqlite:////tmp/app.db") == "sqlite+aiosqlite:////tmp/app.db"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://u:p@db/app")
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    """A one-connection QueuePool that times out quickly, instrumented as "test-pool"."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics = instrument_engine(engine, "test-pool")
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_pool_metrics_time_checkouts_and_timeouts(small_pool):
+    engine, metrics = small_pool
+
+    with engine.connect():
+        snapshot = pool_stats()["test-pool"]
+        assert (snapshot["in_use"], snapshot["size"], snapshot["checkouts"]) == (1, 1, 1)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    snapshot = pool_stats()["test-pool"]
+    assert snapshot["in_use"] == 0
+    assert snapshot["checkout_waits"] == 2
+    assert snapshot["checkout_timeouts"] == 1
+    # The saturated checkout queued for the whole pool_timeout
+    assert snapshot["checkout_wait_ms_max"] >= 50
+    assert snapshot["connects"] == 1
+    assert snapshot["connect_ms_max"] > 0
+
+    # Survives engine.dispose(), which replaces the pool
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert pool_stats()["test-pool"]["checkouts"] == 2
+    assert metrics.checkout_waits == 3
+    assert metrics.connects == 2
+
+
+def test_metrics_endpoint_requires_admin(
+    client: TestClient, admin_headers: dict, operator_headers: dict, small_pool
+):
+    assert client.get("/api/v1/metrics").status_code == 401
+    assert client.get("/api/v1/metrics", headers=operator_headers).status_code == 403
+
+    response = client.get("/api/v1/metrics", headers=admin_headers)
+    assert response.status_code == 200
+    pool = response.json()["db_pools"]["test-pool"]
+    assert pool["pool"] == "QueuePool"
+    assert {"in_use", "overflow", "checkout_wait_ms_total", "checkout_timeouts"} <= pool.keys()
+
+
+def test_pool_timeout_is_a_503_and_counted(client: TestClient, admin_headers: dict, small_pool):
+    engine, metrics = small_pool
+    session_factory = sessionmaker(bind=engine)
+
+    def saturated_db():
+        with session_factory() as session:
+            yield session
+
+    with engine.connect():
+        app.dependency_overrides[get_db] = saturated_db
+        response = client.get("/api/v1/ingredients", headers=admin_headers)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert metrics.checkout_timeouts == 1
+
+
+@pytest.fixture
+def replica_pair(tmp_path):
+    """Two SQLite files standing in for a primary and its replica."""
+    engines = []
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as session:
+            session.add(Ingredient(name=f"{name} flour", unit="kg", cost_per_unit=Decimal("1")))
+            session.commit()
+        engines.append(engine)
+    yield tuple(engines)
+    for engine in engines:
+        engine.dispose()
+
+
+def names(session) -> list[str]:
+    return list(session.scalars(select(Ingredient.name).order_by(Ingredient.id)))
+
+
+def test_routing_session_reads_replica_until_first_write(replica_pair):
+    primary, replica = replica_pair
+    factory = sessionmaker(class_=RoutingSession, bind=primary, replica_bind=replica)
+
+    with factory() as session:
+        assert names(session) == ["primary flour"]
+
+    with factory(use_replica=True) as session:
+        assert names(session) == ["replica flour"]
+        session.add(Ingredient(name="sugar", unit="kg", cost_per_unit=Decimal("2")))
+        session.flush()
+        # Pinned to the primary: the session sees its own uncommitted write
+        assert names(session) == ["primary flour", "sugar"]
+        session.commit()
+
+    with factory(use_replica=True) as session:
+        session.execute(update(Ingredient).values(unit="g"))
+        assert session.get_bind() is primary
+        session.rollback()
+
+
+def test_get_db_uses_replica_for_reads_only(replica_pair, monkeypatch):
+    primary, replica = replica_pair
+    monkeypatch.setattr(
+        database, "SessionLocal", sessionmaker(class_=RoutingSession, bind=primary, replica_bind=replica)
+    )
+    for method, expected in (("GET", ["replica flour"]), ("POST", ["primary flour"])):
+        dependency = get_db(Request({"type": "http", "method": method, "headers": []}))
+        session = next(dependency)
+        assert names(session) == expected
+        dependency.close()
+
+
+def test_async_routing_session_reads_replica(replica_pair):
+    primary, replica = replica_pair
+    async_primary, async_replica = (
+        create_async_engine(str(engine.url).replace("sqlite", "sqlite+aiosqlite"), poolclass=NullPool)
+        for engine in (primary, replica)
+    )
+    factory = async_sessionmaker(
+        async_primary, sync_session_class=RoutingSession, replica_bind=async_replica.sync_engine
+    )
+
+    async def read(use_replica: bool) -> list[str]:
+        async with factory(use_replica=use_replica) as session:
+            result = await session.scalars(select(Ingredient.name))
+            return list(result)
+
+    assert asyncio.run(read(True)) == ["replica flour"]
+    assert asyncio.run(read(False)) == ["primary flour"]
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.events import Broadcaster, broadcaster
+from app.models.ingredient import Ingredient, UnitEnum
+
+
+def _parse(message: str) -> tuple[str, dict]:
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+@pytest.fixture
+def saffron(db: Session) -> Ingredient:
+    ingredient = Ingredient(name="Saffron", unit=UnitEnum.g, cost_per_unit=50.0, active=True)
+    db.add(ingredient)
+    db.commit()
+    db.refresh(ingredient)
+    return ingredient
+
+
+def test_stream_requires_authentication(client: TestClient):
+    assert client.get("/api/v1/events/stream").status_code == 401
+    assert client.get("/api/v1/events/stream?access_token=garbage").status_code == 401
+
+
+def test_movements_fan_out_to_every_subscriber(
+    client: TestClient, admin_headers: dict, saffron: Ingredient
+):
+    def post(payload: dict):
+        response = client.post("/api/v1/inventory/movements", json=payload, headers=admin_headers)
+        assert response.status_code == 201
+
+    async def scenario():
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        try:
+            # Services publish from worker threads, like in the threadpool
+            await asyncio.to_thread(
+                post, {"ingredient_id": saffron.id, "type": "IN", "quantity": 15, "unit_cost_at_time": 50}
+            )
+            await asyncio.to_thread(post, {"ingredient_id": saffron.id, "type": "OUT", "quantity": 8})
+            received = []
+            for subscription in (first, second):
+                messages = [await asyncio.wait_for(subscription.queue.get(), 1) for _ in range(3)]
+                received.append([_parse(message) for message in messages])
+            return received
+        finally:
+            broadcaster.unsubscribe(first)
+            broadcaster.unsubscribe(second)
+
+    first, second = asyncio.run(scenario())
+    assert first == second
+    (e1, stock_in), (e2, stock_out), (e3, alert) = first
+    assert (e1, stock_in["delta"], stock_in["balance"]) == ("balance", "15.0000", "15.0000")
+    assert (e2, stock_out["delta"], stock_out["balance"]) == ("balance", "-8.0000", "7.0000")
+    # 15 -> 7 crosses the default threshold of 10
+    assert e3 == "low_stock"
+    assert alert["ingredient_id"] == saffron.id
+
+
+def test_slow_subscriber_is_dropped():
+    local = Broadcaster(max_queue=2)
+
+    async def scenario():
+        subscription = local.subscribe()
+        for n in range(3):
+            local.publish("batch", {"n": n})
+        await asyncio.sleep(0)
+        stream = local.stream(subscription, heartbeat_seconds=1)
+        chunks = [chunk async for chunk in stream]
+        return subscription, chunks
+
+    subscription, chunks = asyncio.run(scenario())
+    assert subscription.overflowed
+    assert chunks[0] == "retry: 3000\n\n"  # stream ends right away, client reconnects
+    assert local.subscriber_count == 0
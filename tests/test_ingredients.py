@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.models.ingredient import Ingredient, UnitEnum
+from tests.conftest import assert_query_budget
 
 
 def test_create_ingredient_admin(client: TestClient, admin_headers: dict):
@@ -72,3 +73,148 @@ def test_delete_ingredient_operator_forbidden(client: TestClient, operator_heade
 
     response = client.delete(f"/api/v1/ingredients/{ingredient.id}", headers=operator_headers)
     assert response.status_code == 403
+
+
+def test_cost_changes_are_recorded_in_price_history(client: TestClient, admin_headers: dict, db: Session):
+    from app.models.ingredient_price import IngredientPrice
+
+    created = client.post(
+        "/api/v1/ingredients",
+        json={"name": "Cocoa", "unit": "g", "cost_per_unit": 0.04},
+        headers=admin_headers,
+    ).json()
+
+    client.patch(f"/api/v1/ingredients/{created['id']}", json={"cost_per_unit": 0.05}, headers=admin_headers)
+    # Non-cost change does not add history
+    client.patch(f"/api/v1/ingredients/{created['id']}", json={"supplier_name": "ACME"}, headers=admin_headers)
+
+    history = (
+        db.query(IngredientPrice)
+        .filter(IngredientPrice.ingredient_id == created["id"])
+        .order_by(IngredientPrice.id)
+        .all()
+    )
+    assert [float(p.cost_per_unit) for p in history] == [0.04, 0.05]
+
+
+def test_search_ingredients_accent_insensitive(client: TestClient, admin_headers: dict, db: Session):
+    db.add_all([
+        Ingredient(name="Óleo Essencial de Lavanda", unit=UnitEnum.ml, cost_per_unit=0.5),
+        Ingredient(name="Óleo de Coco", unit=UnitEnum.ml, cost_per_unit=0.1),
+        Ingredient(name="Essência 100%", unit=UnitEnum.ml, cost_per_unit=0.2),
+        Ingredient(name="Oleo Antigo", unit=UnitEnum.ml, cost_per_unit=0.1, active=False),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/ingredients/search?q=OLEO", headers=admin_headers)
+    assert response.status_code == 200
+    assert [i["name"] for i in response.json()] == ["Óleo de Coco", "Óleo Essencial de Lavanda"]
+
+    response = client.get("/api/v1/ingredients/search?q=essencia", headers=admin_headers)
+    assert [i["name"] for i in response.json()] == ["Essência 100%", "Óleo Essencial de Lavanda"]
+
+    # LIKE wildcards in the query are literal
+    response = client.get("/api/v1/ingredients/search?q=100%25", headers=admin_headers)
+    assert [i["name"] for i in response.json()] == ["Essência 100%"]
+
+
+def test_autocomplete_ingredients(client: TestClient, admin_headers: dict, db: Session):
+    db.add(Ingredient(name="Óleo Essencial de Lavanda", unit=UnitEnum.ml, cost_per_unit=0.5))
+    db.commit()
+
+    response = client.get("/api/v1/ingredients/autocomplete?q=lav", headers=admin_headers)
+    assert response.status_code == 200
+    assert [i["name"] for i in response.json()] == ["Óleo Essencial de Lavanda"]
+
+    # Writes through the API refresh the index
+    client.post(
+        "/api/v1/ingredients",
+        json={"name": "Lavanda Seca", "unit": "g", "cost_per_unit": 0.3},
+        headers=admin_headers,
+    )
+    response = client.get("/api/v1/ingredients/autocomplete?q=Lavanda", headers=admin_headers)
+    assert {i["name"] for i in response.json()} == {"Lavanda Seca", "Óleo Essencial de Lavanda"}
+
+
+def test_ingredient_usage(client: TestClient, admin_headers: dict, db: Session):
+    from app.models.recipe import Recipe, RecipeItem
+
+    oil = Ingredient(name="Oil", unit=UnitEnum.ml, cost_per_unit=0.02)
+    lye = Ingredient(name="Lye", unit=UnitEnum.g, cost_per_unit=0.01)
+    db.add_all([oil, lye])
+    db.flush()
+    # Base: 800ml Oil (16.00) + 200g Lye (2.00) -> 1000g
+    base = Recipe(name="Soap Base", yield_quantity=1000, yield_unit=UnitEnum.g)
+    # Bar: 100g Base (1.80) + 10g Lye (0.10)
+    bar = Recipe(name="Soap Bar", yield_quantity=1, yield_unit=UnitEnum.un)
+    unrelated = Recipe(name="Other", yield_quantity=1, yield_unit=UnitEnum.un)
+    db.add_all([base, bar, unrelated])
+    db.flush()
+    db.add_all([
+        RecipeItem(recipe_id=base.id, ingredient_id=oil.id, quantity=800, waste_factor=0),
+        RecipeItem(recipe_id=base.id, ingredient_id=lye.id, quantity=200, waste_factor=0),
+        RecipeItem(recipe_id=bar.id, sub_recipe_id=base.id, quantity=100, waste_factor=0),
+        RecipeItem(recipe_id=bar.id, ingredient_id=lye.id, quantity=10, waste_factor=0),
+        RecipeItem(recipe_id=unrelated.id, ingredient_id=lye.id, quantity=1, waste_factor=0),
+    ])
+    db.commit()
+
+    response = client.get(f"/api/v1/ingredients/{oil.id}/usage", headers=admin_headers)
+    assert response.status_code == 200
+    usage = {u["recipe_name"]: u for u in response.json()}
+    assert set(usage) == {"Soap Base", "Soap Bar"}
+    assert usage["Soap Base"]["via_sub_recipe"] is False
+    assert float(usage["Soap Base"]["cost_share"]) == 16 / 18
+    assert usage["Soap Bar"]["via_sub_recipe"] is True
+    assert float(usage["Soap Bar"]["quantity"]) == 80.0
+    assert float(usage["Soap Bar"]["item_cost"]) == 1.6
+
+    assert client.get("/api/v1/ingredients/999/usage", headers=admin_headers).status_code == 404
+
+
+def test_ingredient_conditional_get(client: TestClient, admin_headers: dict, db: Session):
+    flour = Ingredient(name="Flour", unit=UnitEnum.g, cost_per_unit=0.005)
+    db.add(flour)
+    db.commit()
+
+    first = client.get("/api/v1/ingredients", headers=admin_headers)
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    # One aggregate decides the 304; the rows are never loaded
+    response = client.get("/api/v1/ingredients", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert_query_budget(response, 2)
+    response = client.get("/api/v1/ingredients", headers={**admin_headers, "If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    # If-None-Match wins over If-Modified-Since
+    response = client.get(
+        "/api/v1/ingredients",
+        headers={**admin_headers, "If-None-Match": '"stale"', "If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 200
+
+    # Query parameters are part of the validator
+    other = client.get("/api/v1/ingredients?active_only=false", headers={**admin_headers, "If-None-Match": etag})
+    assert other.status_code == 200
+
+    # Single resource
+    one = client.get(f"/api/v1/ingredients/{flour.id}", headers=admin_headers)
+    response = client.get(
+        f"/api/v1/ingredients/{flour.id}", headers={**admin_headers, "If-None-Match": one.headers["etag"]}
+    )
+    assert response.status_code == 304
+    assert client.get("/api/v1/ingredients/999", headers={**admin_headers, "If-None-Match": "*"}).status_code == 404
+
+    # Soft delete changes both validators
+    client.delete(f"/api/v1/ingredients/{flour.id}", headers=admin_headers)
+    response = client.get("/api/v1/ingredients", headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+    response = client.get(
+        f"/api/v1/ingredients/{flour.id}", headers={**admin_headers, "If-None-Match": one.headers["etag"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["active"] is False
@@ -1,3 +1,4 @@
+from datetime import datetime
 from decimal import Decimal
 
 import pytest
@@ -5,7 +6,8 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.models.ingredient import Ingredient, UnitEnum
-from app.models.inventory import MovementTypeEnum
+from app.models.ingredient_price import IngredientPrice
+from app.models.inventory import InventoryMovement, MovementTypeEnum
 
 
 @pytest.fixture
@@ -136,3 +138,65 @@ def test_adjust_movement(
     # Check balance: 100 + 50 = 150
     resp2 = client.get(f"/api/v1/inventory/balance/{sample_ingredient.id}", headers=admin_headers)
     assert float(resp2.json()["balance"]) == 150.0
+
+
+def test_inventory_valuation_json_and_csv(client: TestClient, admin_headers: dict, ingredients: dict):
+    for ingredient_id, quantity, cost in ((ingredients["flour_id"], 1000, 0.005), (ingredients["sugar_id"], 500, 0.002)):
+        client.post(
+            "/api/v1/inventory/movements",
+            json={"ingredient_id": ingredient_id, "type": "IN", "quantity": quantity, "unit_cost_at_time": cost},
+            headers=admin_headers,
+        )
+
+    response = client.get("/api/v1/inventory/valuation", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["as_of"] is None
+    assert float(data["total_value"]) == 6.0
+    # Highest value first: flour 5.0, sugar 1.0
+    assert [item["name"] for item in data["items"]] == ["Flour", "Sugar"]
+    flour = data["items"][0]
+    assert float(flour["balance"]) == 1000.0
+    assert float(flour["value"]) == 5.0
+    assert Decimal(flour["share"]) == Decimal("0.833333")
+
+    response = client.get("/api/v1/inventory/valuation?format=csv", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0] == "ingredient_id,name,unit,balance,unit_cost,value,share"
+    assert lines[2].split(",")[1] == "Sugar"
+
+
+def test_inventory_valuation_as_of(
+    client: TestClient, admin_headers: dict, db: Session, ingredients: dict
+):
+    flour_id = ingredients["flour_id"]
+    db.add(IngredientPrice(ingredient_id=flour_id, cost_per_unit=0.004, effective_from=datetime(2026, 1, 1)))
+    db.add(
+        InventoryMovement(
+            ingredient_id=flour_id,
+            type=MovementTypeEnum.IN,
+            quantity=100,
+            unit_cost_at_time=0.004,
+            created_by=1,
+            created_at=datetime(2026, 1, 10),
+        )
+    )
+    db.commit()
+    client.post(
+        "/api/v1/inventory/movements",
+        json={"ingredient_id": flour_id, "type": "IN", "quantity": 900, "unit_cost_at_time": 0.005},
+        headers=admin_headers,
+    )
+
+    data = client.get("/api/v1/inventory/valuation?as_of=2026-01-31", headers=admin_headers).json()
+    assert data["as_of"] == "2026-01-31"
+    [flour] = data["items"]
+    assert float(flour["balance"]) == 100.0
+    assert float(flour["unit_cost"]) == 0.004
+    assert float(flour["value"]) == 0.4
+
+    # Before any stock there is nothing to value
+    data = client.get("/api/v1/inventory/valuation?as_of=2025-12-31", headers=admin_headers).json()
+    assert data["items"] == [] and float(data["total_value"]) == 0
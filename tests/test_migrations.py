@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine, exc, inspect, text
+
+from app.migrations import upgrade_schema
+
+# Tables as they were before sub-recipes, search and produced_at (SQLite DDL)
+LEGACY_SCHEMA = (
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL,
+        full_name VARCHAR, role VARCHAR(8) NOT NULL, created_at DATETIME, updated_at DATETIME
+    )""",
+    """CREATE TABLE ingredients (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, unit VARCHAR(2) NOT NULL,
+        cost_per_unit NUMERIC(10, 4) NOT NULL, supplier_name VARCHAR, active BOOLEAN NOT NULL,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    "CREATE INDEX ix_ingredients_name ON ingredients (name)",
+    """CREATE TABLE recipes (
+        id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, yield_quantity NUMERIC(10, 4) NOT NULL,
+        yield_unit VARCHAR(2) NOT NULL, notes VARCHAR, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE batches (
+        id INTEGER NOT NULL PRIMARY KEY, code VARCHAR NOT NULL, recipe_id INTEGER NOT NULL REFERENCES recipes (id),
+        status VARCHAR(8) NOT NULL, planned_units NUMERIC(10, 4) NOT NULL, actual_units NUMERIC(10, 4),
+        cost_snapshot_total NUMERIC(10, 4), cost_snapshot_per_unit NUMERIC(10, 4),
+        created_by INTEGER NOT NULL REFERENCES users (id), created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE recipe_items (
+        id INTEGER NOT NULL PRIMARY KEY, recipe_id INTEGER NOT NULL REFERENCES recipes (id),
+        ingredient_id INTEGER NOT NULL REFERENCES ingredients (id), quantity NUMERIC(10, 4) NOT NULL,
+        waste_factor NUMERIC(10, 4) NOT NULL,
+        CONSTRAINT uq_recipe_ingredient UNIQUE (recipe_id, ingredient_id)
+    )""",
+    "CREATE INDEX ix_recipe_items_id ON recipe_items (id)",
+    "INSERT INTO ingredients VALUES (1, 'Óleo', 'ml', 2, NULL, 1, '2024-01-01', '2024-01-01')",
+    "INSERT INTO recipes VALUES (1, 'Sabão', 1, 'un', NULL, '2024-01-01', '2024-01-01')",
+    "INSERT INTO recipes VALUES (2, 'Base', 1, 'un', NULL, '2024-01-01', '2024-01-01')",
+    "INSERT INTO recipe_items VALUES (1, 1, 1, 100, 0)",
+)
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_legacy_schema(legacy_engine):
+    upgrade_schema(legacy_engine)
+    upgrade_schema(legacy_engine)  # idempotent
+
+    inspector = inspect(legacy_engine)
+    assert "search_name" in {c["name"] for c in inspector.get_columns("ingredients")}
+    assert "produced_at" in {c["name"] for c in inspector.get_columns("batches")}
+    items = {c["name"]: c for c in inspector.get_columns("recipe_items")}
+    assert items["ingredient_id"]["nullable"]
+    assert "sub_recipe_id" in items
+    assert "idx_ingredients_search_name_trgm" in {i["name"] for i in inspector.get_indexes("ingredients")}
+    assert "idx_recipe_items_sub_recipe" in {i["name"] for i in inspector.get_indexes("recipe_items")}
+    assert "inventory_balances" in inspector.get_table_names()
+
+    # Rows written before search_name existed are searchable
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT search_name FROM ingredients")).scalar() == "oleo"
+        assert conn.execute(text("SELECT search_name FROM recipes ORDER BY id")).scalars().all() == ["sabao", "base"]
+
+    with legacy_engine.begin() as conn:
+        assert conn.execute(text("SELECT recipe_id, ingredient_id, quantity FROM recipe_items")).all() == [(1, 1, 100)]
+        conn.execute(text("INSERT INTO recipe_items (recipe_id, sub_recipe_id, quantity, waste_factor) VALUES (1, 2, 1, 0)"))
+    with pytest.raises(exc.IntegrityError), legacy_engine.begin() as conn:
+        conn.execute(text("INSERT INTO recipe_items (recipe_id, quantity, waste_factor) VALUES (2, 1, 0)"))
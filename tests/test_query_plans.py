@@ -0,0 +1,255 @@
+"""
+Query-plan regression tests.
+
+Each case runs real service/endpoint code against a seeded dataset, captures every
+SELECT it sends and checks SQLite's EXPLAIN QUERY PLAN: a bare "SCAN <table>" on a
+table that grows with usage means a filter lost its index.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.api_keys import authenticate_api_key, hash_api_key
+from app.core.revocation import revocation_list
+from app.models.api_key import ApiKey
+from app.models.batch import Batch, BatchConsumption, BatchStatusEnum
+from app.models.ingredient import Ingredient
+from app.models.ingredient_price import IngredientPrice
+from app.models.inventory import InventoryMovement, MovementTypeEnum
+from app.models.recipe import Recipe, RecipeItem
+from app.models.revoked_token import RevokedToken
+from app.models.user import RoleEnum, User
+from app.models.rollup import InventoryBalance
+from app.services.analytics_service import analytics_service
+from app.services.dashboard_service import dashboard_service
+from app.services.inventory_service import inventory_service
+from app.services.recipe_service import recipe_service
+from tests.conftest import engine
+
+INGREDIENTS = 2000
+RECIPES = 200
+ITEMS_PER_RECIPE = 6
+MOVEMENTS = 20000
+BATCHES = 3000
+
+# Tables that grow with usage; small lookup tables may be scanned
+GROWING_TABLES = {
+    "ingredients",
+    "ingredient_prices",
+    "inventory_movements",
+    "batches",
+    "batch_consumptions",
+    "recipe_items",
+    "revoked_tokens",
+    "api_keys",
+    "users",
+}
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+@contextmanager
+def captured_selects():
+    """SELECTs sent by any engine (the sync one and the async endpoints' aiosqlite one)."""
+    statements: list[tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, tuple(parameters or ())))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def full_scans(statements: list[tuple[str, tuple]]) -> list[str]:
+    found = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                match = FULL_SCAN.match(row.detail)
+                if match and match.group(1) in GROWING_TABLES:
+                    found.append(f"{row.detail}: {' '.join(statement.split())}")
+    return found
+
+
+@pytest.fixture
+def seeded(db: Session) -> Session:
+    now = datetime.utcnow()
+    owner = User(email="owner@test.com", hashed_password="x", full_name="Owner", role=RoleEnum.ADMIN)
+    db.add(owner)
+    db.flush()
+    # A long-lived catalog is mostly discontinued ingredients, which is where the partial
+    # "active" index pays off (with few inactive rows a table scan is the right plan)
+    db.execute(
+        insert(Ingredient),
+        [
+            {
+                "id": i,
+                "name": f"Ingredient {i}",
+                "search_name": f"ingredient {i}",
+                "unit": "g",
+                "cost_per_unit": 1 + i % 7,
+                "active": i % 4 == 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(1, INGREDIENTS + 1)
+        ],
+    )
+    db.execute(
+        insert(IngredientPrice),
+        [
+            {"ingredient_id": i, "cost_per_unit": 1 + n, "effective_from": now - timedelta(days=30 * n)}
+            for i in range(1, INGREDIENTS + 1)
+            for n in range(3)
+        ],
+    )
+    db.execute(
+        insert(InventoryBalance),
+        [{"ingredient_id": i, "quantity": i % 50, "updated_at": now} for i in range(1, INGREDIENTS + 1)],
+    )
+    db.execute(
+        insert(Recipe),
+        [
+            {"id": r, "name": f"Recipe {r}", "search_name": f"recipe {r}", "yield_quantity": 10, "yield_unit": "un"}
+            for r in range(1, RECIPES + 1)
+        ],
+    )
+    items = [
+        {"recipe_id": r, "ingredient_id": (r * 7 + n * 13) % INGREDIENTS + 1, "quantity": 5, "waste_factor": 0}
+        for r in range(1, RECIPES + 1)
+        for n in range(ITEMS_PER_RECIPE)
+    ]
+    # Every tenth recipe also uses the previous one as a base
+    items += [
+        {"recipe_id": r, "sub_recipe_id": r - 1, "quantity": 1, "waste_factor": 0}
+        for r in range(11, RECIPES + 1, 10)
+    ]
+    db.execute(insert(RecipeItem), items)
+    db.execute(
+        insert(InventoryMovement),
+        [
+            {
+                "ingredient_id": m % INGREDIENTS + 1,
+                "type": MovementTypeEnum.IN if m % 3 else MovementTypeEnum.OUT,
+                "quantity": 10,
+                "created_by": owner.id,
+                "created_at": now - timedelta(minutes=m),
+            }
+            for m in range(MOVEMENTS)
+        ],
+    )
+    db.execute(
+        insert(Batch),
+        [
+            {
+                "id": b,
+                "code": f"SOL-{b}",
+                "recipe_id": b % RECIPES + 1,
+                "status": BatchStatusEnum.PRODUCED if b % 4 else BatchStatusEnum.PLANNED,
+                "planned_units": 10,
+                "actual_units": 10,
+                "cost_snapshot_total": 50,
+                "created_by": owner.id,
+                "created_at": now - timedelta(hours=b),
+                # The oldest batches predate produced_at
+                "produced_at": now - timedelta(hours=b) if b % 4 and b < BATCHES // 2 else None,
+                "updated_at": now,
+            }
+            for b in range(1, BATCHES + 1)
+        ],
+    )
+    db.execute(
+        insert(BatchConsumption),
+        [
+            {
+                "batch_id": b,
+                "ingredient_id": (b * 11 + n) % INGREDIENTS + 1,
+                "quantity_used": 5,
+                "unit_cost_at_time": 2,
+            }
+            for b in range(1, BATCHES + 1)
+            for n in range(4)
+        ],
+    )
+    db.execute(
+        insert(RevokedToken),
+        [
+            {"jti": f"jti-{n}", "expires_at": now + timedelta(days=n % 10 - 5), "revoked_at": now}
+            for n in range(2000)
+        ],
+    )
+    db.execute(
+        insert(ApiKey),
+        [
+            {
+                "name": f"device {n}",
+                "prefix": f"p{n:07d}",
+                "key_hash": hash_api_key(f"key-{n}"),
+                "user_id": owner.id,
+                "role": "OPERATOR",
+                "scopes": "GET /inventory/*",
+                "active": True,
+                "created_at": now,
+            }
+            for n in range(500)
+        ],
+    )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return db
+
+
+def assert_no_full_scans(statements):
+    assert statements, "nothing was captured"
+    assert full_scans(statements) == []
+
+
+def test_inventory_queries_use_indexes(seeded: Session, client: TestClient, admin_headers):
+    with captured_selects() as statements:
+        inventory_service.get_balance(seeded, 42)
+        assert client.get("/api/v1/inventory/movements?limit=50", headers=admin_headers).status_code == 200
+        response = client.get("/api/v1/inventory/movements?ingredient_id=42", headers=admin_headers)
+        assert response.status_code == 200
+        dashboard_service.get_low_stock_alerts(seeded)
+    assert_no_full_scans(statements)
+
+
+def test_recipe_queries_use_indexes(seeded: Session):
+    with captured_selects() as statements:
+        recipe_service.get_ingredient_usage(seeded, 42)
+        recipe_service.calculate_cost(seeded, RECIPES, as_of=datetime.utcnow() - timedelta(days=40))
+    assert_no_full_scans(statements)
+
+
+def test_analytics_queries_use_indexes(seeded: Session):
+    date_to = datetime.utcnow().date()
+    date_from = date_to - timedelta(days=200)
+    with captured_selects() as statements:
+        for group_by in ("none", "recipe", "ingredient"):
+            analytics_service.production_series(seeded, "day", date_from, date_to, group_by)
+    assert_no_full_scans(statements)
+
+
+def test_auth_queries_use_indexes(seeded: Session):
+    revocation_list.clear()
+    with captured_selects() as statements:
+        revocation_list.is_revoked(seeded, "jti-1")
+        authenticate_api_key(seeded, "sol_p0000042_secret")
+    assert_no_full_scans(statements)
+
+
+def test_full_scan_detection(seeded: Session):
+    # Guards the guard: an unindexed filter must be reported
+    with captured_selects() as statements:
+        seeded.execute(text("SELECT id FROM batches WHERE planned_units > 5")).all()
+    assert len(full_scans(statements)) == 1
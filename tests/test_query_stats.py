@@ -0,0 +1,94 @@
+import logging
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.query_stats import QueryStatsMiddleware, track_queries
+from app.core.text import normalize_sql
+from app.models.batch import Batch, BatchStatusEnum
+from app.models.ingredient import Ingredient, UnitEnum
+from app.models.inventory import MovementTypeEnum
+from app.models.recipe import Recipe, RecipeItem
+from app.schemas.batch import BatchProduce
+from app.schemas.inventory import InventoryMovementCreate
+from app.services.batch_service import batch_service
+from app.services.inventory_service import inventory_service
+from tests.conftest import assert_query_budget, engine
+
+
+def add_stocked_ingredients(db: Session, count: int, start: int = 0) -> list[Ingredient]:
+    ingredients = [
+        Ingredient(name=f"Ingredient {start + n}", unit=UnitEnum.g, cost_per_unit=1) for n in range(count)
+    ]
+    db.add_all(ingredients)
+    db.commit()
+    for ingredient in ingredients:
+        inventory_service.create_movement(
+            db,
+            InventoryMovementCreate(
+                ingredient_id=ingredient.id, type=MovementTypeEnum.IN, quantity=100, unit_cost_at_time=1
+            ),
+            user_id=1,
+        )
+    return ingredients
+
+
+def test_normalize_sql_groups_statements_by_shape():
+    assert normalize_sql("SELECT a FROM t WHERE id = ? AND name = 'x'") == "SELECT a FROM t WHERE id = ? AND name = ?"
+    assert normalize_sql("SELECT a FROM t WHERE id IN (?, ?, ?)") == normalize_sql("SELECT a FROM t WHERE id IN (?)")
+    assert normalize_sql("SELECT a\n  FROM t WHERE id = %(id_1)s LIMIT 10") == "SELECT a FROM t WHERE id = ? LIMIT ?"
+    assert normalize_sql("SELECT created_at::date FROM t WHERE id = $1") == "SELECT created_at::date FROM t WHERE id = ?"
+
+
+def test_balances_query_count_does_not_grow(client: TestClient, db: Session, admin_headers: dict):
+    add_stocked_ingredients(db, 2)
+    response = client.get("/api/v1/inventory/balance", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    baseline = int(response.headers["X-Query-Count"])
+
+    add_stocked_ingredients(db, 10, start=2)
+    response = client.get("/api/v1/inventory/balance", headers=admin_headers)
+    assert len(response.json()) == 12
+    assert {row["balance"] for row in response.json()} == {"100.0000"}
+    assert_query_budget(response, baseline)
+
+
+def test_produce_batch_reads_do_not_repeat_per_ingredient(db: Session, admin_token: str):
+    ingredients = add_stocked_ingredients(db, 8)
+    recipe = Recipe(name="Many Parts", yield_quantity=1, yield_unit=UnitEnum.un)
+    db.add(recipe)
+    db.flush()
+    db.add_all(RecipeItem(recipe_id=recipe.id, ingredient_id=i.id, quantity=10, waste_factor=0) for i in ingredients)
+    batch = Batch(code="SOL-N1", recipe_id=recipe.id, planned_units=1, created_by=1)
+    db.add(batch)
+    db.commit()
+
+    with track_queries() as stats:
+        produced = batch_service.produce_batch(db, batch.id, BatchProduce(), user_id=1)
+    assert produced.status == BatchStatusEnum.PRODUCED
+    # 8 ingredients: any per-ingredient read would show up 8 times
+    assert stats.repeated(2) == []
+    assert inventory_service.get_balances(db, [i.id for i in ingredients]) == {
+        i.id: Decimal("90") for i in ingredients
+    }
+
+
+def test_repeated_statement_shape_is_logged(caplog, monkeypatch):
+    monkeypatch.setattr(settings, "query_repeat_warn_threshold", 2)
+
+    async def n_plus_one(scope, receive, send):
+        with engine.connect() as conn:
+            for n in range(3):
+                conn.execute(text("SELECT :n"), {"n": n})
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        response = TestClient(QueryStatsMiddleware(n_plus_one)).get("/report")
+
+    assert response.headers["X-Query-Count"] == "3"
+    assert "Possible N+1 in GET /report: statement ran 3 times: SELECT ?" in caplog.text
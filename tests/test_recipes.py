@@ -109,3 +109,372 @@ def test_add_item_to_recipe(
     data = response.json()
     assert len(data["items"]) == 1
     assert float(data["items"][0]["quantity"]) == 1000
+
+
+def test_read_all_recipe_costs(
+    client: TestClient, admin_headers: dict, ingredients_setup: dict
+):
+    # Cheap: 100g Sugar = 0.20 / 1 un
+    # Pricey: 500g Flour + 3 Eggs = 4.00 / 2 un
+    client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Cheap",
+            "yield_quantity": 1,
+            "yield_unit": "un",
+            "items": [{"ingredient_id": ingredients_setup["sugar"].id, "quantity": 100}],
+        },
+        headers=admin_headers,
+    )
+    client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Pricey",
+            "yield_quantity": 2,
+            "yield_unit": "un",
+            "items": [
+                {"ingredient_id": ingredients_setup["flour"].id, "quantity": 500},
+                {"ingredient_id": ingredients_setup["eggs"].id, "quantity": 3},
+            ],
+        },
+        headers=admin_headers,
+    )
+    client.post(
+        "/api/v1/recipes",
+        json={"name": "Empty", "yield_quantity": 1, "yield_unit": "un", "items": []},
+        headers=admin_headers,
+    )
+
+    response = client.get(
+        "/api/v1/recipes/costs?sort_by=total_cost&order=desc", headers=admin_headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["recipe_name"] for r in data] == ["Pricey", "Cheap", "Empty"]
+    assert float(data[0]["total_cost"]) == 4.0
+    assert float(data[0]["cost_per_unit"]) == 2.0
+    assert float(data[2]["total_cost"]) == 0.0
+    assert data[0]["breakdown"] == []
+
+    # Pagination + breakdown
+    response = client.get(
+        "/api/v1/recipes/costs?sort_by=total_cost&order=desc&skip=0&limit=1&include_breakdown=true",
+        headers=admin_headers,
+    )
+    data = response.json()
+    assert len(data) == 1
+    assert len(data[0]["breakdown"]) == 2
+    assert sum(float(b["total_cost"]) for b in data[0]["breakdown"]) == 4.0
+
+
+def test_sub_recipe_cost_rollup(
+    client: TestClient, admin_headers: dict, ingredients_setup: dict
+):
+    # Base: 1000g Flour (5.00) + 500g Sugar (1.00) yields 1000g -> 0.006 per g
+    base = client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Base",
+            "yield_quantity": 1000,
+            "yield_unit": "g",
+            "items": [
+                {"ingredient_id": ingredients_setup["flour"].id, "quantity": 1000},
+                {"ingredient_id": ingredients_setup["sugar"].id, "quantity": 500},
+            ],
+        },
+        headers=admin_headers,
+    ).json()
+
+    # Product: 500g Base (3.00) + 2 Eggs (1.00) = 4.00 per batch of 2
+    product = client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Product",
+            "yield_quantity": 2,
+            "yield_unit": "un",
+            "items": [
+                {"sub_recipe_id": base["id"], "quantity": 500},
+                {"ingredient_id": ingredients_setup["eggs"].id, "quantity": 2},
+            ],
+        },
+        headers=admin_headers,
+    ).json()
+    assert {i["sub_recipe_id"] for i in product["items"]} == {base["id"], None}
+
+    response = client.get(f"/api/v1/recipes/{product['id']}/cost", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert float(data["total_cost"]) == 4.0
+    assert float(data["cost_per_unit"]) == 2.0
+    sub_line = next(b for b in data["breakdown"] if b["sub_recipe_id"] == base["id"])
+    assert sub_line["ingredient_name"] == "Base"
+    assert float(sub_line["unit_cost"]) == 0.006
+
+    costs = client.get("/api/v1/recipes/costs", headers=admin_headers).json()
+    by_name = {c["recipe_name"]: float(c["total_cost"]) for c in costs}
+    assert by_name == {"Base": 6.0, "Product": 4.0}
+
+    # Sorting and paging use the rolled-up cost (Product's direct cost alone is 1.00)
+    client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Middle",
+            "yield_quantity": 1,
+            "yield_unit": "un",
+            "items": [{"ingredient_id": ingredients_setup["eggs"].id, "quantity": 5}],
+        },
+        headers=admin_headers,
+    )
+    page = client.get(
+        "/api/v1/recipes/costs?sort_by=total_cost&order=desc&skip=1&limit=1", headers=admin_headers
+    ).json()
+    assert [(c["recipe_name"], float(c["total_cost"])) for c in page] == [("Product", 4.0)]
+    page = client.get("/api/v1/recipes/costs?sort_by=cost_per_unit&limit=2", headers=admin_headers).json()
+    assert [c["recipe_name"] for c in page] == ["Base", "Product"]
+
+
+def test_sub_recipe_cycle_rejected(
+    client: TestClient, admin_headers: dict, ingredients_setup: dict
+):
+    base = client.post(
+        "/api/v1/recipes",
+        json={"name": "Base", "yield_quantity": 1, "yield_unit": "g", "items": []},
+        headers=admin_headers,
+    ).json()
+    product = client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Product",
+            "yield_quantity": 1,
+            "yield_unit": "un",
+            "items": [{"sub_recipe_id": base["id"], "quantity": 1}],
+        },
+        headers=admin_headers,
+    ).json()
+
+    response = client.post(
+        f"/api/v1/recipes/{base['id']}/items",
+        json={"sub_recipe_id": product["id"], "quantity": 1},
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+
+    response = client.post(
+        f"/api/v1/recipes/{base['id']}/items",
+        json={"sub_recipe_id": base["id"], "quantity": 1},
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
+
+    # Exactly one source per item
+    response = client.post(
+        f"/api/v1/recipes/{base['id']}/items",
+        json={"quantity": 1},
+        headers=admin_headers,
+    )
+    assert response.status_code == 422
+
+
+def test_simulate_price_changes(
+    client: TestClient, admin_headers: dict, db: Session, ingredients_setup: dict
+):
+    from app.models.recipe import RecipeItem
+
+    # Cake: 500g Flour (10% waste) + 3 Eggs, yields 2
+    cake = Recipe(name="Cake", yield_quantity=2, yield_unit="un")
+    # Candy: 100g Sugar only
+    candy = Recipe(name="Candy", yield_quantity=1, yield_unit="un")
+    db.add_all([cake, candy])
+    db.flush()
+    db.add_all([
+        RecipeItem(recipe_id=cake.id, ingredient_id=ingredients_setup["flour"].id, quantity=500, waste_factor=0.1),
+        RecipeItem(recipe_id=cake.id, ingredient_id=ingredients_setup["eggs"].id, quantity=3, waste_factor=0),
+        RecipeItem(recipe_id=candy.id, ingredient_id=ingredients_setup["sugar"].id, quantity=100, waste_factor=0),
+    ])
+    db.commit()
+
+    payload = {
+        "scenarios": [
+            {"name": "flour +100%", "changes": [{"ingredient_id": ingredients_setup["flour"].id, "percent_change": 100}]},
+            {"name": "eggs to 1.00", "changes": [{"ingredient_id": ingredients_setup["eggs"].id, "new_cost": 1.0}]},
+        ]
+    }
+    response = client.post("/api/v1/recipes/simulate", json=payload, headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    # Candy is untouched by both scenarios
+    assert [r["recipe_name"] for r in data["recipes"]] == ["Cake"]
+    # Base: 550g * 0.005 + 3 * 0.50 = 4.25
+    assert data["recipes"][0]["base_cost"] == 4.25
+    flour, eggs = data["scenarios"]
+    assert flour["cost_deltas"] == [2.75]
+    assert flour["cost_per_unit_deltas"] == [1.375]
+    assert eggs["cost_deltas"] == [1.5]
+
+    payload["include_unaffected"] = True
+    data = client.post("/api/v1/recipes/simulate", json=payload, headers=admin_headers).json()
+    assert len(data["recipes"]) == 2
+    assert data["scenarios"][0]["affected_recipes"] == 1
+
+    bad = {"scenarios": [{"name": "x", "changes": [{"ingredient_id": 999, "new_cost": 1}]}]}
+    assert client.post("/api/v1/recipes/simulate", json=bad, headers=admin_headers).status_code == 400
+
+
+def test_recipe_cost_as_of(
+    client: TestClient, admin_headers: dict, db: Session, ingredients_setup: dict
+):
+    from datetime import datetime
+
+    from app.models.ingredient_price import IngredientPrice
+    from app.models.recipe import RecipeItem
+
+    recipe = Recipe(name="Cookie", yield_quantity=1, yield_unit="un")
+    db.add(recipe)
+    db.flush()
+    db.add_all([
+        RecipeItem(recipe_id=recipe.id, ingredient_id=ingredients_setup["flour"].id, quantity=100, waste_factor=0),
+        RecipeItem(recipe_id=recipe.id, ingredient_id=ingredients_setup["eggs"].id, quantity=1, waste_factor=0),
+        # Flour was 0.002 in January and 0.004 from March
+        IngredientPrice(ingredient_id=ingredients_setup["flour"].id, cost_per_unit=0.002, effective_from=datetime(2025, 1, 1)),
+        IngredientPrice(ingredient_id=ingredients_setup["flour"].id, cost_per_unit=0.004, effective_from=datetime(2025, 3, 1)),
+    ])
+    db.commit()
+
+    def cost_at(as_of: str) -> float:
+        response = client.get(f"/api/v1/recipes/{recipe.id}/cost?as_of={as_of}", headers=admin_headers)
+        assert response.status_code == 200
+        return float(response.json()["total_cost"])
+
+    # Eggs have no history and use the current 0.50
+    assert cost_at("2025-02-01T00:00:00") == 0.70
+    assert cost_at("2025-06-01T00:00:00") == 0.90
+    # Without as_of the current flour price (0.005) applies
+    current = client.get(f"/api/v1/recipes/{recipe.id}/cost", headers=admin_headers).json()
+    assert float(current["total_cost"]) == 1.0
+
+
+def test_cost_patch_keeps_price_of_ingredient_without_history(
+    client: TestClient, admin_headers: dict, db: Session
+):
+    from datetime import datetime, timedelta
+
+    from app.models.ingredient_price import IngredientPrice
+    from app.models.recipe import RecipeItem
+    from app.services.ingredient_service import ingredient_service
+
+    # Inserted directly, as ingredients that predate the price history were
+    created = datetime.utcnow() - timedelta(days=10)
+    salt = Ingredient(name="Salt", unit=UnitEnum.un, cost_per_unit=10, created_at=created)
+    pepper = Ingredient(name="Pepper", unit=UnitEnum.un, cost_per_unit=3, created_at=created)
+    recipe = Recipe(name="Brine", yield_quantity=1, yield_unit="un")
+    db.add_all([salt, pepper, recipe])
+    db.flush()
+    db.add(RecipeItem(recipe_id=recipe.id, ingredient_id=salt.id, quantity=1, waste_factor=0))
+    db.commit()
+
+    client.patch(f"/api/v1/ingredients/{salt.id}", json={"cost_per_unit": 20}, headers=admin_headers)
+
+    yesterday = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    response = client.get(f"/api/v1/recipes/{recipe.id}/cost?as_of={yesterday}", headers=admin_headers)
+    assert float(response.json()["total_cost"]) == 10
+    response = client.get(f"/api/v1/recipes/{recipe.id}/cost", headers=admin_headers)
+    assert float(response.json()["total_cost"]) == 20
+
+    # The backfill seeds the remaining ingredient from its current cost, once
+    assert ingredient_service.backfill_price_history(db) == 1
+    assert ingredient_service.backfill_price_history(db) == 0
+    [baseline] = db.query(IngredientPrice).filter(IngredientPrice.ingredient_id == pepper.id).all()
+    assert float(baseline.cost_per_unit) == 3
+    assert baseline.effective_from == created
+
+
+def test_replace_recipe_items(
+    client: TestClient, admin_headers: dict, ingredients_setup: dict
+):
+    recipe = client.post(
+        "/api/v1/recipes",
+        json={
+            "name": "Formula",
+            "yield_quantity": 1,
+            "yield_unit": "un",
+            "items": [
+                {"ingredient_id": ingredients_setup["flour"].id, "quantity": 500},
+                {"ingredient_id": ingredients_setup["sugar"].id, "quantity": 200},
+            ],
+        },
+        headers=admin_headers,
+    ).json()
+    flour_item_id = next(i["id"] for i in recipe["items"] if i["ingredient_id"] == ingredients_setup["flour"].id)
+
+    # Update flour, drop sugar, add eggs
+    response = client.put(
+        f"/api/v1/recipes/{recipe['id']}/items",
+        json=[
+            {"ingredient_id": ingredients_setup["flour"].id, "quantity": 600, "waste_factor": 0.05},
+            {"ingredient_id": ingredients_setup["eggs"].id, "quantity": 2},
+        ],
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    items = {i["ingredient_id"]: i for i in response.json()["items"]}
+    assert set(items) == {ingredients_setup["flour"].id, ingredients_setup["eggs"].id}
+    # Existing row is updated in place, not recreated
+    assert items[ingredients_setup["flour"].id]["id"] == flour_item_id
+    assert float(items[ingredients_setup["flour"].id]["quantity"]) == 600
+    assert float(items[ingredients_setup["flour"].id]["waste_factor"]) == 0.05
+
+    # Duplicates and unknown ingredients are rejected without partial writes
+    duplicate = [
+        {"ingredient_id": ingredients_setup["eggs"].id, "quantity": 1},
+        {"ingredient_id": ingredients_setup["eggs"].id, "quantity": 2},
+    ]
+    assert client.put(f"/api/v1/recipes/{recipe['id']}/items", json=duplicate, headers=admin_headers).status_code == 400
+    unknown = [{"ingredient_id": 999, "quantity": 1}]
+    assert client.put(f"/api/v1/recipes/{recipe['id']}/items", json=unknown, headers=admin_headers).status_code == 400
+
+    current = client.get(f"/api/v1/recipes/{recipe['id']}", headers=admin_headers).json()
+    assert len(current["items"]) == 2
+
+    # Empty list clears the formula
+    response = client.put(f"/api/v1/recipes/{recipe['id']}/items", json=[], headers=admin_headers)
+    assert response.json()["items"] == []
+
+
+def test_search_and_autocomplete_recipes(client: TestClient, admin_headers: dict, db: Session):
+    db.add_all([
+        Recipe(name="Sabonete de Açaí", yield_quantity=1, yield_unit="un"),
+        Recipe(name="Base Glicerinada", yield_quantity=1, yield_unit="g"),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/recipes/search?q=acai", headers=admin_headers)
+    assert response.status_code == 200
+    assert [r["name"] for r in response.json()] == ["Sabonete de Açaí"]
+
+    response = client.get("/api/v1/recipes/autocomplete?q=glic", headers=admin_headers)
+    assert [r["name"] for r in response.json()] == ["Base Glicerinada"]
+
+
+def test_recipe_conditional_get(client: TestClient, admin_headers: dict, ingredients_setup: dict):
+    payload = {"name": "Bread", "yield_quantity": 1, "yield_unit": "un", "items": []}
+    recipe_id = client.post("/api/v1/recipes", json=payload, headers=admin_headers).json()["id"]
+
+    listing = client.get("/api/v1/recipes", headers=admin_headers)
+    one = client.get(f"/api/v1/recipes/{recipe_id}", headers=admin_headers)
+    assert "last-modified" in one.headers
+    for url, response in (("/api/v1/recipes", listing), (f"/api/v1/recipes/{recipe_id}", one)):
+        cached = client.get(url, headers={**admin_headers, "If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+        assert cached.headers["cache-control"] == "private, no-cache"
+
+    # Items are part of the recipe: adding one invalidates the list and the recipe
+    item = {"ingredient_id": ingredients_setup["flour"].id, "quantity": 100, "waste_factor": 0}
+    client.post(f"/api/v1/recipes/{recipe_id}/items", json=item, headers=admin_headers)
+    for url, response in (("/api/v1/recipes", listing), (f"/api/v1/recipes/{recipe_id}", one)):
+        fresh = client.get(url, headers={**admin_headers, "If-None-Match": response.headers["etag"]})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != response.headers["etag"]
+
+    assert client.get("/api/v1/recipes/999", headers=admin_headers).status_code == 404
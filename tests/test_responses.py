@@ -0,0 +1,57 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.responses import FastJSONResponse, RowSerializer, dumps
+from app.models.ingredient import Ingredient, UnitEnum
+from app.schemas.ingredient import IngredientResponse
+from app.schemas.inventory import InventoryBalanceResponse
+
+
+def test_dumps_keeps_decimals_exact():
+    assert dumps({"cost": Decimal("0.1000"), "big": Decimal("12345678901234567890.0001")}) == (
+        b'{"cost":"0.1000","big":"12345678901234567890.0001"}'
+    )
+    assert FastJSONResponse({"unit": UnitEnum.g, 1: None}).body == b'{"unit":"g","1":null}'
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_row_serializer_matches_response_model_output(db: Session):
+    db.add_all(
+        [
+            Ingredient(name="Flour", unit=UnitEnum.g, cost_per_unit=Decimal("0.0050"), supplier_name="Mill"),
+            Ingredient(name="Milk", unit=UnitEnum.ml, cost_per_unit=Decimal("1.2345"), active=False),
+        ]
+    )
+    db.commit()
+    serializer = RowSerializer(IngredientResponse)
+    adapter = TypeAdapter(list[IngredientResponse])
+
+    rows = db.execute(select(*serializer.columns(Ingredient)).order_by(Ingredient.id)).all()
+    orm = db.query(Ingredient).order_by(Ingredient.id).all()
+    assert serializer.dump(rows) == adapter.dump_json(adapter.validate_python(orm, from_attributes=True))
+
+
+def test_row_serializer_formats_by_field_type():
+    serializer = RowSerializer(InventoryBalanceResponse)
+    assert serializer.fields == ("ingredient_id", "ingredient_name", "balance", "unit", "avg_cost")
+    assert serializer.dump([(1, "Flour", Decimal("2.5000"), UnitEnum.g, None)]) == (
+        b'[{"ingredient_id":1,"ingredient_name":"Flour","balance":"2.5000","unit":"g","avg_cost":null}]'
+    )
+
+
+def test_list_endpoints_use_row_serialization(client: TestClient, db: Session, admin_headers: dict):
+    db.add(Ingredient(name="Soda", unit=UnitEnum.g, cost_per_unit=Decimal("0.0100"), created_at=datetime(2024, 1, 2)))
+    db.commit()
+    response = client.get("/api/v1/ingredients", headers=admin_headers)
+    assert response.headers["content-type"] == "application/json"
+    [item] = response.json()
+    assert item["cost_per_unit"] == "0.0100"
+    assert item["created_at"] == "2024-01-02T00:00:00"
+    assert list(item) == list(IngredientResponse.model_fields)
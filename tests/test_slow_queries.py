@@ -0,0 +1,101 @@
+import logging
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.slow_queries import ExplainBudget, explain_analyze, parameter_shape
+from app.services.inventory_service import inventory_service
+
+
+class FakeCursor:
+    """Records DB-API calls; fails statements that start with `fail_on`."""
+
+    def __init__(self, log: list[str], fail_on: str | None):
+        self.log = log
+        self.fail_on = fail_on
+
+    def execute(self, statement, parameters=None):
+        self.log.append(statement)
+        if self.fail_on and statement.startswith(self.fail_on):
+            raise RuntimeError("boom")
+
+    def fetchall(self):
+        return [("Seq Scan on batches",), ("Execution Time: 2000.1 ms",)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, fail_on: str | None = None):
+        self.log: list[str] = []
+        self.fail_on = fail_on
+
+    def cursor(self):
+        return FakeCursor(self.log, self.fail_on)
+
+
+def test_parameter_shape_lists_types_not_values():
+    assert parameter_shape({"email": "a@b.c", "id": 3}) == "{email: str, id: int}"
+    assert parameter_shape(("x", 1.5, datetime(2024, 1, 1))) == "(str, float, datetime)"
+    assert parameter_shape([(1, "a"), (2, "b")], executemany=True) == "2 x (int, str)"
+    assert parameter_shape(None) == "()"
+
+
+def test_slow_query_logged_with_endpoint_and_service(
+    client: TestClient, admin_headers: dict, caplog, monkeypatch
+):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.core.slow_queries"):
+        response = client.get("/api/v1/inventory/balance", headers=admin_headers)
+    assert response.status_code == 200
+
+    lines = [r.getMessage() for r in caplog.records if "inventory_balances" in r.getMessage()]
+    assert len(lines) == 1
+    # Async endpoint: the caller is found across the greenlet that runs the statement
+    assert "in GET /inventory/balance via app.api.api_v1.endpoints.inventory:read_balances" in lines[0]
+    assert "ingredients.active = ?" in lines[0]
+    assert "| params (" in lines[0]
+    assert any("via app.core.security:" in r.getMessage() for r in caplog.records)
+
+
+def test_slow_query_names_the_service_function(db, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.core.slow_queries"):
+        inventory_service.get_balances(db, [1, 2])
+    assert "via app.services.inventory_service:InventoryService.get_balances" in caplog.text
+    assert "IN (?)" in caplog.text
+
+
+def test_slow_query_log_disabled_by_zero_threshold(client: TestClient, admin_headers: dict, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 0)
+    with caplog.at_level(logging.WARNING, logger="app.core.slow_queries"):
+        client.get("/api/v1/inventory/balance", headers=admin_headers)
+    assert not caplog.records
+
+
+def test_explain_budget_samples_and_caps(monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_explain_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "slow_query_explain_per_minute", 2)
+    budget = ExplainBudget()
+    assert [budget.allow() for _ in range(3)] == [True, True, False]
+
+    monkeypatch.setattr(settings, "slow_query_explain_sample_rate", 0.0)
+    assert not ExplainBudget().allow()
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_explain_runs_inside_a_savepoint(fail: bool):
+    connection = FakeConnection(fail_on="EXPLAIN" if fail else None)
+    plan = explain_analyze(connection, "SELECT * FROM batches WHERE id = %(id)s", {"id": 1})
+
+    assert connection.log[0] == "SAVEPOINT slow_query_explain"
+    assert connection.log[1] == "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM batches WHERE id = %(id)s"
+    if fail:
+        assert plan is None
+        assert connection.log[2] == "ROLLBACK TO SAVEPOINT slow_query_explain"
+    else:
+        assert plan == "Seq Scan on batches\nExecution Time: 2000.1 ms"
+        assert connection.log[2] == "RELEASE SAVEPOINT slow_query_explain"